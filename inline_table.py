@@ -4,10 +4,25 @@
 source-code. We can write source-code just like a design document.
 """
 
+import array
+import ast
+import asyncio
+import bisect
 import collections
-import copy
+import collections.abc
+import concurrent.futures
+import csv
+import datetime
+import fnmatch
+import functools
+import heapq
+import io
+import ipaddress
 import itertools
 import re
+import struct
+import sys
+import time
 
 from docutils.parsers.rst.tableparser import (
     SimpleTableParser as DocutilsSimpleTableParser,
@@ -19,7 +34,24 @@ from docutils.statemachine import StringList
 __docformat__ = 'reStructuredText'
 __version__ = '0.1.0'
 
-__all__ = ('compile', 'Table', 'TableMarkupError')
+__all__ = (
+    'compile', 'compile_file', 'compile_csv', 'compile_tsv',
+    'compile_parallel', 'compile_async', 'load_async', 'load', 'loads',
+    'register_column_type', 'unregister_column_type',
+    'Table', 'TableMarkupError',
+)
+
+# Number of rows evaluated at once by compile functions.
+_COMPILE_CHUNK_SIZE = 1024
+
+# Maximum number of answers precomputed by Table.precompute
+_LOOKUP_SIZE_LIMIT = 1 << 16
+
+# Number of cells passed to match_batch of a column type at once
+_MATCH_BATCH_SIZE = 512
+
+_REGEX_TYPE = type(re.compile(''))
+_REGEX_TYPE_FLAGS = re.compile('').flags
 
 
 def compile(text, **variables):
@@ -99,7 +131,7 @@ def compile(text, **variables):
 
     We can specify a column type with adding a directive to the header
     row. The difference among column types is how the strings in each cell are
-    evaluated. ``inline_table`` provides five column types:
+    evaluated. ``inline_table`` provides nine column types:
 
     =========== =============== =============================== ====
     Column Type Directive       Evaluated As                    Set?
@@ -113,8 +145,16 @@ def compile(text, **variables):
     Regex       (regex), (re)   Regular expression              yes
     Collection  (collection),   Collection of values            yes
                 (coll)
+    IP          (ip), (cidr)    IP network such as 10.0.0.0/8   yes
+                                or an address
+    Date Range  (daterange),    Range of dates such as          yes
+                (dates)         2020-01-01..2020-12-31
+    Prefix      (prefix)        Prefix of strings               yes
+    Glob        (glob)          Glob pattern such as /api/*     yes
     =========== =============== =============================== ====
 
+    Other column types can be added with ``register_column_type``.
+
     A cell in a set column type represents multiple values. The upper table and
     the lower table in the following act almost similarly (but not strictively
     equal). ::
@@ -138,6 +178,144 @@ def compile(text, **variables):
     lines = strip_lines(text.splitlines())
     fmt = estimate_format(lines)
     headers, rows = fmt.parse(lines)
+    return _compile_rows(headers, rows, variables)
+
+
+def compile_file(file, **variables):
+    """Compile a table text in a file to a ``Table`` object.
+
+    Markdown tables and reStructuredText simple tables are read line by
+    line, and each row is evaluated as soon as it is read. Thus a large
+    table file is not loaded into memory at once. Grid tables are read
+    entirely.
+
+    Leading and trailing white lines are ignored as ``compile`` does.
+
+    :param file: a path or a file object of a table text
+    :param variables: values passed to the table
+    :return: a table object
+    :rtype: Table
+    :raise TableMarkupError: the text format is incorrect
+
+    :Example:
+
+        >>> import io
+        >>> f = io.StringIO('''
+        ... | A | B |
+        ... |---|---|
+        ... | 1 | b |
+        ... ''')
+        >>> compile_file(f, b=2).select(A=1)
+        Tuple(A=1, B=2)
+
+    """
+    if isinstance(file, str):
+        with io.open(file, encoding='utf-8') as f:
+            return _compile_stream(f, variables)
+    return _compile_stream(file, variables)
+
+
+def _compile_stream(lines, variables):
+    """Compile a table from an iterable of lines."""
+    lines = (line.rstrip('\r\n') for line in lines)
+    for first in lines:
+        if first.strip():
+            break
+    else:
+        raise TableMarkupError('All lines are empty.')
+    second = next(lines, '')
+    _, _, indent = _content_bounds([first, second or first])
+    lines = itertools.chain(
+        [first[indent:], second[indent:]],
+        (line[indent:] for line in lines),
+    )
+
+    if ReSTSimpleTable.border_pattern.match(first[indent:]):
+        headers, rows = ReSTSimpleTable.iterparse(lines)
+    elif MarkdownTable.separator_pattern.match(second[indent:]):
+        headers, rows = MarkdownTable.iterparse(lines)
+    elif ReSTGridTable.border_pattern.match(first[indent:]):
+        lines = strip_lines(list(lines))
+        if not ReSTGridTable.can_accept(lines):
+            raise TableMarkupError('The table format is unknown.')
+        headers, rows = ReSTGridTable.parse(lines)
+    else:
+        raise TableMarkupError('The table format is unknown.')
+    return _compile_rows(headers, rows, variables)
+
+
+def compile_csv(file, **variables):
+    r"""Compile a CSV file to a ``Table`` object.
+
+    The first record is the header, which can have column type directives
+    as table texts do. Cells are evaluated as cells of table texts,
+    including ``*`` and ``N/A``. Empty records are ignored.
+
+    :param file: a path or a file object of CSV
+    :param variables: values passed to the table
+    :return: a table object
+    :rtype: Table
+    :raise TableMarkupError: the number of cells is wrong
+
+    :Example:
+
+        >>> import io
+        >>> f = io.StringIO('''\
+        ... age (cond),gender,call (str)
+        ... a < 18,*,child
+        ... *,N/A,
+        ... ''')
+        >>> compile_csv(f).select(age=10, gender='male')
+        Tuple(age=10, gender='male', call='child')
+
+    """
+    return _compile_delimited(file, 'excel', variables)
+
+
+def compile_tsv(file, **variables):
+    """Compile a tab separated values file to a ``Table`` object.
+
+    See ``compile_csv``.
+    """
+    return _compile_delimited(file, 'excel-tab', variables)
+
+
+def _compile_delimited(file, dialect, variables):
+    """Compile delimited records with the csv module."""
+    if isinstance(file, str):
+        with io.open(file, encoding='utf-8', newline='') as f:
+            return _compile_delimited(f, dialect, variables)
+
+    reader = csv.reader(file, dialect)
+    for headers in reader:
+        if headers:
+            break
+    else:
+        raise TableMarkupError('All lines are empty.')
+    headers = [cell.strip() for cell in headers]
+
+    def body():
+        """Generate rows of stripped cells."""
+        for record in reader:
+            if not record:
+                continue
+            if len(record) != len(headers):
+                raise TableMarkupError(
+                    'Line %d has %d cells, expected %d'
+                    % (reader.line_num, len(record), len(headers)))
+            yield [cell.strip() for cell in record]
+
+    return _compile_rows(headers, body(), variables)
+
+
+def _compile_rows(headers, rows, variables, executor=None):
+    """Evaluate parsed rows and build a table.
+
+    :param headers: list of header strings
+    :param rows: iterable of lists of cell strings
+    :param variables: values passed to the table
+    :param executor: ``concurrent.futures.Executor`` evaluating chunks of rows
+    """
     # Move '(...)' word from header to column_types.
     # e.g.,
     #   'a(b)' -> 'a', 'b'
@@ -154,62 +332,341 @@ def compile(text, **variables):
         labels.append(label)
         column_type_directives.append(directive)
 
-    # Evaluate
-    column_types = [get_column_type(d) for d in column_type_directives]
-    evaluated_rows = []
-    for row in rows:
-        # Evaluate the literal in each cell with given variables.
-        row_evaluated = [
-            coltype.evaluate(field, variables, label)
-            for coltype, field, label in zip(column_types, row, labels)
-        ]
-        evaluated_rows.append(row_evaluated)
-
     # Build table
+    column_types = [get_column_type(d) for d in column_type_directives]
     table = create_table(labels, column_types)
-    for row in evaluated_rows:
-        table._insert(row)
+
+    # Evaluate the rows chunk by chunk. The chunks are evaluated on the
+    # executor if given, and are inserted in order either way.
+    # Each column memorizes evaluated cells, since decision tables repeat
+    # the same cells such as '*', 'True' and the same conditions.
+    memos = [{} for _ in labels]
+    evaluate_chunk = functools.partial(
+        _evaluate_chunk, column_types, labels,
+        variables=variables, memos=memos)
+    starts = itertools.count(0, _COMPILE_CHUNK_SIZE)
+    chunks = _split_rows(rows, _COMPILE_CHUNK_SIZE)
+    if executor is None:
+        results = map(evaluate_chunk, starts, chunks)
+    else:
+        results = executor.map(evaluate_chunk, starts, chunks)
+    for columns in results:
+        for row_evaluated in zip(*columns):
+            table._insert(row_evaluated)
 
     return table
 
 
+def _check_exhaustive(table, keys):
+    """Raise TableMarkupError if some input of the keys matches no row.
+
+    :param keys: labels of the key columns, or None to guess them
+    """
+    if keys is None:
+        keys = [label for label, ctype in zip(table._labels,
+                                              table.column_types)
+                if isinstance(ctype, ConditionType)
+                or any(row.get(label) is WILD_CARD for row in table.rows)]
+    rows = list(table.rows)
+
+    # Split the inputs of each column into the domains, each of which
+    # is matched by the same rows.
+    columns = []
+    for label in keys:
+        ctype = table._get_type(label)
+        cells = [row.get(label) for row in rows]
+        if isinstance(ctype, ConditionType):
+            intervals = []
+            for cell in cells:
+                if cell is WILD_CARD or cell is NOT_APPLICABLE:
+                    continue
+                interval = _interval_of(cell)
+                if interval is None:
+                    raise TableMarkupError(
+                        "Cannot check the condition '%s' of %s"
+                        % (getattr(cell, 'expression', cell), label))
+                intervals.append(interval)
+            domains = _elementary_intervals(_bounds_of(intervals))
+            matched = [[cell is WILD_CARD or cell is not NOT_APPLICABLE
+                        and _interval_of(cell).includes(domain)
+                        for cell in cells] for domain in domains]
+        else:
+            domains = []
+            for cell in cells:
+                if (cell is not WILD_CARD and cell is not NOT_APPLICABLE
+                        and not any(_equals(cell, d) for d in domains)):
+                    domains.append(cell)
+            # An input that is not written in the column
+            domains = domains or [WILD_CARD]
+            matched = [[cell is WILD_CARD or cell is not NOT_APPLICABLE
+                        and domain is not WILD_CARD
+                        and _equals(cell, domain)
+                        for cell in cells] for domain in domains]
+        columns.append((label, domains, matched))
+
+    gaps = []
+
+    def search(k, positions, inputs):
+        """Find gaps in the k-th and the following columns."""
+        if not positions:
+            gaps.append(inputs)
+            return
+        if k == len(columns) or len(gaps) >= 10:
+            return
+        label, domains, matched = columns[k]
+        for domain, matches in zip(domains, matched):
+            search(k + 1, [p for p in positions if matches[p]],
+                   inputs + [(label, domain)])
+
+    search(0, range(len(rows)), [])
+    if gaps:
+        raise TableMarkupError(
+            'The table is not exhaustive. No row is found for: '
+            + '; '.join([', '.join([_describe_input(label, domain)
+                                    for label, domain in gap])
+                         for gap in gaps]))
+
+
+def _describe_input(label, domain):
+    """Return such as 'a=1' or 'a in Interval[0, 1)'."""
+    if domain is WILD_CARD:
+        return '%s=(any)' % label
+    if isinstance(domain, _Interval):
+        if domain.lower_closed and domain.upper_closed:
+            return '%s=%r' % (label, domain.lower)
+        return '%s in %r' % (label, domain)
+    return '%s=%r' % (label, domain)
+
+
+def _split_rows(rows, size):
+    """Generate lists of at most ``size`` rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _evaluate_chunk(column_types, labels, start, rows, variables, memos):
+    """Evaluate the cells of rows.
+
+    Cells that give the same value without side effects, such as literals
+    and conditions, are evaluated column by column. The other cells, such
+    as ``next(c)``, are evaluated row by row in the order of the text.
+
+    :param start: position of the first row in the table
+    :param memos: dict of evaluated values keyed by cell string per column
+    :return: list of evaluated values of each column
+    """
+    for i, row in enumerate(rows):
+        if len(row) != len(labels):
+            raise TableMarkupError(
+                'Row %d has %d cells, expected %d'
+                % (start + i, len(row), len(labels)))
+
+    columns = []
+    # Pairs of the row number and the column number of the other cells
+    others = []
+    for j, (coltype, label) in enumerate(zip(column_types, labels)):
+        expressions = [row[j] for row in rows]
+        numbers = range(len(rows))
+        if not coltype.pure_evaluate:
+            impure = {expression for expression in set(expressions)
+                      if not _is_pure_cell(coltype, expression, memos[j])}
+            if impure:
+                numbers = []
+                for i, expression in enumerate(expressions):
+                    if expression in impure:
+                        others.append((i, j))
+                    else:
+                        numbers.append(i)
+                expressions = [expressions[i] for i in numbers]
+        values = [None] * len(rows)
+        _evaluate_cells(coltype, label, expressions,
+                        [start + i for i in numbers], variables, memos[j],
+                        values, numbers)
+        columns.append(values)
+
+    others.sort()
+    for i, j in others:
+        _evaluate_cells(column_types[j], labels[j], [rows[i][j]],
+                        [start + i], variables, memos[j], columns[j], [i])
+    return columns
+
+
+def _is_pure_cell(coltype, expression, memo):
+    """Return True if evaluating the cell has no side effect."""
+    return (expression in memo
+            or expression == WILD_CARD.directive
+            or expression == NOT_APPLICABLE.directive
+            # A simple literal is found faster than by _is_constant.
+            or ValueType.literal_pattern.match(expression) is not None
+            or _is_constant(expression))
+
+
+def _evaluate_cells(coltype, label, expressions, positions, variables, memo,
+                    values, numbers):
+    """Evaluate cells of a column into ``values`` at the numbers.
+
+    :param positions: positions of the rows of the cells in the table
+    """
+    if not expressions:
+        return
+    try:
+        evaluated = coltype.evaluate_column(
+            expressions, variables, label, memo)
+    except Exception as error:
+        _locate_error(error, coltype, expressions, variables, label,
+                      positions)
+        raise
+    for i, value in zip(numbers, evaluated):
+        values[i] = value
+
+
+def _locate_error(error, coltype, expressions, variables, label, positions):
+    """Add the row and the column of the failed cell to the error message.
+
+    The cells are evaluated again one by one to find the failed one.
+    """
+    position = None
+    for expression, row_position in zip(expressions, positions):
+        try:
+            coltype.evaluate(expression, variables, label)
+        except Exception:
+            position = row_position
+            break
+    if position is None:
+        context = '(column %s)' % label
+    else:
+        context = '(row %d, column %s)' % (position, label)
+
+    if isinstance(error, SyntaxError):
+        error.msg = '%s %s' % (error.msg, context)
+    elif error.args and isinstance(error.args[0], str):
+        error.args = ('%s %s' % (error.args[0], context),) + error.args[1:]
+
+
+def compile_parallel(text, executor, **variables):
+    """Compile a table text evaluating the cells on a pool of workers.
+
+    Rows are split into chunks, and each chunk is evaluated on the
+    executor. The chunks are inserted in order, so the table is the same
+    as one compiled by ``compile``.
+
+    Threads help only if the evaluation releases the GIL. A
+    ``ProcessPoolExecutor`` evaluates cells truly in parallel, but the
+    variables and the evaluated values must be picklable. Thus condition
+    columns, which are evaluated to functions, cannot be compiled in
+    processes.
+
+    :param text: a table text
+    :param executor: a ``concurrent.futures.Executor`` or
+                     the number of worker threads
+    :param variables: values passed to the table
+    :return: a table object
+    :rtype: Table
+    :raise TableMarkupError: the text format is incorrect
+
+    :Example:
+
+        >>> table = compile_parallel('''
+        ... | A | B |
+        ... |---|---|
+        ... | 1 | b |
+        ... ''', 2, b=2)
+        >>> table.select(A=1)
+        Tuple(A=1, B=2)
+
+    """
+    lines = strip_lines(text.splitlines())
+    fmt = estimate_format(lines)
+    headers, rows = fmt.parse(lines)
+    if isinstance(executor, int):
+        with concurrent.futures.ThreadPoolExecutor(executor) as pool:
+            return _compile_rows(headers, rows, variables, pool)
+    return _compile_rows(headers, rows, variables, executor)
+
+
+def compile_async(text, **variables):
+    """Compile a table text in a worker thread.
+
+    This is the same as ``compile`` but does not block the event loop.
+    Call it in a coroutine and await the result.
+
+    :return: an awaitable object of a table object
+
+    :Example:
+
+        >>> async def main():
+        ...     table = await compile_async('''
+        ...         | A | B |
+        ...         |---|---|
+        ...         | 1 | b |''', b=2)
+        ...     return table.select(A=1)
+        >>> asyncio.run(main())
+        Tuple(A=1, B=2)
+
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(
+        None, functools.partial(compile, text, **variables))
+
+
+def load_async(file, **variables):
+    """Compile a table text in a file in a worker thread.
+
+    This is the same as ``compile_file`` but does not block the event loop.
+
+    :param file: a path or a file object of a table text
+    :param variables: values passed to the table
+    :return: an awaitable object of a table object
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(
+        None, functools.partial(compile_file, file, **variables))
+
+
 def strip_lines(lines):
-    """Remove leading/trailing white lines and indents."""
-    lines = copy.copy(lines)
+    """Remove leading/trailing white lines and indents.
 
+    The lines are scanned once, and only the new list is created.
+    """
+    start, stop, indent = _content_bounds(lines)
+    if not indent:
+        return lines[start:stop]
+    return [line[indent:] for line in itertools.islice(lines, start, stop)]
+
+
+def _content_bounds(lines):
+    """Return the range of the non-white lines and the indent width."""
     def empty_line(line):
         """Return True if the line is white."""
-        white_line_pattern = r'^\s*$'
-        return re.match(white_line_pattern, line) is not None
+        return not line or line.isspace()
 
-    # Remove leading white lines.
-    while True:
-        if not lines:
-            raise TableMarkupError('All lines are empty.')
-        if not empty_line(lines[0]):
-            break
-        del lines[0]
+    # Skip leading white lines.
+    start = 0
+    while start < len(lines) and empty_line(lines[start]):
+        start += 1
+    if start == len(lines):
+        raise TableMarkupError('All lines are empty.')
 
-    # Remove trailing white lines.
-    while True:
-        if not empty_line(lines[-1]):
-            break
-        del lines[-1]
+    # Skip trailing white lines.
+    stop = len(lines)
+    while empty_line(lines[stop - 1]):
+        stop -= 1
 
-    # Remove indent.
     # Count whitespaces of 1st and 2nd row, and regard the smaller one is
     # the indent width. The reason to see the 2nd row is for the case of
     # Markdown table without side '|'s.
     def first_char(line):
         """Return the position of first non-space character."""
-        return re.search(r'\S', line).start()
-
-    indent0 = first_char(lines[0])  # 1st row
-    indent1 = first_char(lines[1])  # 2nd row
-    indent = min(indent0, indent1)
-    lines = [line[indent:] for line in lines]
+        return len(line) - len(line.lstrip())
 
-    return lines
+    indent = first_char(lines[start])
+    if start + 1 < stop:
+        indent = min(indent, first_char(lines[start + 1]))
+    return start, stop, indent
 
 
 def create_table(labels, column_types=None):
@@ -294,7 +751,26 @@ class Table:
         self.tuple_class = None
         self.types_class = None
         self.column_types = None
-        self.rows = []
+        self.rows = _RowList()
+        # Indexes keyed by label, built at the first query. They are told
+        # about every row change by insert() and delete(), so that they are
+        # never rebuilt.
+        self.__indexes = None
+        # Operands of union with their versions and offsets, whose indexes
+        # are reused by the concatenated table
+        self.__index_sources = None
+        # Number of changes by insert() and delete(), and the version when
+        # the indexes were built or last told about a change
+        self.__changes = 0
+        self.__indexes_version = None
+        # If True, select counts the hits of each row for reorder().
+        self.track_hits = False
+        # Hits of the rows in order, made when counted, and the version of
+        # the rows they are counted for
+        self.__hits = None
+        self.__hits_version = None
+        # Answers made by precompute(). Dropped when rows are changed.
+        self._lookup = None
 
     def __str__(self):
         """Return Tab separated values."""
@@ -329,7 +805,224 @@ class Table:
 
         :param row_values: list of values in a row
         """
-        self.rows.append(self.tuple_class(*row_values))
+        self.insert(row_values)
+
+    def _new_table(self):
+        """Return an empty table with the same schema."""
+        table = Table()
+        table.tuple_class = self.tuple_class
+        table.types_class = self.types_class
+        table.column_types = self.column_types
+        return table
+
+    @property
+    def _version(self):
+        """Return the version of the rows, which changes with them.
+
+        Changes of ``rows`` made directly also change the version.
+        """
+        return (self.__changes, getattr(self.rows, 'version', None))
+
+    @property
+    def _indexes(self):
+        """Return indexes keyed by label, which are built at first."""
+        self.__drop_stale_indexes()
+        if self.__indexes is None:
+            self.__indexes = self.__build_indexes()
+            self.__indexes_version = self._version
+        return self.__indexes
+
+    def __drop_stale_indexes(self):
+        """Drop the indexes if the rows were changed without them."""
+        sources = self.__index_sources
+        if sources is not None and any(
+                table._version != version for table, version, _ in sources):
+            # An operand of union was changed after it.
+            self.__indexes = self.__index_sources = None
+        if (self.__indexes is not None
+                and self.__indexes_version != self._version):
+            # ``rows`` was changed directly.
+            self.__indexes = None
+
+    def __build_indexes(self):
+        """Build indexes of the columns whose types can have them."""
+        indexes = {}
+        sources = self.__index_sources
+        for i, (label, column_type) in enumerate(
+                zip(self._labels, self.column_types)):
+            if (type(column_type).build_index
+                    is ColumnTypeBase.build_index):
+                continue
+            if sources is not None:
+                parts = [(table._indexes.get(label), offset)
+                         for table, _, offset in sources]
+                if all(index is not None for index, _ in parts):
+                    indexes[label] = _ConcatIndex(parts)
+                    continue
+            index = column_type.build_index([row[i] for row in self.rows])
+            if index is not None:
+                indexes[label] = index
+        return indexes
+
+    def __change_indexes(self):
+        """Return indexes to be told about a row change, or {}."""
+        self.__drop_stale_indexes()
+        self.__changes += 1
+        if self.__index_sources is not None:
+            # Indexes of the operands are not changed. Build own ones.
+            self.__indexes = self.__index_sources = None
+        return self.__indexes or {}
+
+    def _make_row(self, row_values):
+        """Return a row tuple with the N/A flag set."""
+        row = self.tuple_class(*row_values)
+        # A row that contains N/A is never returned. Remember it once here
+        # instead of scanning the row for every query.
+        # Compare by identity. ``NOT_APPLICABLE in row`` is True for a row
+        # containing WILD_CARD because WILD_CARD equals any value.
+        row._applicable = not any(v is NOT_APPLICABLE for v in row)
+        # Bits of the columns of the wild card, which select skips.
+        wild_cards = 0
+        for i, value in enumerate(row):
+            if value is WILD_CARD:
+                wild_cards |= 1 << i
+        row._wild_cards = wild_cards
+        return row
+
+    def _position(self, position):
+        """Normalize a row position as a list index does."""
+        num_rows = self._num_rows
+        if position < 0:
+            position += num_rows
+        if not 0 <= position < num_rows:
+            raise IndexError('Row position out of range: %d' % position)
+        return position
+
+    def insert(self, row_values, position=None):
+        """Insert a row.
+
+        Rows are kept in order, so ``select`` still returns the first
+        matched row. Indexes of the table are updated in place.
+
+        :param row_values: list of values in a row
+        :param position: position of the new row, or None to append
+        :raise TypeError: the number of the values is wrong
+
+        :Example:
+
+            >>> t = compile('''
+            ... === ===
+            ...  A   B
+            ... === ===
+            ...  1   2
+            ...  *   0
+            ... === ===''')
+            >>> t.insert((2, 4), position=1)
+            >>> t.select(A=2)
+            Tuple(A=2, B=4)
+
+        """
+        row = self._make_row(row_values)
+        if position is None:
+            position = self._num_rows
+        elif position != self._num_rows:
+            position = self._position(position)
+        indexes = self.__change_indexes()
+        hits = self.__counted_hits()
+        self.rows.insert(position, row)
+        for label, index in indexes.items():
+            index.insert(position, row.get(label))
+        self.__indexes_version = self._version
+        if hits is not None:
+            hits.insert(position, 0)
+            self.__hits_version = self._version
+        self._lookup = None
+
+    def delete(self, position):
+        """Delete a row.
+
+        :param position: position of the row
+        :return: the deleted row
+        :raise IndexError: the position is out of range
+
+        :Example:
+
+            >>> t = compile('''
+            ... === ===
+            ...  A   B
+            ... === ===
+            ...  1   2
+            ...  *   0
+            ... === ===''')
+            >>> t.delete(0)
+            Tuple(A=1, B=2)
+            >>> t.select(A=1)
+            Tuple(A=1, B=0)
+
+        """
+        position = self._position(position)
+        indexes = self.__change_indexes()
+        hits = self.__counted_hits()
+        row = self.rows.pop(position)
+        for label, index in indexes.items():
+            index.delete(position, row.get(label))
+        self.__indexes_version = self._version
+        if hits is not None:
+            del hits[position]
+            self.__hits_version = self._version
+        self._lookup = None
+        return row
+
+    @property
+    def _hits(self):
+        """Return the hits of the rows in order, keyed by the positions.
+
+        See ``_keyed_rows`` for the keys.
+        """
+        if self.__hits is None or self.__hits_version != self._version:
+            # Not counted yet, or ``rows`` was changed directly.
+            self.__hits = [0] * self._num_rows
+            self.__hits_version = self._version
+        return self.__hits
+
+    def __counted_hits(self):
+        """Return the hits to be told about a row change, or None."""
+        if self.__hits_version != self._version:
+            self.__hits = None
+        return self.__hits
+
+    def update(self, position, **values):
+        """Replace values in a row.
+
+        :param position: position of the row
+        :param values: pairs of a column label and its new value
+        :return: the updated row
+        :raise IndexError: the position is out of range
+        :raise LookupError: a label is invalid
+
+        :Example:
+
+            >>> t = compile('''
+            ... === ===
+            ...  A   B
+            ... === ===
+            ...  1   2
+            ...  *   0
+            ... === ===''')
+            >>> t.update(0, B=NOT_APPLICABLE)
+            Tuple(A=1, B=NOT_APPLICABLE)
+            >>> t.select_all(A=1)
+            [Tuple(A=1, B=0)]
+
+        """
+        position = self._position(position)
+        for label in values:
+            if label not in self._labels:
+                raise LookupError("Label '%s' is invalid" % label)
+        row = self.rows[position].replace(**values)
+        self.delete(position)
+        self.insert(row, position)
+        return self.rows[position]
 
     def iterator(self):
         """Return an iterator object.
@@ -369,6 +1062,38 @@ class Table:
         """Return self.iterator()."""
         return self.iterator()
 
+    def async_iterator(self, **condition):
+        """Return an asynchronous iterator of the rows matching a condition.
+
+        Rows are selected in a worker thread in batches, so a long scan
+        does not block the event loop. N/A rows are skipped as
+        ``select_all`` does.
+
+        ``async for`` is also available for iterating all the rows.
+
+        :param condition: pairs of a column label and its value
+
+        :Example:
+
+            >>> t = compile('''
+            ... | A | B |
+            ... |---|---|
+            ... | 1 | 1 |
+            ... | 1 |N/A|
+            ... | * | 2 |''')
+            >>> async def main():
+            ...     return [row async for row in t.async_iterator(A=1)]
+            >>> asyncio.run(main())
+            [Tuple(A=1, B=1), Tuple(A=1, B=2)]
+
+        """
+        return _AsyncRowIterator(
+            self.__select(condition, raise_error=False))
+
+    def __aiter__(self):
+        """Return self.async_iterator()."""
+        return self.async_iterator()
+
     def contains(self, values):
         """Check if this table contains given values.
 
@@ -441,7 +1166,40 @@ class Table:
         if not condition:
             raise LookupError("The condition is empty")
 
-        return next(self.__select(condition, raise_error=True))
+        try:
+            row = self._lookup_row(condition)
+        except KeyError:
+            # Not precomputed
+            return next(self.__select(condition, raise_error=True))
+
+        if row is None:
+            raise LookupError(
+                "No row is found for the condition: "
+                + str(self._SelectCondition(condition)))
+        if not _is_applicable(row):
+            raise LookupError(
+                "The result for the condition is not applicable: "
+                + str(self._SelectCondition(condition)))
+        return row.replace(**condition)
+
+    def _lookup_row(self, condition):
+        """Return the first matched row precomputed by ``precompute``.
+
+        :return: the row, or None if no row matches
+        :raise KeyError: the row is not precomputed for the condition
+        """
+        lookup = self._lookup
+        if lookup is not None and lookup.version != self._version:
+            # Rows were changed directly or in a joined table.
+            lookup = self._lookup = None
+        if (lookup is None or self.track_hits
+                or len(condition) != len(lookup.keys)):
+            raise KeyError(tuple(condition))
+        try:
+            return lookup.rows[tuple([condition[k] for k in lookup.keys])]
+        except TypeError:
+            # Unhashable
+            raise KeyError(tuple(condition))
 
     def select_all(self, **condition):
         """Get all rows that match the condition.
@@ -475,6 +1233,8 @@ class Table:
 
         def __init__(self, condition):
             self.condition = condition
+            # Tests of the condition for each row class
+            self.__tests = {}
 
         def __str__(self):
             """Format this objekct to 'key1=value1, key2=value2' style."""
@@ -486,15 +1246,140 @@ class Table:
             """Return items in the condition."""
             return self.condition.items()
 
+        def narrow(self, labels):
+            """Return the condition of the items of the labels."""
+            return type(self)(dict(
+                (k, v) for k, v in self.items() if k in labels))
+
+        def match_batch(self, column_type, values, condition_value):
+            """Return results of ``match_batch`` of the column type."""
+            return column_type.match_batch(values, condition_value)
+
+        def filtered(self, count):
+            """Note the number of rows filtered out before ``match``."""
+
         def match(self, row):
             """Return True if all values in the row match the condition."""
-            for label, condition_value in self.items():
-                row_value = row.get(label)
-                column_type = row.get_type(label)
-                if not column_type.match(row_value, condition_value):
+            try:
+                tests = self.__tests[type(row)]
+            except KeyError:
+                tests = self.__tests[type(row)] = self._tests(row)
+            # Cells of the wild card match any value. Skip them.
+            wild_cards = getattr(row, '_wild_cards', None)
+            if wild_cards is None:
+                # The row was not made by _make_row. Check each cell.
+                for _, i, match, condition_value in tests:
+                    value = row[i]
+                    if value is not WILD_CARD and not match(
+                            value, condition_value):
+                        return False
+                return True
+            for bit, i, match, condition_value in tests:
+                if wild_cards & bit:
+                    continue
+                if not match(row[i], condition_value):
                     return False
             return True
 
+        def _tests(self, row):
+            """Return the tests of the labels for the class of the row.
+
+            A test is a tuple of the bit and the index of the column,
+            the match function and the value in the condition.
+            """
+            labels = row.labels()
+            tests = []
+            for label, condition_value in self.items():
+                column_type = row.get_type(label)
+                i = labels.index(label)
+                tests.append((1 << i, i, column_type.match, condition_value))
+            return tests
+
+    def _match_rows(self, query):
+        """Return a generator of the rows that match the query in order.
+
+        N/A rows are also generated.
+        """
+        for _, row in self._match_keyed_rows(query):
+            yield row
+
+    def _match_keyed_rows(self, query):
+        """Generate the keys and the rows that match the query in order.
+
+        See ``_keyed_rows`` for the keys. N/A rows are also generated.
+        """
+        _, positions = self._candidates(query)
+        if positions is None:
+            keyed_rows = self._filter_batches(query)
+        else:
+            rows = self.rows
+            keyed_rows = ((position, rows[position])
+                          for position in positions)
+        for key, row in keyed_rows:
+            if query.match(row):
+                yield key, row
+
+    def _keyed_rows(self):
+        """Return pairs of the key and the row of all rows in order.
+
+        The key of a row is its position, which identifies the row while
+        the rows are not changed.
+        """
+        return enumerate(self.rows)
+
+    def _filter_batches(self, query):
+        """Return positions and rows that may match the query in order.
+
+        Rows are filtered by ``match_batch`` of the column types that have
+        it. Cells of the wild card and N/A are left to ``query.match``.
+        """
+        batches = []
+        for label, value in query.items():
+            if label not in self._labels:
+                # query.match raises the error.
+                continue
+            i = self._labels.index(label)
+            column_type = self.column_types[i]
+            if column_type.match_batch is not None:
+                batches.append((i, column_type, value))
+        if not batches:
+            return enumerate(self.rows)
+        return self.__filter_batches(query, batches)
+
+    def __filter_batches(self, query, batches):
+        """Generate rows that pass ``match_batch`` with the positions."""
+        start = 0
+        for chunk in _split_rows(self.rows, _MATCH_BATCH_SIZE):
+            keyed_rows = list(enumerate(chunk, start))
+            start += len(chunk)
+            for i, column_type, query_value in batches:
+                values = [row[i] for _, row in keyed_rows]
+                results = query.match_batch(
+                    column_type, values, query_value)
+                keyed_rows = [keyed_row for keyed_row, value, result
+                              in zip(keyed_rows, values, results)
+                              if result or value is WILD_CARD
+                              or value is NOT_APPLICABLE]
+                if not keyed_rows:
+                    break
+            query.filtered(len(chunk) - len(keyed_rows))
+            for keyed_row in keyed_rows:
+                yield keyed_row
+
+    def _candidates(self, query):
+        """Return positions of rows that may match the query in order.
+
+        :return: the label of the index used and the positions, or
+                 (None, None) if no index can be used for the query
+        """
+        for label, value in query.items():
+            index = self._indexes.get(label)
+            if index is not None:
+                positions = index.candidates(value)
+                if positions is not None:
+                    return label, positions
+        return None, None
+
     def __select(self, condition, raise_error):
         """Return a generator to select."""
         def raise_error_if_allowed(message):
@@ -502,14 +1387,16 @@ class Table:
             if raise_error:
                 raise LookupError(message)
 
+        self.__check_labels(condition)
         query = self._SelectCondition(condition)
 
-        for row in self.rows:
-            if not query.match(row):
-                continue
+        for key, row in self._match_keyed_rows(query):
+            # Count the first matched row for select.
+            if raise_error and self.track_hits:
+                self._hits[key] += 1
 
             # If the row is N/A raise an error.
-            if NOT_APPLICABLE in row:
+            if not _is_applicable(row):
                 raise_error_if_allowed(
                     "The result for the condition is not applicable: "
                     + str(query)
@@ -528,6 +1415,13 @@ class Table:
         )
         # stop iteration
 
+    def __check_labels(self, condition):
+        """Raise LookupError if a label in the condition is invalid."""
+        for label in condition:
+            # Check here, as a view or an empty table may test no row.
+            if label not in self._labels:
+                raise LookupError("Label '%s' is invalid" % label)
+
     def union(self, other):
         """Concatenate two tables.
 
@@ -536,6 +1430,10 @@ class Table:
         Two tables must have the same width, the same labels and
         the same type columns.
 
+        The rows are not copied. The concatenated table shares them with
+        the two tables, and modifying any of these tables does not affect
+        the others.
+
         :param other: a table to be concatenated
         :return: the concatenated table
         :raise TypeError: width, labels or columns types are different
@@ -558,9 +1456,15 @@ class Table:
                 % (str(self.column_types), str(other.column_types))
             )
 
-        new_table = copy.copy(self)
-        for row in other.rows:
-            new_table._insert(row)
+        new_table = self._new_table()
+        new_table.rows = self.rows.concat(other.rows)
+        if not isinstance(self, _JoinedTable) and not isinstance(
+                other, _JoinedTable):
+            # Indexes are built from those of the tables when needed.
+            new_table.__index_sources = (
+                (self, self._version, 0),
+                (other, other._version, self._num_rows),
+            )
         return new_table
 
     def __add__(self, other):
@@ -570,14 +1474,21 @@ class Table:
         """
         return self.union(other)
 
-    def join(self, other):
+    def join(self, other, lazy=False):
         """Join two tables.
 
         Tables can be joned also with ``*`` operator.
 
         This method behaves like NATURAL INNER JOIN in SQL.
 
+        If ``lazy`` is True, the joined rows are not built at once. A view
+        of the two tables is returned instead. For each query the view
+        selects rows from the two tables first, and then joins only the
+        selected rows. Changes of the two tables are visible in the view,
+        and the view itself cannot be modified.
+
         :param other: a table to be join
+        :param lazy: return a view instead of a new table
         :return: the joined table
 
         :Example:
@@ -595,64 +1506,18 @@ class Table:
             >>> t3 = t1.join(t2)  # ``t1 * t2`` is equivalent
             >>> t3.select_all()
             [Tuple(A=1, B=1, C=1), Tuple(A=2, B=2, C=0)]
+            >>> t4 = t1.join(t2, lazy=True)
+            >>> t4.select(B=2)
+            Tuple(A=2, B=2, C=0)
 
         """
-        l_labels = list(self._labels)
-        r_labels = list(other._labels)
-        order = (l_labels + r_labels).index
-        union_labels = sorted(set(l_labels) | set(r_labels), key=order)
-
-        def get_ctypes(table):
-            vtype = VirtualType()
-            ctypes = [
-                table._get_type(label, default=vtype) for label in union_labels
-            ]
-            return ctypes
-
-        # labels               LABEL1 LABEL2 LABEL3 LABEL4 LABEL5 LABEL6
-        # left column types    val    cond   str    regex  coll
-        # left column types           regex  str    cond   value  coll
-        #
-        # --> Fill with Virtual
-        # left column types    val    cond   str    regex  coll   Virt
-        # left column types    Virt   regex  str    cond   value  coll
-        #
-        # --> Take join (Info about regex, str or coll are ommited)
-        # union column types   val    cond   val    cond   cond   cond
-        l_ctypes = get_ctypes(self)
-        r_ctypes = get_ctypes(other)
-        union_ctypes = [l.join(r) for l, r in zip(l_ctypes, r_ctypes)]
-
-        joined_table = create_table(union_labels, union_ctypes)
-
-        #        LABEL1    LABEL2    LABEL3
-        # l_row  val1      val2
-        # r_row            val3      val4
-        #
-        # --> Fill with WILD_CARD (Universal Set)
-        # l_row  val1      val2      WILD_CARD
-        # r_row  WILD_CARD val3      val4
-        #
-        # --> Take intersection for each cell
-        # joined val1&     val2&     WILD_CARD&
-        #   row   WILD_CARD  val3     val4
-        #
-        # --> If a cell is empty set (IntersectionNotFound) skip the
-        #     row, else add to the joined table.
-        for l_row, r_row in itertools.product(self.rows, other.rows):
-            joined_row = []
-            for label, ctype in zip(union_labels, union_ctypes):
-                # If the row does not have the label, return the wild card.
-                l_value = l_row.get(label, default=WILD_CARD)
-                r_value = r_row.get(label, default=WILD_CARD)
-                try:
-                    value = ctype.join_values(l_value, r_value)
-                except IntersectionNotFound:
-                    break
-                joined_row.append(value)
-            else:
-                joined_table._insert(joined_row)
+        view = _JoinedTable(self, other)
+        if lazy:
+            return view
 
+        joined_table = view._new_table()
+        for row in view.rows:
+            joined_table._insert(row)
         return joined_table
 
     def __mul__(self, other):
@@ -662,19 +1527,1883 @@ class Table:
         """
         return self.join(other)
 
+    def analyze(self, keys=None, optimize=False):
+        """Find rows shadowed by earlier rows and rows overlapping.
 
-def get_column_type(directive):
-    """Return a column type that matches the given directive."""
-    for type_cls in (
-        ValueType,
-        ConditionType,
-        StringType,
-        RegexType,
-        CollectionType,
-    ):
-        if directive in type_cls.directives:
-            return type_cls()
-    raise TableMarkupError("Invalid directive '%s'" % directive)
+        A row is shadowed if an earlier row matches every query that the
+        row matches. ``select`` never returns such a row since it returns
+        the first matched row. Two rows overlap if a query can match both.
+
+        Cells are compared with the semantics of the column types: equal
+        values, the wild card, ranges of conditions such as ``0 <= a < 2``,
+        elements of collections and literal regexes. Cells that cannot be
+        compared are assumed not to shadow, but to overlap.
+
+        :param keys: labels of the columns queried, all columns by default
+        :param optimize: make a copy of the table without shadowed rows.
+                         ``select`` of the copy returns the same rows,
+                         ``select_all`` may not.
+        :return: pairs of the positions of shadowed rows and shadowing
+                 rows, pairs of the positions of overlapping rows, and the
+                 optimized copy or None
+        :rtype: Analysis (named tuple)
+        :raise LookupError: a label is invalid
+
+        :Example:
+
+            >>> t = compile('''
+            ... === === ==
+            ...  A   B   C
+            ... === === ==
+            ...  1   *  10
+            ...  1   2  20
+            ...  *   2  30
+            ... === === ==''')
+            >>> t.analyze(keys=['A', 'B'])
+            Analysis(shadowed=[(1, 0)], overlaps=[(0, 2)], table=None)
+
+        """
+        if keys is None:
+            keys = self._labels
+        for label in keys:
+            if label not in self._labels:
+                raise LookupError("Label '%s' is invalid" % label)
+        columns = [(self._labels.index(label), self._get_type(label))
+                   for label in keys]
+
+        rows = list(self.rows)
+        shadowed = []
+        alive = []
+        for j, row in enumerate(rows):
+            for i in alive:
+                if all(_covers(ctype, rows[i][c], row[c])
+                       for c, ctype in columns):
+                    shadowed.append((j, i))
+                    break
+            else:
+                alive.append(j)
+
+        overlaps = []
+        for k, j in enumerate(alive):
+            for i in alive[:k]:
+                if all(_overlaps(ctype, rows[i][c], rows[j][c])
+                       for c, ctype in columns):
+                    overlaps.append((i, j))
+
+        table = None
+        if optimize:
+            table = self._new_table()
+            for j in alive:
+                table.insert(rows[j])
+        return _Analysis(shadowed, overlaps, table)
+
+    def reorder(self, queries=None, keys=None):
+        """Return a copy of the table with frequently hit rows first.
+
+        Rows are moved only across rows that no query can match together,
+        so ``select`` of the copy returns the same rows as this table for
+        queries including all the ``keys``.
+
+        The hits of rows are counted by selecting a sample of queries.
+        Without the sample, the hits counted by ``select`` are used while
+        ``track_hits`` is True.
+
+        :param queries: list of conditions, which are dicts of labels and
+                        values
+        :param keys: labels that queries always include. By default, labels
+                     common to the sample, or no label without the sample,
+                     where rows must be distinct in all columns to be moved
+        :return: a reordered table
+        :raise LookupError: a label is invalid
+
+        :Example:
+
+            >>> t = compile('''
+            ... === ===
+            ...  A   B
+            ... === ===
+            ...  1   2
+            ...  2   4
+            ...  3   6
+            ...  *   0
+            ... === ===''')
+            >>> t2 = t.reorder([{'A': 3}, {'A': 3}, {'A': 2}])
+            >>> [row.A for row in t2.rows]
+            [3, 2, 1, WILD_CARD]
+
+        """
+        keyed_rows = list(self._keyed_rows())
+        rows = [row for _, row in keyed_rows]
+        if queries is None:
+            hits = [self._hits[key] for key, _ in keyed_rows]
+        else:
+            queries = list(queries)
+            if keys is None and queries:
+                keys = set(queries[0])
+                for condition in queries[1:]:
+                    keys &= set(condition)
+                keys = [label for label in self._labels if label in keys]
+            positions = dict((key, i) for i, (key, _) in enumerate(keyed_rows))
+            hits = [0] * len(rows)
+            for condition in queries:
+                query = self._SelectCondition(condition)
+                for key, _ in self._match_keyed_rows(query):
+                    hits[positions[key]] += 1
+                    break
+
+        if keys:
+            for label in keys:
+                if label not in self._labels:
+                    raise LookupError("Label '%s' is invalid" % label)
+            # Queries include all the keys. Rows distinct in a key column
+            # are never matched together.
+            columns = [(self._labels.index(label), self._get_type(label))
+                       for label in keys]
+            combine = all
+        else:
+            # Rows overlapping in a column can be matched together by
+            # a query of the column.
+            columns = list(enumerate(self.column_types))
+            combine = any
+
+        # Each row must follow the rows before it that overlap it.
+        predecessors = [0] * len(rows)
+        successors = [[] for _ in rows]
+        for j, row in enumerate(rows):
+            for i in range(j):
+                if combine(_overlaps(ctype, rows[i][c], row[c])
+                           for c, ctype in columns):
+                    predecessors[j] += 1
+                    successors[i].append(j)
+
+        # Take the most hit row among the rows ready, in the original
+        # order for ties.
+        ready = [(-hits[j], j) for j in range(len(rows))
+                 if not predecessors[j]]
+        heapq.heapify(ready)
+        table = self._new_table()
+        while ready:
+            _, i = heapq.heappop(ready)
+            table.insert(rows[i])
+            for j in successors[i]:
+                predecessors[j] -= 1
+                if not predecessors[j]:
+                    heapq.heappush(ready, (-hits[j], j))
+        return table
+
+    def check_exhaustive(self, keys=None):
+        """Check that any query of the key columns matches some row.
+
+        Then ``select`` never fails to find a row. N/A rows are regarded
+        as found.
+
+        Conditions of the key columns must be ranges such as
+        ``0 <= a < 2``. All numbers are checked, not only integers. The
+        inputs of the other columns are the values written in the column.
+
+        :param keys: labels of the key columns, or None for the condition
+                     columns and the columns having ``*``
+        :raise TableMarkupError: some input matches no row, or a condition
+                                 is not a range
+
+        :Example:
+
+            >>> t = compile('''
+            ... | A (cond) | B |
+            ... |----------|---|
+            ... | A < 0    | 1 |
+            ... | A > 0    | 2 |''')
+            >>> try:
+            ...     t.check_exhaustive()
+            ... except TableMarkupError as e:
+            ...     print(e)
+            The table is not exhaustive. No row is found for: A=0
+
+        """
+        _check_exhaustive(self, keys)
+
+    def explain(self, **condition):
+        """Explain how ``select`` finds the row for the condition.
+
+        The row is selected as ``select`` does, counting the rows and
+        the cells tested, including those tested at once by ``match_batch``
+        and those of the tables joined into a view.
+
+        The access path is one of:
+
+        - ``'lookup'``: the answer precomputed by ``precompute``,
+        - ``'index'``: the candidate rows from the index of ``label``,
+        - ``'scan'``: all the rows,
+        - ``'join'``: rows of joined tables selected with the condition.
+
+        :param condition: pairs of a column label and its value
+        :return: the access path, the label of the index, the labels in
+                 the order of tests, the number of rows examined, the
+                 number of tests per column type, the seconds spent and
+                 the selected row or None
+        :rtype: Explanation (named tuple)
+        :raise LookupError: the condition is empty or has an invalid label
+
+        :Example:
+
+            >>> t = compile('''
+            ... | A (regex) | B (cond) | C |
+            ... |-----------|----------|---|
+            ... | r'a'      | B < 0    | 1 |
+            ... | r'b'      | B < 0    | 2 |
+            ... | *         | B >= 0   | 3 |''')
+            >>> e = t.explain(A='b', B=2)
+            >>> e.path, e.label, e.order, e.rows_examined
+            ('index', 'A', ['A', 'B'], 2)
+            >>> sorted(e.evaluated.items())
+            [('condition', 2), ('regex', 1)]
+            >>> e.row
+            Tuple(A='b', B=2, C=3)
+
+        """
+        # Fail as select does.
+        if not condition:
+            raise LookupError("The condition is empty")
+        self.__check_labels(condition)
+
+        start = time.time()
+        try:
+            row = self._lookup_row(condition)
+        except KeyError:
+            pass
+        else:
+            if row is not None and _is_applicable(row):
+                row = row.replace(**condition)
+            else:
+                row = None
+            return _Explanation(
+                'lookup', None, list(self._lookup.keys), 0, {},
+                time.time() - start, row)
+
+        query = _CountingCondition(condition)
+        if isinstance(self, _JoinedTable):
+            # A view selects rows from the tables without its indexes.
+            path, label = 'join', None
+        else:
+            label, _ = self._candidates(query)
+            path = 'scan' if label is None else 'index'
+        row = next(self._match_rows(query), None)
+        if row is not None:
+            row = (row.replace(**condition) if _is_applicable(row)
+                   else None)
+        return _Explanation(
+            path, label, [k for k, _ in query.items()], query.rows_examined,
+            dict(query.evaluated), time.time() - start, row)
+
+    def precompute(self, keys, domains=None):
+        """Precompute the answers of ``select`` for all inputs of keys.
+
+        The first matched rows are looked up by the inputs in a dict. Thus
+        ``select`` with values of all the keys and no other labels does not
+        evaluate any cell. Other queries are selected as usual.
+
+        The inputs of a value column are the values written in the
+        column unless they are given. The inputs of the other columns must
+        be given. The answers are dropped when rows are inserted or
+        deleted, or for a joined view, when rows of the joined tables are.
+
+        :param keys: labels of the key columns
+        :param domains: dict of labels and iterables of their inputs
+        :raise LookupError: a label is invalid
+        :raise ValueError: inputs of a key are unknown, or there are too
+                           many combinations of inputs
+
+        :Example:
+
+            >>> t = compile('''
+            ... ========== === ===
+            ...  A (cond)   B   C
+            ... ========== === ===
+            ...  A < 2      1   x
+            ...  *          *   y
+            ... ========== === ===''', x=10, y=20)
+            >>> t.precompute(['A', 'B'], {'A': range(4)})
+            >>> t.select(A=1, B=1)
+            Tuple(A=1, B=1, C=10)
+            >>> t.select(A=3, B=1)
+            Tuple(A=3, B=1, C=20)
+
+        """
+        domains = dict(domains or {})
+        inputs = []
+        for label in keys:
+            if label not in self._labels:
+                raise LookupError("Label '%s' is invalid" % label)
+            if label in domains:
+                values = list(domains[label])
+            elif not self._get_type(label).is_set:
+                values = []
+                for row in self.rows:
+                    value = row.get(label)
+                    if (value is not WILD_CARD
+                            and value is not NOT_APPLICABLE
+                            and not any(_equals(value, v) for v in values)):
+                        values.append(value)
+            else:
+                raise ValueError("Inputs of '%s' are unknown" % label)
+            inputs.append(values)
+
+        size = 1
+        for values in inputs:
+            size *= len(values)
+        if size > _LOOKUP_SIZE_LIMIT:
+            raise ValueError('Too many inputs: %d' % size)
+
+        rows = {}
+        for values in itertools.product(*inputs):
+            query = self._SelectCondition(dict(zip(keys, values)))
+            rows[values] = next(self._match_rows(query), None)
+        self._lookup = _Lookup(tuple(keys), rows, self._version)
+
+    def dump(self, file):
+        """Write this table to a binary file.
+
+        The table is written column by column. Numbers are written as
+        arrays, and strings, conditions, regular expressions and other
+        literals are written to a string pool. Use ``load`` or ``loads``
+        to read the table.
+
+        Values of the value, condition, string, regex and collection
+        columns must be Python literals, and variables used in conditions
+        too. Columns of other types are written as the strings returned by
+        ``dump_value`` of the type, and a type without it, such as a joined
+        column, cannot be written.
+
+        :param file: a binary file object
+        :raise TypeError: the table cannot be written
+
+        :Example:
+
+            >>> import io
+            >>> t = compile('''
+            ... | A (cond) | B |
+            ... |----------|---|
+            ... | A < L    | 1 |
+            ... | *        |N/A|''', L=10)
+            >>> f = io.BytesIO()
+            >>> t.dump(f)
+            >>> t2 = loads(f.getvalue())
+            >>> t2.select(A=5)
+            Tuple(A=5, B=1)
+
+        """
+        _Columnar.dump(self, file)
+
+
+class _CountingCondition(Table._SelectCondition):
+    """Condition counting the rows and the cells tested for explain."""
+
+    def __init__(self, condition):
+        Table._SelectCondition.__init__(self, condition)
+        self.rows_examined = 0
+        self.evaluated = collections.Counter()
+        # The condition counting for this one, which is the condition of
+        # the view for those pushed down to the joined tables
+        self.__total = self
+
+    def narrow(self, labels):
+        """Return the condition of the labels counting for this one."""
+        query = Table._SelectCondition.narrow(self, labels)
+        query.__total = self.__total
+        return query
+
+    def match(self, row):
+        """Count the row and test it."""
+        self.__total.rows_examined += 1
+        return Table._SelectCondition.match(self, row)
+
+    def match_batch(self, column_type, values, condition_value):
+        """Count the values and test them at once."""
+        self.__total.evaluated[str(column_type)] += len(values)
+        return Table._SelectCondition.match_batch(
+            self, column_type, values, condition_value)
+
+    def filtered(self, count):
+        """Count the rows filtered out by ``match_batch``."""
+        self.__total.rows_examined += count
+
+    def _tests(self, row):
+        """Return the tests counting calls of the match functions."""
+        tests = []
+        for bit, i, match, value in Table._SelectCondition._tests(self, row):
+            name = str(row.types[i])
+            tests.append((bit, i, self.__counting(match, name), value))
+        return tests
+
+    def __counting(self, match, name):
+        """Return the match function counting calls for the name."""
+        def counting_match(a, b):
+            self.__total.evaluated[name] += 1
+            return match(a, b)
+        return counting_match
+
+
+class _JoinedTable(Table):
+    """View of the join of two tables.
+
+    Rows are joined at each query. See ``Table.join``.
+    """
+
+    def __init__(self, left, right):
+        """Initialize this object."""
+        Table.__init__(self)
+        self.left = left
+        self.right = right
+        # Hits keyed by the pairs of the keys of rows, and the versions of
+        # the tables they are counted for
+        self.__hits = None
+        self.__hits_version = None
+
+        l_labels = list(left._labels)
+        r_labels = list(right._labels)
+        order = (l_labels + r_labels).index
+        union_labels = sorted(set(l_labels) | set(r_labels), key=order)
+
+        def get_ctypes(table):
+            vtype = VirtualType()
+            ctypes = [
+                table._get_type(label, default=vtype) for label in union_labels
+            ]
+            return ctypes
+
+        # labels               LABEL1 LABEL2 LABEL3 LABEL4 LABEL5 LABEL6
+        # left column types    val    cond   str    regex  coll
+        # left column types           regex  str    cond   value  coll
+        #
+        # --> Fill with Virtual
+        # left column types    val    cond   str    regex  coll   Virt
+        # left column types    Virt   regex  str    cond   value  coll
+        #
+        # --> Take join (Info about regex, str or coll are ommited)
+        # union column types   val    cond   val    cond   cond   cond
+        l_ctypes = get_ctypes(left)
+        r_ctypes = get_ctypes(right)
+        union_ctypes = [lt.join(rt) for lt, rt in zip(l_ctypes, r_ctypes)]
+
+        schema = create_table(union_labels, union_ctypes)
+        self.tuple_class = schema.tuple_class
+        self.column_types = schema.column_types
+
+    @property
+    def rows(self):
+        """Return the joined rows."""
+        rows = _RowList()
+        for _, row in self._keyed_rows():
+            rows.append(row)
+        return rows
+
+    @rows.setter
+    def rows(self, rows):
+        """Ignore the rows set by Table.__init__."""
+
+    @property
+    def _version(self):
+        """Return the versions of the joined tables."""
+        return (self.left._version, self.right._version)
+
+    @property
+    def _hits(self):
+        """Return the hits, which are dropped when the tables change."""
+        if self.__hits_version != self._version:
+            self.__hits = collections.Counter()
+            self.__hits_version = self._version
+        return self.__hits
+
+    def _keyed_rows(self):
+        """Generate the joined rows with the pairs of the keys of rows."""
+        r_rows = list(self.right._keyed_rows())
+        for l_key, l_row in self.left._keyed_rows():
+            for r_key, r_row in r_rows:
+                row = self.__join_row(l_row, r_row)
+                if row is not None:
+                    yield (l_key, r_key), row
+
+    def insert(self, row_values, position=None):
+        """Raise TypeError. A view cannot be modified."""
+        raise TypeError('A joined view cannot be modified')
+
+    def delete(self, position):
+        """Raise TypeError. A view cannot be modified."""
+        raise TypeError('A joined view cannot be modified')
+
+    def _match_keyed_rows(self, query):
+        """Select rows from both tables and join them."""
+        # Push the condition down to both tables. A joined cell is the
+        # intersection of the cells, so a joined row matching the query
+        # is made only of rows matching it.
+        l_query = query.narrow(self.left._labels)
+        r_query = query.narrow(self.right._labels)
+
+        r_rows = list(self.right._match_keyed_rows(r_query))
+        if not r_rows:
+            return
+        for l_key, l_row in self.left._match_keyed_rows(l_query):
+            for r_key, r_row in r_rows:
+                row = self.__join_row(l_row, r_row)
+                # The intersection can be narrower than both cells.
+                if row is not None and query.match(row):
+                    yield (l_key, r_key), row
+
+    def __join_row(self, l_row, r_row):
+        """Return the joined row of a pair, or None if they are disjoint."""
+        labels = self._labels
+        ctypes = self.column_types
+
+        #        LABEL1    LABEL2    LABEL3
+        # l_row  val1      val2
+        # r_row            val3      val4
+        #
+        # --> Fill with WILD_CARD (Universal Set)
+        # l_row  val1      val2      WILD_CARD
+        # r_row  WILD_CARD val3      val4
+        #
+        # --> Take intersection for each cell
+        # joined val1&     val2&     WILD_CARD&
+        #   row   WILD_CARD  val3     val4
+        #
+        # --> If a cell is empty set (IntersectionNotFound) skip the
+        #     row, else add to the joined table.
+        joined_row = []
+        for label, ctype in zip(labels, ctypes):
+            # If the row does not have the label, return the wild card.
+            l_value = l_row.get(label, default=WILD_CARD)
+            r_value = r_row.get(label, default=WILD_CARD)
+            try:
+                value = ctype.join_values(l_value, r_value)
+            except IntersectionNotFound:
+                return None
+            joined_row.append(value)
+        return self._make_row(joined_row)
+
+
+def load(file):
+    """Read a table written by ``Table.dump`` from a binary file.
+
+    See ``loads``.
+
+    :param file: a binary file object
+    :return: a table object
+    :rtype: Table
+    :raise TableMarkupError: the data is broken
+    """
+    return loads(file.read())
+
+
+def loads(data):
+    """Read a table written by ``Table.dump`` from a bytes-like object.
+
+    Arrays in the data are read through ``memoryview`` without copying,
+    so ``bytes`` and ``mmap`` objects are read directly.
+
+    Loading runs Python code written in the data. Cells of condition
+    columns, and of column types dumped as strings, are evaluated by the
+    column types as in ``compile``. Do not load data from untrusted
+    sources.
+
+    :param data: a bytes-like object
+    :return: a table object
+    :rtype: Table
+    :raise TableMarkupError: the data is broken
+    """
+    return _Columnar.load(memoryview(data))
+
+
+class _Columnar:
+    """Binary columnar format of tables.
+
+    All numbers are little-endian, and sections are aligned to 8 bytes. ::
+
+        magic 'ITBL', version, number of columns, number of rows
+        string pool     count, offsets (count + 1), UTF-8 bytes
+        columns         label, type directive and encoding of each column
+        variables       names and literals used in conditions
+        column data     wild card bitmap, N/A bitmap and values of each
+                        column
+
+    Values are encoded as int64 or float64 arrays, or as uint32 arrays
+    of indexes of the string pool.
+    """
+
+    magic = b'ITBL'
+    version = 1
+
+    # Encodings of column values. TEXT is a string evaluated by the column
+    # type.
+    INT64, FLOAT64, STRING, LITERAL, CONDITION, REGEX, TEXT = range(7)
+
+    typecodes = {INT64: 'q', FLOAT64: 'd'}
+
+    @classmethod
+    def dump(cls, table, file):
+        """Write a table."""
+        strings = []
+        string_ids = {}
+
+        def pool(string):
+            """Return the index of a string in the pool."""
+            if string not in string_ids:
+                string_ids[string] = len(strings)
+                strings.append(string)
+            return string_ids[string]
+
+        num_rows = table._num_rows
+        columns = []
+        data = []
+        variables = {}
+        for i, (label, ctype) in enumerate(
+                zip(table._labels, table.column_types)):
+            if ctype.dump_value is None and type(ctype) not in (
+                    ValueType, ConditionType, StringType, RegexType,
+                    CollectionType):
+                raise TypeError("Column type '%s' cannot be dumped" % ctype)
+            values = [row[i] for row in table.rows]
+            encoding, payload = cls.__encode(ctype, values, pool, variables)
+            columns.append((pool(label), pool('(%s)' % ctype), encoding))
+            wild_cards = cls.__bitmap(v is WILD_CARD for v in values)
+            not_applicables = cls.__bitmap(
+                v is NOT_APPLICABLE for v in values)
+            data.append((wild_cards, not_applicables, payload))
+        variable_ids = [
+            (pool(name), pool(literal))
+            for name, literal in sorted(variables.items())
+        ]
+
+        out = bytearray()
+        out += cls.magic
+        out += struct.pack('<III', cls.version, len(columns), num_rows)
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = [0]
+        for string in encoded:
+            offsets.append(offsets[-1] + len(string))
+        out += struct.pack('<I', len(strings))
+        out += cls.__array('I', offsets)
+        out += b''.join(encoded)
+        cls.__align(out)
+        for column in columns:
+            out += struct.pack('<III', *column)
+        out += struct.pack('<I', len(variable_ids))
+        for ids in variable_ids:
+            out += struct.pack('<II', *ids)
+        cls.__align(out)
+        for wild_cards, not_applicables, payload in data:
+            out += wild_cards
+            out += not_applicables
+            cls.__align(out)
+            out += payload
+            cls.__align(out)
+        file.write(out)
+
+    @classmethod
+    def __encode(cls, ctype, values, pool, variables):
+        """Return the encoding and the bytes of column values."""
+        normal = [
+            v for v in values if v is not WILD_CARD and v is not NOT_APPLICABLE
+        ]
+
+        def fill(encode, default):
+            """Encode values, and fill the special values with default."""
+            return [
+                default if v is WILD_CARD or v is NOT_APPLICABLE
+                else encode(v)
+                for v in values
+            ]
+
+        if ctype.dump_value is not None:
+            encoding = cls.TEXT
+            ids = fill(lambda v: pool(ctype.dump_value(v)), 0)
+        elif isinstance(ctype, ConditionType):
+            for function in normal:
+                cls.__collect_variables(function, variables)
+            encoding = cls.CONDITION
+            ids = fill(lambda f: pool(cls.__expression(f)), 0)
+        elif isinstance(ctype, RegexType):
+            for regex in normal:
+                if (not isinstance(regex.pattern, str)
+                        or regex.flags & ~re.UNICODE):
+                    raise TypeError('Regex %r cannot be dumped' % regex)
+            encoding = cls.REGEX
+            ids = fill(lambda r: pool(r.pattern), 0)
+        elif isinstance(ctype, CollectionType):
+            encoding = cls.LITERAL
+            ids = fill(lambda v: pool(cls.__literal(v)), 0)
+        elif all(type(v) is int for v in normal) and all(
+                -2 ** 63 <= v < 2 ** 63 for v in normal):
+            return cls.INT64, cls.__array('q', fill(int, 0))
+        elif all(type(v) is float for v in normal):
+            return cls.FLOAT64, cls.__array('d', fill(float, 0.0))
+        elif all(type(v) is str for v in normal):
+            encoding = cls.STRING
+            ids = fill(pool, 0)
+        else:
+            encoding = cls.LITERAL
+            ids = fill(lambda v: pool(cls.__literal(v)), 0)
+        return encoding, cls.__array('I', ids)
+
+    @staticmethod
+    def __literal(value):
+        """Return the repr of a value that can be evaluated back."""
+        literal = repr(value)
+        try:
+            same = ast.literal_eval(literal) == value
+        except (ValueError, SyntaxError):
+            same = False
+        if not same:
+            raise TypeError('Value %s cannot be dumped' % literal)
+        return literal
+
+    @staticmethod
+    def __expression(function):
+        """Return the expression of a condition."""
+        try:
+            return function.expression
+        except AttributeError:
+            raise TypeError('Condition %r cannot be dumped' % function)
+
+    @classmethod
+    def __collect_variables(cls, function, variables):
+        """Add the variables that the function uses."""
+        code_objects = [getattr(function, '__code__', None)]
+        while code_objects:
+            code = code_objects.pop()
+            if code is None:
+                continue
+            for name in code.co_names:
+                if name in function.__globals__ and name != '__builtins__':
+                    variables[name] = cls.__literal(function.__globals__[name])
+            code_objects.extend(
+                c for c in code.co_consts if hasattr(c, 'co_names'))
+
+    @staticmethod
+    def __bitmap(flags):
+        """Return a bitmap of the flags."""
+        bitmap = bytearray()
+        for i, flag in enumerate(flags):
+            if i % 8 == 0:
+                bitmap.append(0)
+            if flag:
+                bitmap[-1] |= 1 << (i % 8)
+        return bitmap
+
+    @staticmethod
+    def __array(typecode, values):
+        """Return little-endian bytes of the values."""
+        values = array.array(typecode, values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values.tobytes()
+
+    @staticmethod
+    def __align(out):
+        """Pad the bytes to 8-byte boundary."""
+        out += b'\0' * (-len(out) % 8)
+
+    # Errors of broken data raised while it is read
+    load_errors = (LookupError, TypeError, ValueError, SyntaxError,
+                   NameError, ArithmeticError, MemoryError, struct.error,
+                   re.error)
+
+    @classmethod
+    def load(cls, view):
+        """Read a table from a memoryview.
+
+        :raise TableMarkupError: the data is broken
+        """
+        try:
+            return cls.__load(view)
+        except TableMarkupError:
+            raise
+        except cls.load_errors as error:
+            raise TableMarkupError(
+                'Broken table dump: %s: %s' % (type(error).__name__, error))
+
+    @classmethod
+    def __load(cls, view):
+        """Read a table from a memoryview raising any error."""
+        reader = _BufferReader(view)
+        if bytes(reader.take(4)) != cls.magic:
+            raise TableMarkupError('Not a table dump')
+        version, num_columns, num_rows = reader.unpack('<III')
+        if version != cls.version:
+            raise TableMarkupError('Unknown version %d' % version)
+
+        count, = reader.unpack('<I')
+        offsets = reader.array('I', count + 1)
+        blob = reader.take(offsets[-1] if count else 0)
+        reader.align()
+
+        def string(i):
+            """Return a string in the pool."""
+            return str(blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+        columns = [reader.unpack('<III') for _ in range(num_columns)]
+        num_variables, = reader.unpack('<I')
+        variables = {}
+        for _ in range(num_variables):
+            name, literal = reader.unpack('<II')
+            variables[string(name)] = ast.literal_eval(string(literal))
+        reader.align()
+
+        labels = [string(label) for label, _, _ in columns]
+        ctypes = [get_column_type(string(d)) for _, d, _ in columns]
+        bitmap_size = (num_rows + 7) // 8
+        column_values = []
+        for label, ctype, (_, _, encoding) in zip(labels, ctypes, columns):
+            wild_cards = reader.take(bitmap_size)
+            not_applicables = reader.take(bitmap_size)
+            reader.align()
+            typecode = cls.typecodes.get(encoding, 'I')
+            values = reader.array(typecode, num_rows)
+            reader.align()
+            decode = None
+            if encoding not in cls.typecodes:
+                decode = cls.__decoder(
+                    encoding, string, variables, label, ctype)
+            elif not (any(wild_cards) or any(not_applicables)):
+                # Arrays of numbers without special values are kept in
+                # the buffer.
+                column_values.append(values)
+                continue
+            values = list(values)
+            for i in range(num_rows):
+                if wild_cards[i >> 3] >> (i & 7) & 1:
+                    values[i] = WILD_CARD
+                elif not_applicables[i >> 3] >> (i & 7) & 1:
+                    values[i] = NOT_APPLICABLE
+                elif decode is not None:
+                    values[i] = decode(values[i])
+            column_values.append(values)
+
+        table = create_table(labels, ctypes)
+        for row in zip(*column_values):
+            table._insert(row)
+        return table
+
+    @classmethod
+    def __decoder(cls, encoding, string, variables, label, ctype):
+        """Return a function to decode a string index in a column."""
+        if encoding == cls.STRING:
+            decode = string
+        elif encoding == cls.LITERAL:
+            def decode(i):
+                return ast.literal_eval(string(i))
+        elif encoding == cls.CONDITION:
+            def decode(i):
+                return ConditionType.evaluate(
+                    string(i), dict(variables), label)
+        elif encoding == cls.REGEX:
+            def decode(i):
+                return re.compile(string(i))
+        elif encoding == cls.TEXT:
+            def decode(i):
+                return ctype.evaluate(string(i), {}, label)
+        else:
+            raise TableMarkupError('Unknown encoding %d' % encoding)
+
+        # The same string is decoded once.
+        cache = {}
+
+        def cached(i):
+            if i not in cache:
+                cache[i] = decode(i)
+            return cache[i]
+        return cached
+
+
+class _BufferReader:
+    """Sequential reader of a memoryview."""
+
+    def __init__(self, view):
+        self.view = view.cast('B')
+        self.offset = 0
+
+    def take(self, size):
+        """Return the next bytes as a memoryview."""
+        if self.offset + size > len(self.view):
+            raise TableMarkupError('Unexpected end of the data')
+        part = self.view[self.offset:self.offset + size]
+        self.offset += size
+        return part
+
+    def unpack(self, fmt):
+        """Unpack the next bytes with the struct format."""
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+
+    def array(self, typecode, count):
+        """Return the next little-endian array without copying."""
+        part = self.take(array.array(typecode).itemsize * count)
+        if sys.byteorder == 'little':
+            return part.cast(typecode)
+        values = array.array(typecode, part.tobytes())
+        values.byteswap()
+        return values
+
+    def align(self):
+        """Skip padding to 8-byte boundary."""
+        self.take(-self.offset % 8)
+
+
+class _AsyncRowIterator:
+    """Asynchronous iterator that takes rows in a worker thread."""
+
+    batch_size = 256
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.batch = collections.deque()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        """Return an awaitable object of the next row."""
+        loop = asyncio.get_running_loop()
+        if not self.batch:
+            return loop.run_in_executor(None, self.__fetch)
+        future = loop.create_future()
+        future.set_result(self.batch.popleft())
+        return future
+
+    def __fetch(self):
+        """Take the next batch and return the first row of it."""
+        self.batch.extend(itertools.islice(self.rows, self.batch_size))
+        if not self.batch:
+            raise StopAsyncIteration
+        return self.batch.popleft()
+
+
+def _shift_positions(lists, position, delta):
+    """Add delta to the positions from the position in sorted lists."""
+    for positions in lists:
+        if positions and positions[-1] >= position:
+            for i in range(bisect.bisect_left(positions, position),
+                           len(positions)):
+                positions[i] += delta
+
+
+def _remove_position(positions, position):
+    """Remove the position from a sorted list."""
+    del positions[bisect.bisect_left(positions, position)]
+
+
+class _RegexIndex:
+    """Index of a regex column.
+
+    The patterns of a column are merged into alternations of blocks of
+    rows such as ``(p0)|(p1)|(p2)``. A match of an alternation tells the
+    first row in the block whose pattern matches, since ``re`` tries the
+    alternatives in order. The rest of the block is checked one by one.
+    A change of a row compiles only its block again.
+
+    Patterns with groups or flags cannot be merged. Their rows and
+    special values are always candidates.
+    """
+
+    block_size = 64
+
+    def __init__(self, values):
+        self.patterns = [self.__mergeable(value) for value in values]
+        # Rows whose patterns cannot be merged, and blocks of the positions,
+        # the patterns and the alternation of the other rows, which are
+        # built at the first lookup
+        self.__others = None
+        self.__blocks = None
+
+    @staticmethod
+    def __mergeable(pattern):
+        """Return the pattern if it can be merged, otherwise None."""
+        if (isinstance(pattern, _REGEX_TYPE)
+                and isinstance(pattern.pattern, str)
+                and pattern.groups == 0
+                and pattern.flags == _REGEX_TYPE_FLAGS):
+            return pattern
+        return None
+
+    def insert(self, position, value):
+        pattern = self.__mergeable(value)
+        self.patterns.insert(position, pattern)
+        if self.__blocks is None:
+            return
+        blocks = self.__blocks
+        _shift_positions(
+            [self.__others] + [block[0] for block in blocks], position, 1)
+        if pattern is None:
+            bisect.insort(self.__others, position)
+            return
+        # The block of the rows around the position
+        k = len(blocks) - 1
+        for i, block in enumerate(blocks):
+            if block[0][-1] > position:
+                k = i
+                break
+        if not blocks:
+            blocks.append([[], [], None])
+            k = 0
+        positions, patterns, _ = block = blocks[k]
+        i = bisect.bisect_left(positions, position)
+        positions.insert(i, position)
+        patterns.insert(i, pattern)
+        block[2] = None
+        if len(positions) >= 2 * self.block_size:
+            half = len(positions) // 2
+            blocks[k:k + 1] = [[positions[:half], patterns[:half], None],
+                               [positions[half:], patterns[half:], None]]
+
+    def delete(self, position, value):
+        pattern = self.patterns.pop(position)
+        if self.__blocks is None:
+            return
+        blocks = self.__blocks
+        if pattern is None:
+            _remove_position(self.__others, position)
+        else:
+            for k, block in enumerate(blocks):
+                positions, patterns, _ = block
+                if positions[-1] >= position:
+                    i = bisect.bisect_left(positions, position)
+                    del positions[i]
+                    del patterns[i]
+                    block[2] = None
+                    if not positions:
+                        del blocks[k]
+                    break
+        _shift_positions(
+            [self.__others] + [block[0] for block in blocks], position, -1)
+
+    def candidates(self, value):
+        if not isinstance(value, str):
+            return None
+        if self.__blocks is None:
+            self.__build()
+        return heapq.merge(self.__others, self.__matches(value))
+
+    def __build(self):
+        """Split the rows into blocks."""
+        others = []
+        positions = []
+        patterns = []
+        for position, pattern in enumerate(self.patterns):
+            if pattern is None:
+                others.append(position)
+            else:
+                positions.append(position)
+                patterns.append(pattern)
+        size = self.block_size
+        self.__others = others
+        self.__blocks = [
+            [positions[i:i + size], patterns[i:i + size], None]
+            for i in range(0, len(patterns), size)]
+
+    def __matches(self, value):
+        """Generate positions of rows whose pattern matches the value."""
+        for block in self.__blocks:
+            positions, patterns, alternation = block
+            if alternation is None:
+                alternation = block[2] = re.compile(
+                    '|'.join(['(%s)' % p.pattern for p in patterns]))
+            match = alternation.match(value)
+            if match is None:
+                continue
+            i = match.lastindex - 1
+            yield positions[i]
+            for i in range(i + 1, len(patterns)):
+                if patterns[i].match(value):
+                    yield positions[i]
+
+
+class _ConcatIndex:
+    """Index of a concatenated table made of the indexes of the tables.
+
+    This index is not changed. The table builds its own index instead
+    when its rows are changed.
+    """
+
+    def __init__(self, parts):
+        # Pairs of an index and the position of its first row
+        self.parts = parts
+
+    def candidates(self, value):
+        lists = []
+        for index, offset in self.parts:
+            positions = index.candidates(value)
+            if positions is None:
+                return None
+            if offset:
+                positions = (position + offset for position in positions)
+            lists.append(positions)
+        return itertools.chain.from_iterable(lists)
+
+
+class _CollectionIndex:
+    """Index of a collection column.
+
+    Each element of the collections is mapped to the positions of the rows
+    whose collection contains it. Rows of the wild card and collections
+    that are not built-in containers of hashable elements, such as
+    ``range`` objects or strings, are kept apart and always candidates.
+    """
+
+    def __init__(self, values):
+        self.elements = [self.__elements(value) for value in values]
+        self.__map = None
+        self.__others = None
+
+    @staticmethod
+    def __elements(collection):
+        """Return a frozenset of the elements, or None if not indexable."""
+        if collection is NOT_APPLICABLE:
+            return frozenset()
+        if type(collection) in (tuple, list, set, frozenset, dict):
+            try:
+                return frozenset(collection)
+            except TypeError:
+                pass
+        return None
+
+    def insert(self, position, value):
+        elements = self.__elements(value)
+        if self.__map is not None:
+            self.__shift(position, 1)
+            self.__add(position, elements)
+        self.elements.insert(position, elements)
+
+    def delete(self, position, value):
+        elements = self.elements.pop(position)
+        if self.__map is not None:
+            for positions in self.__lists(elements):
+                _remove_position(positions, position)
+            for element in elements or ():
+                if not self.__map[element]:
+                    del self.__map[element]
+            self.__shift(position, -1)
+
+    def candidates(self, value):
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        if self.__map is None:
+            self.__map = {}
+            self.__others = []
+            for position, elements in enumerate(self.elements):
+                self.__add(position, elements)
+        return heapq.merge(self.__map.get(value, ()), self.__others)
+
+    def __lists(self, elements):
+        """Return the lists of positions of a row of the elements."""
+        if elements is None:
+            return [self.__others]
+        return [self.__map.setdefault(element, []) for element in elements]
+
+    def __add(self, position, elements):
+        """Add a row to the map."""
+        for positions in self.__lists(elements):
+            bisect.insort(positions, position)
+
+    def __shift(self, position, delta):
+        """Shift the positions of the rows from the position."""
+        # Each list is shifted once.
+        lists = {}
+        for elements in self.elements[position:]:
+            for positions in self.__lists(elements):
+                lists[id(positions)] = positions
+        _shift_positions(lists.values(), position, delta)
+
+
+class _IntervalIndex:
+    """Index of a condition column.
+
+    The bounds of the intervals of the conditions, such as ``0 <= a < 2``,
+    split the values into elementary ranges, each of which is a bound or
+    is between two bounds. Rows are listed in order for each range. A
+    value is looked up with a binary search of the bounds, or with an
+    array if the bounds are small integers.
+
+    Conditions that are not intervals and the wild card are listed in
+    every range. A new bound splits a range into three. Bounds of deleted
+    rows are kept, which only leaves finer ranges.
+    """
+
+    # Maximum number of row positions listed in all the ranges
+    size_limit = 1 << 20
+    # Maximum width of integer bounds for the array
+    dense_limit = 4096
+
+    def __init__(self, values):
+        self.intervals = [self.__interval(value) for value in values]
+        # Bounds, rows of the ranges, the array of ranges of integers and
+        # the number of row positions listed, built at the first lookup
+        self.__built = None
+
+    @staticmethod
+    def __interval(cell):
+        """Return the interval, None for any value, False for no value."""
+        if cell is NOT_APPLICABLE:
+            return False
+        return _interval_of(cell)
+
+    def insert(self, position, value):
+        interval = self.__interval(value)
+        self.intervals.insert(position, interval)
+        if self.__built is None:
+            return
+        bounds, ranges, dense, size = self.__built
+        if ranges is None:
+            # Too large. Try again at the next lookup.
+            self.__built = None
+            return
+        split = False
+        if interval:
+            for bound in (interval.lower, interval.upper):
+                if bound is None:
+                    continue
+                i = bisect.bisect_left(bounds, bound)
+                if i < len(bounds) and bounds[i] == bound:
+                    continue
+                bounds.insert(i, bound)
+                rows = ranges[2 * i]
+                ranges[2 * i:2 * i + 1] = [rows, list(rows), list(rows)]
+                size += 2 * len(rows)
+                split = True
+        _shift_positions(ranges, position, 1)
+        if interval is not False:
+            first, last = self.__ranges_of(bounds, ranges, interval)
+            size += last - first + 1
+            for i in range(first, last + 1):
+                bisect.insort(ranges[i], position)
+        if size > self.size_limit:
+            self.__built = bounds, None, None, size
+        elif split:
+            self.__built = bounds, ranges, self.__dense(bounds), size
+        else:
+            self.__built = bounds, ranges, dense, size
+
+    def delete(self, position, value):
+        interval = self.intervals.pop(position)
+        if self.__built is None:
+            return
+        bounds, ranges, dense, size = self.__built
+        if ranges is None:
+            self.__built = None
+            return
+        if interval is not False:
+            first, last = self.__ranges_of(bounds, ranges, interval)
+            size -= last - first + 1
+            for i in range(first, last + 1):
+                _remove_position(ranges[i], position)
+        _shift_positions(ranges, position, -1)
+        self.__built = bounds, ranges, dense, size
+
+    def candidates(self, value):
+        if (not isinstance(value, (int, float))
+                or isinstance(value, bool) or value != value):
+            return None
+        return self._lookup(value)
+
+    def _lookup(self, value):
+        """Return positions of rows whose intervals may contain the value."""
+        if self.__built is None:
+            self.__built = self.__build()
+        bounds, ranges, dense, _ = self.__built
+        if ranges is None:
+            # Too large
+            return None
+        if dense is not None and type(value) is int:
+            offset = value - bounds[0]
+            if offset < 0:
+                return ranges[0]
+            if offset >= len(dense):
+                return ranges[-1]
+            return ranges[dense[offset]]
+        return ranges[_range_of(bounds, value)]
+
+    @staticmethod
+    def __ranges_of(bounds, ranges, interval):
+        """Return the first and the last ranges of a row."""
+        if interval is None:
+            return 0, len(ranges) - 1
+        return _ranges_of(bounds, interval)
+
+    def __build(self):
+        """List rows for each range."""
+        bounds = _bounds_of([i for i in self.intervals if i])
+        ranges = [[] for _ in range(2 * len(bounds) + 1)]
+        size = 0
+        for position, interval in enumerate(self.intervals):
+            if interval is False:
+                continue
+            first, last = self.__ranges_of(bounds, ranges, interval)
+            size += last - first + 1
+            if size > self.size_limit:
+                return bounds, None, None, size
+            for i in range(first, last + 1):
+                ranges[i].append(position)
+        return bounds, ranges, self.__dense(bounds), size
+
+    def __dense(self, bounds):
+        """Return the array of ranges of integers, or None."""
+        if (bounds and all(type(b) is int for b in bounds)
+                and bounds[-1] - bounds[0] < self.dense_limit):
+            return array.array('l', [
+                _range_of(bounds, value)
+                for value in range(bounds[0], bounds[-1] + 1)])
+        return None
+
+
+def _bounds_of(intervals):
+    """Return the sorted bounds of intervals."""
+    bounds = set()
+    for interval in intervals:
+        for bound in (interval.lower, interval.upper):
+            if bound is not None:
+                bounds.add(bound)
+    return sorted(bounds)
+
+
+def _range_of(bounds, value):
+    """Return the index of the elementary range containing the value.
+
+    Range ``2 * i + 1`` is ``bounds[i]`` itself, and range ``2 * i`` is
+    between ``bounds[i - 1]`` and ``bounds[i]``.
+    """
+    i = bisect.bisect_left(bounds, value)
+    if i < len(bounds) and bounds[i] == value:
+        return 2 * i + 1
+    return 2 * i
+
+
+def _ranges_of(bounds, interval):
+    """Return the first and the last elementary ranges in an interval."""
+    if interval.lower is None:
+        first = 0
+    else:
+        first = 2 * bisect.bisect_left(bounds, interval.lower) + 1
+        if not interval.lower_closed:
+            first += 1
+    if interval.upper is None:
+        last = 2 * len(bounds)
+    else:
+        last = 2 * bisect.bisect_left(bounds, interval.upper) + 1
+        if not interval.upper_closed:
+            last -= 1
+    return first, last
+
+
+def _elementary_intervals(bounds):
+    """Return the elementary ranges split by the bounds as intervals."""
+    intervals = []
+    lower = None
+    for bound in bounds:
+        intervals.append(_Interval(lower, bound))
+        intervals.append(_Interval(bound, bound, True, True))
+        lower = bound
+    intervals.append(_Interval(lower, None))
+    return intervals
+
+
+class _DateRangeIndex(_IntervalIndex):
+    """Index of a date range column.
+
+    Queries are converted to dates and looked up in the elementary ranges.
+    """
+
+    def candidates(self, value):
+        try:
+            value = _date_of(value)
+        except (ValueError, TypeError):
+            return None
+        return self._lookup(value)
+
+
+class _NetworkIndex:
+    """Index of an IP network column.
+
+    Networks are mapped to the positions of the rows by the leading bits of
+    the network address for each prefix length, which is a radix tree
+    flattened into a hash table per level. An address is looked up with
+    one probe for each prefix length in the column. Rows of the wild card
+    are always candidates.
+    """
+
+    def __init__(self, values):
+        self.keys = [self.__key(value) for value in values]
+        self.__levels = None
+        self.__others = None
+
+    @staticmethod
+    def __key(network):
+        """Return (version, prefix length, leading bits) of a network.
+
+        None is returned if it is not indexable, and () for N/A.
+        """
+        if network is NOT_APPLICABLE:
+            return ()
+        try:
+            shift = network.max_prefixlen - network.prefixlen
+            bits = int(network.network_address) >> shift
+        except (AttributeError, TypeError):
+            return None
+        return network.version, network.prefixlen, bits
+
+    def insert(self, position, value):
+        key = self.__key(value)
+        if self.__levels is not None:
+            self.__shift(position, 1)
+            self.__add(position, key)
+        self.keys.insert(position, key)
+
+    def delete(self, position, value):
+        key = self.keys.pop(position)
+        if self.__levels is None:
+            return
+        if key is None:
+            _remove_position(self.__others, position)
+        elif key:
+            version, prefixlen, bits = key
+            levels = self.__levels[version]
+            positions = levels[prefixlen][bits]
+            _remove_position(positions, position)
+            if not positions:
+                del levels[prefixlen][bits]
+                if not levels[prefixlen]:
+                    # Do not probe the prefix length any more.
+                    del levels[prefixlen]
+        self.__shift(position, -1)
+
+    def candidates(self, value):
+        try:
+            network = _ip_network(value)
+        except (ValueError, TypeError):
+            return None
+        if self.__levels is None:
+            self.__levels = {}
+            self.__others = []
+            for position, key in enumerate(self.keys):
+                self.__add(position, key)
+        address = int(network.network_address)
+        max_prefixlen = network.max_prefixlen
+        lists = [self.__others]
+        for prefixlen, table in self.__levels.get(network.version, {}).items():
+            if prefixlen <= network.prefixlen:
+                positions = table.get(address >> (max_prefixlen - prefixlen))
+                if positions is not None:
+                    lists.append(positions)
+        return heapq.merge(*lists)
+
+    def __lists(self, key):
+        """Return the lists of positions of a row of the key."""
+        if key is None:
+            return [self.__others]
+        if not key:
+            return []
+        version, prefixlen, bits = key
+        table = self.__levels.setdefault(version, {}).setdefault(
+            prefixlen, {})
+        return [table.setdefault(bits, [])]
+
+    def __add(self, position, key):
+        """Add a row to the levels."""
+        for positions in self.__lists(key):
+            bisect.insort(positions, position)
+
+    def __shift(self, position, delta):
+        """Shift the positions of the rows from the position."""
+        # Each list is shifted once.
+        lists = {}
+        for key in self.keys[position:]:
+            for positions in self.__lists(key):
+                lists[id(positions)] = positions
+        _shift_positions(lists.values(), position, delta)
+
+
+class _PrefixIndex:
+    """Index of a prefix or glob column.
+
+    Rows are mapped by the prefixes of the cells, which are the literal
+    characters before the first wildcard for globs. A string is looked up
+    with one probe of its leading characters for each length of the
+    prefixes, so the cost depends on the length of the string and not on
+    the number of rows. Rows of the wild card are always candidates.
+    """
+
+    def __init__(self, values):
+        self.prefixes = [self.__prefix(value) for value in values]
+        self.__map = None
+        self.__lengths = None
+        self.__others = None
+
+    @staticmethod
+    def __prefix(cell):
+        """Return the prefix, None if not indexable, False for N/A."""
+        if cell is NOT_APPLICABLE:
+            return False
+        if isinstance(cell, _Glob):
+            return cell.prefix
+        if isinstance(cell, str):
+            return cell
+        return None
+
+    def insert(self, position, value):
+        prefix = self.__prefix(value)
+        if self.__map is not None:
+            self.__shift(position, 1)
+            self.__add(position, prefix)
+        self.prefixes.insert(position, prefix)
+
+    def delete(self, position, value):
+        prefix = self.prefixes.pop(position)
+        if self.__map is None:
+            return
+        if prefix is None:
+            _remove_position(self.__others, position)
+        elif prefix is not False:
+            positions = self.__map[prefix]
+            _remove_position(positions, position)
+            if not positions:
+                del self.__map[prefix]
+                self.__lengths[len(prefix)] -= 1
+                if not self.__lengths[len(prefix)]:
+                    del self.__lengths[len(prefix)]
+        self.__shift(position, -1)
+
+    def candidates(self, value):
+        if not isinstance(value, str):
+            return None
+        if self.__map is None:
+            self.__map = {}
+            # Number of the prefixes of each length
+            self.__lengths = collections.Counter()
+            self.__others = []
+            for position, prefix in enumerate(self.prefixes):
+                self.__add(position, prefix)
+        lists = [self.__others]
+        for length in self.__lengths:
+            positions = self.__map.get(value[:length])
+            if positions is not None:
+                lists.append(positions)
+        return heapq.merge(*lists)
+
+    def __lists(self, prefix):
+        """Return the lists of positions of a row of the prefix."""
+        if prefix is None:
+            return [self.__others]
+        if prefix is False:
+            return []
+        if prefix not in self.__map:
+            self.__map[prefix] = []
+            self.__lengths[len(prefix)] += 1
+        return [self.__map[prefix]]
+
+    def __add(self, position, prefix):
+        """Add a row to the map."""
+        for positions in self.__lists(prefix):
+            bisect.insort(positions, position)
+
+    def __shift(self, position, delta):
+        """Shift the positions of the rows from the position."""
+        # Each list is shifted once.
+        lists = {}
+        for prefix in self.prefixes[position:]:
+            for positions in self.__lists(prefix):
+                lists[id(positions)] = positions
+        _shift_positions(lists.values(), position, delta)
+
+
+class _RowList(collections.abc.MutableSequence):
+    """List of rows stored in chunks that can be shared among tables.
+
+    Concatenation shares the chunk lists of both lists instead of copying
+    the rows; they are joined into one chunk list when the rows are first
+    read. A shared chunk is copied before it is modified, so a change in
+    one list never appears in another list.
+    """
+
+    chunk_size = 512
+
+    def __init__(self, chunks=()):
+        # A concatenated list keeps a tree of the chunk lists to join.
+        self.__pending = None
+        self.__length = 0
+        # The chunk list is referred from a pending tree of another list.
+        self.__frozen = False
+        self.__reset([chunk for chunk in chunks if chunk])
+        # Number of changes of the rows
+        self.version = 0
+
+    def __reset(self, chunks):
+        """Set the chunks, all of which are shared."""
+        self._chunks = chunks
+        self._shared = [True] * len(chunks)
+        # _ends[k] is the number of rows in the chunks 0..k.
+        self._ends = []
+        for chunk in chunks:
+            self._ends.append(len(self) + len(chunk))
+
+    def __len__(self):
+        """Return the number of rows."""
+        if self.__pending is not None:
+            return self.__length
+        return self._ends[-1] if self._ends else 0
+
+    def __iter__(self):
+        """Iterate rows in order."""
+        self.__resolve()
+        return itertools.chain.from_iterable(self._chunks)
+
+    def __getitem__(self, position):
+        """Return the row at the position or a list of rows in the slice."""
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        self.__resolve()
+        k, offset = self.__locate(position)
+        return self._chunks[k][offset]
+
+    def __setitem__(self, position, row):
+        """Replace the row at the position or the rows in the slice."""
+        self.version += 1
+        if isinstance(position, slice):
+            rows = list(self)
+            rows[position] = row
+            self.__replace(rows)
+            return
+        self.__thaw()
+        k, offset = self.__locate(position)
+        self.__own(k)[offset] = row
+
+    def __delitem__(self, position):
+        """Remove the row at the position or the rows in the slice."""
+        self.version += 1
+        if isinstance(position, slice):
+            rows = list(self)
+            del rows[position]
+            self.__replace(rows)
+            return
+        self.__thaw()
+        k, offset = self.__locate(position)
+        self.__own(k).pop(offset)
+        self.__shift_ends(k, -1)
+        if not self._chunks[k]:
+            del self._chunks[k]
+            del self._shared[k]
+            del self._ends[k]
+
+    def __eq__(self, other):
+        """Compare the rows with those of a list."""
+        if isinstance(other, (list, _RowList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        """Return the rows like a list."""
+        return repr(list(self))
+
+    def concat(self, other):
+        """Return a new list of the rows of both lists."""
+        rows = _RowList()
+        rows.__pending = (self.__tree(), other.__tree())
+        rows.__length = len(self) + len(other)
+        return rows
+
+    def insert(self, position, row):
+        """Insert a row before the position."""
+        self.version += 1
+        self.__thaw()
+        if position < 0:
+            position = max(position + len(self), 0)
+        if position >= len(self):
+            if (not self._chunks or self._shared[-1]
+                    or len(self._chunks[-1]) >= self.chunk_size):
+                self._chunks.append([row])
+                self._shared.append(False)
+                self._ends.append(len(self) + 1)
+                return
+            k, offset = len(self._chunks) - 1, len(self._chunks[-1])
+        else:
+            k, offset = self.__locate(position)
+        chunk = self.__own(k)
+        chunk.insert(offset, row)
+        self.__shift_ends(k, 1)
+        if len(chunk) > 2 * self.chunk_size:
+            self.__split(k)
+
+    def __tree(self):
+        """Return the chunk lists of the rows to refer from another list."""
+        if self.__pending is not None:
+            return self.__pending
+        self.__frozen = True
+        return self._chunks
+
+    def __resolve(self):
+        """Join the chunk lists of a concatenated list."""
+        if self.__pending is None:
+            return
+        chunks = []
+        stack = [self.__pending]
+        while stack:
+            tree = stack.pop()
+            if isinstance(tree, tuple):
+                stack.extend(reversed(tree))
+            else:
+                chunks.extend(tree)
+        self.__pending = None
+        self.__reset(chunks)
+
+    def __thaw(self):
+        """Prepare the chunk list to be modified."""
+        self.__resolve()
+        if self.__frozen:
+            # The chunks are referred from another list from now on.
+            self.__reset(list(self._chunks))
+            self.__frozen = False
+
+    def __replace(self, rows):
+        """Replace all the rows."""
+        self.__resolve()
+        self.__frozen = False
+        self.__reset([])
+        for position in range(0, len(rows), self.chunk_size):
+            self._chunks.append(rows[position:position + self.chunk_size])
+            self._shared.append(False)
+            self._ends.append(len(self) + len(self._chunks[-1]))
+
+    def __locate(self, position):
+        """Return the chunk number and the offset in it of a position."""
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('Row position out of range: %d' % position)
+        k = bisect.bisect_right(self._ends, position)
+        start = self._ends[k - 1] if k else 0
+        return k, position - start
+
+    def __own(self, k):
+        """Return the k-th chunk after copying it if it is shared."""
+        if self._shared[k]:
+            self._chunks[k] = list(self._chunks[k])
+            self._shared[k] = False
+        return self._chunks[k]
+
+    def __shift_ends(self, k, delta):
+        """Add delta to the ends of the k-th and following chunks."""
+        for i in range(k, len(self._ends)):
+            self._ends[i] += delta
+
+    def __split(self, k):
+        """Split the k-th chunk in halves."""
+        chunk = self._chunks[k]
+        half = len(chunk) // 2
+        self._chunks[k:k + 1] = [chunk[:half], chunk[half:]]
+        self._shared[k:k + 1] = [False, False]
+        self._ends.insert(k, self._ends[k] - len(chunk) + half)
+
+
+def _is_applicable(row):
+    """Return True if the row contains no N/A.
+
+    The flag set by ``Table._make_row`` is used if the row has it.
+    """
+    applicable = getattr(row, '_applicable', None)
+    if applicable is None:
+        applicable = not any(v is NOT_APPLICABLE for v in row)
+    return applicable
+
+
+def _intern(value):
+    """Intern a string value, and return other values as they are."""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_constant(expression):
+    """Return True if the string is a literal or a name of a variable.
+
+    Evaluating such a string always gives the same value.
+    """
+    expression = expression.strip()
+    if expression.isidentifier():
+        return True
+    try:
+        ast.literal_eval(expression)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return False
+    return True
+
+
+def register_column_type(type_cls):
+    """Register a column type class for its directives.
+
+    The class derives ``ValueTypeBase`` or ``SetTypeBase`` and has
+    ``directives``, ``evaluate(expression, variables, label)`` and
+    ``match(cell_value, query_value)``. It may have ``build_index(values)``
+    and ``match_batch(values, query_value)`` to speed up select, and
+    ``dump_value(value)`` to be written by ``Table.dump``. See
+    ``ColumnTypeBase``.
+
+    :param type_cls: the column type class
+    :return: the class, so that this function can be used as a decorator
+    :raise ValueError: a directive is already registered
+
+    :Example:
+
+        >>> @register_column_type
+        ... class UpperType(ValueTypeBase):
+        ...     directives = ('(upper)',)
+        ...     def __str__(self):
+        ...         return 'upper'
+        ...     @staticmethod
+        ...     def evaluate(expression, variables, label):
+        ...         return expression.upper()
+        ...     @staticmethod
+        ...     def match(a, b):
+        ...         return a == b.upper()
+        >>> t = compile('''
+        ... | name (upper) | id |
+        ... |--------------|----|
+        ... | alice        | 1  |
+        ... | bob          | 2  |
+        ... ''')
+        >>> t.select(name='Bob').id
+        2
+        >>> unregister_column_type(UpperType)
+
+    """
+    for directive in _directives_of(type_cls):
+        for registered in _column_types:
+            if directive in _directives_of(registered):
+                raise ValueError("Directive '%s' is already registered"
+                                 % directive)
+    _column_types.append(type_cls)
+    return type_cls
+
+
+def unregister_column_type(type_cls):
+    """Remove a column type class added by register_column_type."""
+    _column_types.remove(type_cls)
+
+
+def get_column_type(directive):
+    """Return a column type that matches the given directive."""
+    for type_cls in _column_types:
+        if directive in _directives_of(type_cls):
+            return type_cls()
+    raise TableMarkupError("Invalid directive '%s'" % directive)
+
+
+def _directives_of(type_cls):
+    """Return the directives of a column type class as a tuple.
+
+    A string such as ``'(upper), (up)'`` is split at commas.
+    """
+    directives = type_cls.directives
+    if isinstance(directives, str):
+        return tuple([d.strip() for d in directives.split(',')])
+    return tuple(directives)
 
 
 class ColumnTypeBase:
@@ -685,6 +3414,70 @@ class ColumnTypeBase:
     def __eq__(self, other):
         return self.directives == other.directives
 
+    # A function ``match_batch(values, query_value)`` that returns a list of
+    # results of ``match`` for the cell values, or None. Results for
+    # cells of the wild card and N/A are ignored.
+    match_batch = None
+
+    # True if ``evaluate`` gives equal values for a string without running
+    # it, so that all cells of the string can share the value.
+    pure_evaluate = False
+
+    # A function ``dump_value(value)`` that returns a string from which
+    # ``evaluate`` makes the value again without variables, or None if the
+    # column cannot be written by Table.dump. ``'(%s)' % column_type``
+    # must be a directive of the type to read the column.
+    dump_value = None
+
+    def build_index(self, values):
+        """Return an index of the column, or None if it has no index.
+
+        An index has ``insert(position, value)`` and
+        ``delete(position, value)`` methods, which are called with the cell
+        value on every row change, and ``candidates(value)``, which returns
+        positions of rows in order that may match the value, or None if the
+        value cannot be looked up.
+
+        :param values: list of cell values of the column in order
+        """
+        return None
+
+    def evaluate_column(self, expressions, variables, label, memo=None):
+        """Evaluate strings in cells of the column.
+
+        A string that is a literal or a name of a variable, or any string of
+        a type with ``pure_evaluate``, is evaluated once. Its value is
+        shared by all cells of the same string if hashable, and is kept in
+        ``memo`` for the following calls. Other strings such as ``next(c)``
+        are evaluated in every cell. Strings are interned.
+
+        :param expressions: list of strings in cells
+        :param memo: dict of evaluated values keyed by strings
+        :return: list of evaluated values
+        """
+        if memo is None:
+            memo = {}
+        evaluate = self.evaluate
+        pure = self.pure_evaluate
+        values = []
+        for expression in expressions:
+            try:
+                value = memo[expression]
+            except KeyError:
+                value = _intern(evaluate(expression, variables, label))
+                if value is WILD_CARD or value is NOT_APPLICABLE:
+                    memo[expression] = value
+                elif pure or _is_constant(expression):
+                    try:
+                        hash(value)
+                    except TypeError:
+                        # Do not share mutable values such as lists.
+                        pass
+                    else:
+                        memo[expression] = value
+            values.append(value)
+        return values
+
 
 class ValueTypeBase(ColumnTypeBase):
     """Abstract class of value type types."""
@@ -708,7 +3501,7 @@ class SetTypeBase(ColumnTypeBase):
     is_set = True
 
     def join(self, other):
-        if other.is_set:
+        if other.is_set or isinstance(other, VirtualType):
             return SetXSetType(self, other)
         else:
             return SetXValueType(self, other)
@@ -738,6 +3531,47 @@ class ValueType(ValueTypeBase):
                 return spacial_value
         return eval(expression, variables)
 
+    # A number, a string without escapes or a name
+    literal_pattern = re.compile(r"""
+        [-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?\Z
+        |'[^'\\\n]*'\Z
+        |"[^"\\\n]*"\Z
+        |[a-zA-Z_][a-zA-Z0-9_]*\Z
+        """, re.VERBOSE)
+
+    def evaluate_column(self, expressions, variables, label, memo=None):
+        """Evaluate strings in cells of the column.
+
+        If all new cells are simple literals, they are evaluated at once
+        as a list display, which is much faster than evaluating each cell.
+        """
+        if memo is None:
+            memo = {}
+        literals = []
+        for expression in dict.fromkeys(expressions):
+            if expression in memo:
+                continue
+            for spacial_value in (WILD_CARD, NOT_APPLICABLE):
+                if expression == spacial_value.directive:
+                    memo[expression] = spacial_value
+                    break
+            else:
+                if not self.literal_pattern.match(expression):
+                    return ValueTypeBase.evaluate_column(
+                        self, expressions, variables, label, memo)
+                literals.append(expression)
+
+        if literals:
+            try:
+                values = eval('[%s]' % ','.join(literals), variables)
+            except Exception:
+                # Find the failed cell
+                return ValueTypeBase.evaluate_column(
+                    self, expressions, variables, label, memo)
+            for expression, value in zip(literals, values):
+                memo[expression] = _intern(value)
+        return [memo[expression] for expression in expressions]
+
 
 class ConditionType(SetTypeBase):
     """Conditions.
@@ -746,6 +3580,7 @@ class ConditionType(SetTypeBase):
     """
 
     directives = ('(condition)', '(cond)')
+    pure_evaluate = True
 
     def __str__(self):
         return 'condition'
@@ -764,98 +3599,399 @@ class ConditionType(SetTypeBase):
         :param label: name of column
         :return: function that takes one argument and returns True/False
 
-        :Example:
+        :Example:
+
+            >>> f = ConditionType().evaluate('v > 0', {}, 'value')
+            >>> f(1)
+            True
+            >>> f(-1)
+            False
+
+        """
+        for spacial_value in (WILD_CARD, NOT_APPLICABLE):
+            if expression == spacial_value.directive:
+                return spacial_value
+
+        # Use first letter as symbol
+        symbol = label[0]
+        statement = 'lambda %s: %s' % (symbol, expression)
+        function = eval(statement, variables)
+        # Remember the range of a comparison such as '0 <= a < 2'.
+        # Table.join intersects ranges without calling the functions.
+        function.interval = _Interval.parse(expression, variables, symbol)
+        # Table.dump writes the expression.
+        function.expression = expression
+        return function
+
+    @staticmethod
+    def match(a, b):
+        return a(b)
+
+    def build_index(self, values):
+        return _IntervalIndex(values)
+
+
+class StringType(ValueTypeBase):
+    """Strings.
+
+    Data in this type column is not evaluated as Python literals.
+
+    The wild card and the non-applicable value is not used for this
+    column type.
+    """
+
+    directives = ('(string)', '(str)')
+    pure_evaluate = True
+
+    def __str__(self):
+        return 'string'
+
+    @staticmethod
+    def evaluate(expression, variables, label):
+        # No wild card and N/A
+        return expression
+
+    def evaluate_column(self, expressions, variables, label, memo=None):
+        return [_intern(expression) for expression in expressions]
+
+
+class RegexType(SetTypeBase):
+    """Regular expression.
+
+    The wild card and the non-applicable value is not used for this
+    column type.
+    """
+
+    directives = ('(regex)', '(re)')
+
+    def __str__(self):
+        return 'regex'
+
+    @staticmethod
+    def evaluate(expression, variables, label):
+        for spacial_value in (WILD_CARD, NOT_APPLICABLE):
+            if expression == spacial_value.directive:
+                return spacial_value
+
+        # Evaluate as Python literals and compile as a regular expression.
+        return re.compile(eval(expression, variables))
+
+    def build_index(self, values):
+        return _RegexIndex(values)
+
+    @staticmethod
+    def match(a, b):
+        return bool(a.match(b))
+
+
+class CollectionType(SetTypeBase):
+    """Collection."""
+
+    directives = ('(collection)', '(coll)')
+
+    def __str__(self):
+        return 'collection'
+
+    @staticmethod
+    def evaluate(expression, variables, label):
+        """Evaluate as a python literal except '*' and 'N/A'."""
+        for spacial_value in (WILD_CARD, NOT_APPLICABLE):
+            if expression == spacial_value.directive:
+                return spacial_value
+
+        col = eval(expression, variables)
+        if not col.__contains__:
+            raise ValueError("'%s' is not a collection" % expression)
+        return col
+
+    def build_index(self, values):
+        return _CollectionIndex(values)
+
+    @staticmethod
+    def match(a, b):
+        return b in a
+
+
+class IpType(SetTypeBase):
+    """IP network.
+
+    A cell is a network such as ``10.0.0.0/8`` or an address written
+    without quotes, or a Python expression of them. A query of an address
+    matches the networks containing it. A query of a network matches the
+    networks of which it is a subnet. Other queries raise LookupError.
+    """
+
+    directives = ('(ip)', '(cidr)')
+
+    # Address or network without quotes
+    literal_pattern = re.compile(r'[0-9A-Fa-f]*[.:][0-9A-Fa-f.:]*(/\d+)?\Z')
+
+    def __str__(self):
+        return 'ip'
+
+    @classmethod
+    def evaluate(cls, expression, variables, label):
+        for spacial_value in (WILD_CARD, NOT_APPLICABLE):
+            if expression == spacial_value.directive:
+                return spacial_value
+
+        text = expression.strip()
+        if cls.literal_pattern.match(text):
+            return ipaddress.ip_network(text)
+        return _ip_network(eval(expression, variables))
+
+    @staticmethod
+    def dump_value(value):
+        return str(value)
+
+    def build_index(self, values):
+        return _NetworkIndex(values)
+
+    @staticmethod
+    def match(a, b):
+        b = _query_network(b)
+        return b.network_address in a and b.prefixlen >= a.prefixlen
+
+    @staticmethod
+    def match_batch(values, query_value):
+        query = _query_network(query_value)
+        address = query.network_address
+        prefixlen = query.prefixlen
+        return [value is not WILD_CARD and value is not NOT_APPLICABLE
+                and address in value and prefixlen >= value.prefixlen
+                for value in values]
+
+
+def _ip_network(value):
+    """Return an IP network of a value such as '10.0.0.0/8'.
+
+    An address is converted to the network of only the address.
+
+    :raise ValueError: the value is not an IP address or network
+    """
+    if isinstance(value, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return value
+    return ipaddress.ip_network(value)
+
+
+def _query_network(value):
+    """Return an IP network of a query value.
+
+    :raise LookupError: the value is not an IP address or network
+    """
+    try:
+        return _ip_network(value)
+    except (ValueError, TypeError):
+        raise LookupError('%r is not an IP address or network' % (value,))
+
+
+class DateRangeType(SetTypeBase):
+    """Range of dates.
+
+    A cell is written as ``2020-01-01..2020-12-31``, which includes both
+    ends, or ``2020-01-01...2021-01-01``, which excludes the end. Either end
+    can be omitted for an open range. A single date is the range of the day.
+    Queries are dates, datetimes or strings such as ``'2020-01-31'``. Other
+    queries raise LookupError.
+    """
+
+    directives = ('(daterange)', '(dates)')
+    pure_evaluate = True
 
-            >>> f = ConditionType().evaluate('v > 0', {}, 'value')
-            >>> f(1)
-            True
-            >>> f(-1)
-            False
+    range_pattern = re.compile(r"""
+        \s*(\d{4}-\d\d-\d\d)?          # lower
+        \s*(?:(\.\.\.?)               # '..' or '...'
+        \s*(\d{4}-\d\d-\d\d)?)?\s*\Z  # upper
+        """, re.VERBOSE)
 
-        """
+    def __str__(self):
+        return 'daterange'
+
+    @classmethod
+    def evaluate(cls, expression, variables, label):
         for spacial_value in (WILD_CARD, NOT_APPLICABLE):
             if expression == spacial_value.directive:
                 return spacial_value
 
-        # Use first letter as symbol
-        symbol = label[0]
-        statement = 'lambda %s: %s' % (symbol, expression)
-        return eval(statement, variables)
+        match = cls.range_pattern.match(expression)
+        if not match or not match.group(1) and not match.group(3):
+            raise ValueError("'%s' is not a date range" % expression)
+        lower, dots, upper = match.groups()
+        lower = lower and datetime.date.fromisoformat(lower)
+        upper = upper and datetime.date.fromisoformat(upper)
+        if dots is None:
+            return _DateRange(lower, lower, True, True)
+        date_range = _DateRange(lower, upper, True, dots == '..')
+        try:
+            # Check that the range is not empty.
+            _DateRange().intersect(date_range)
+        except IntersectionNotFound:
+            raise ValueError("'%s' is an empty date range" % expression)
+        return date_range
+
+    @staticmethod
+    def dump_value(value):
+        return str(value)
+
+    def build_index(self, values):
+        return _DateRangeIndex(values)
 
     @staticmethod
     def match(a, b):
-        return a(b)
+        return a(_query_date(b))
 
+    @staticmethod
+    def match_batch(values, query_value):
+        query = _query_date(query_value)
+        return [value is not WILD_CARD and value is not NOT_APPLICABLE
+                and value(query) for value in values]
 
-class StringType(ValueTypeBase):
-    """Strings.
 
-    Data in this type column is not evaluated as Python literals.
+def _date_of(value):
+    """Return a date of a value such as '2020-01-31'.
 
-    The wild card and the non-applicable value is not used for this
-    column type.
+    A datetime is converted to its date.
+
+    :raise ValueError: the string is not a date
+    :raise TypeError: the value is not a date or a string
     """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    raise TypeError('%r is not a date' % (value,))
 
-    directives = ('(string)', '(str)')
 
-    def __str__(self):
-        return 'string'
+def _query_date(value):
+    """Return a date of a query value.
 
-    @staticmethod
-    def evaluate(expression, variables, label):
-        # No wild card and N/A
-        return expression
+    :raise LookupError: the value is not a date
+    """
+    try:
+        return _date_of(value)
+    except (ValueError, TypeError):
+        raise LookupError('%r is not a date' % (value,))
 
 
-class RegexType(SetTypeBase):
-    """Regular expression.
+class PrefixType(SetTypeBase):
+    """String prefix.
 
-    The wild card and the non-applicable value is not used for this
-    column type.
+    A cell is written without quotes, such as ``/api/v1/``, and matches
+    strings starting with it.
     """
 
-    directives = ('(regex)', '(re)')
+    directives = ('(prefix)',)
+    pure_evaluate = True
 
     def __str__(self):
-        return 'regex'
+        return 'prefix'
 
     @staticmethod
     def evaluate(expression, variables, label):
         for spacial_value in (WILD_CARD, NOT_APPLICABLE):
             if expression == spacial_value.directive:
                 return spacial_value
+        return expression
 
-        # Evaluate as Python literals and compile as a regular expression.
-        return re.compile(eval(expression, variables))
+    @staticmethod
+    def dump_value(value):
+        return value
+
+    def build_index(self, values):
+        return _PrefixIndex(values)
 
     @staticmethod
     def match(a, b):
-        return bool(a.match(b))
+        return isinstance(a, str) and isinstance(b, str) and b.startswith(a)
+
+    @staticmethod
+    def match_batch(values, query_value):
+        if not isinstance(query_value, str):
+            return [False] * len(values)
+        startswith = query_value.startswith
+        return [isinstance(value, str) and startswith(value)
+                for value in values]
 
 
-class CollectionType(SetTypeBase):
-    """Collection."""
+class GlobType(SetTypeBase):
+    """Glob pattern.
+
+    A cell is written without quotes, such as ``/api/v*/users``, and matches
+    strings as ``fnmatch.fnmatchcase`` does. A cell of only ``*`` is the
+    wild card.
+    """
 
-    directives = '(collection), (coll)'
+    directives = ('(glob)',)
+    pure_evaluate = True
 
     def __str__(self):
-        return 'collection'
+        return 'glob'
 
     @staticmethod
     def evaluate(expression, variables, label):
-        """Evaluate as a python literal except '*' and 'N/A'."""
         for spacial_value in (WILD_CARD, NOT_APPLICABLE):
             if expression == spacial_value.directive:
                 return spacial_value
+        return _Glob(expression)
 
-        col = eval(expression, variables)
-        if not col.__contains__:
-            raise ValueError("'%s' is not a collection" % expression)
-        return col
+    @staticmethod
+    def dump_value(value):
+        return value.pattern
+
+    def build_index(self, values):
+        return _PrefixIndex(values)
 
     @staticmethod
     def match(a, b):
-        return b in a
+        return a(b)
+
+    @staticmethod
+    def match_batch(values, query_value):
+        if not isinstance(query_value, str):
+            return [False] * len(values)
+        return [isinstance(value, _Glob)
+                and value.regex.match(query_value) is not None
+                for value in values]
+
+
+class _Glob:
+    """Glob pattern in a cell."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.regex = re.compile(fnmatch.translate(pattern))
+        # Literal characters before the first wildcard
+        self.prefix = re.match(r'[^*?\[]*', pattern).group()
+        # (text, end) as _Regex.literal if the glob is such as 'text*'
+        rest = pattern[len(self.prefix):]
+        if rest in ('', '*'):
+            self.literal = (self.prefix, '' if rest else r'\Z')
+        else:
+            self.literal = None
+
+    def __call__(self, x):
+        """Return True if x is a string matching the glob."""
+        return isinstance(x, str) and self.regex.match(x) is not None
+
+    def __repr__(self):
+        """Return such as "Glob('/api/*')"."""
+        return 'Glob(%r)' % self.pattern
+
+
+# Column type classes looked up by get_column_type in order
+_column_types = [
+    ValueType,
+    ConditionType,
+    StringType,
+    RegexType,
+    CollectionType,
+    IpType,
+    DateRangeType,
+    PrefixType,
+    GlobType,
+]
 
 
 #
@@ -863,6 +3999,12 @@ class CollectionType(SetTypeBase):
 #
 class VirtualType(ValueType):
 
+    def join(self, other):
+        # Keep a set column of the other table a set column.
+        if other.is_set:
+            return SetXSetType(self, other)
+        return ValueTypeBase.join(self, other)
+
     @staticmethod
     def evaluate(expression, variables, label):
         assert False, 'Cannot call Virtual.evaluate'
@@ -906,6 +4048,10 @@ class ValueXSetType(ValueType):
         if left_value is NOT_APPLICABLE and right_value is NOT_APPLICABLE:
             return NOT_APPLICABLE
 
+        # Do not pass N/A to a set. It is not a value.
+        if left_value is NOT_APPLICABLE or right_value is NOT_APPLICABLE:
+            raise IntersectionNotFound
+
         if self.right_type.match(right_value, left_value):
             return left_value
 
@@ -927,6 +4073,10 @@ class SetXValueType(ValueType):
         if left_value is NOT_APPLICABLE and right_value is NOT_APPLICABLE:
             return NOT_APPLICABLE
 
+        # Do not pass N/A to a set. It is not a value.
+        if left_value is NOT_APPLICABLE or right_value is NOT_APPLICABLE:
+            raise IntersectionNotFound
+
         if self.left_type.match(left_value, right_value):
             return right_value
 
@@ -939,7 +4089,14 @@ class SetXSetType(ConditionType):
         self.right_type = right_type
 
     def join_values(self, left_value, right_value):
-        """Return intersection of two values."""
+        """Return intersection of two values.
+
+        The values are converted to predicates and conjoined. Ranges and
+        collections are intersected at once, and IntersectionNotFound is
+        raised if the intersection is found to be empty.
+        """
+        left_value = _as_predicate(self.left_type, left_value)
+        right_value = _as_predicate(self.right_type, right_value)
         try:
             return WILD_CARD.get_intercect(left_value, right_value)
         except IntersectionNotFound:
@@ -948,11 +4105,547 @@ class SetXSetType(ConditionType):
         if left_value is NOT_APPLICABLE and right_value is NOT_APPLICABLE:
             return NOT_APPLICABLE
 
-        return lambda x: (
-            self.left_type.match(left_value, x)
-            and self.right_type.match(right_value, x)
+        # N/A and a set have no common value. Same as ValueXValueType.
+        if left_value is NOT_APPLICABLE or right_value is NOT_APPLICABLE:
+            raise IntersectionNotFound
+
+        return _conjoin([left_value, right_value])
+
+
+#
+# Following classes and functions are predicates of joined set cells
+#
+class _Interval:
+    """Range of values such as ``0 <= x < 2``.
+
+    A bound of None means no limit.
+    """
+
+    def __init__(self, lower=None, upper=None,
+                 lower_closed=False, upper_closed=False):
+        self.lower = lower
+        self.upper = upper
+        self.lower_closed = lower_closed
+        self.upper_closed = upper_closed
+
+    # Operators with the variable on the left side.
+    # The bound is (is_lower, is_closed).
+    _operators = {
+        ast.Lt: (False, False),
+        ast.LtE: (False, True),
+        ast.Gt: (True, False),
+        ast.GtE: (True, True),
+    }
+
+    @classmethod
+    def parse(cls, expression, variables, symbol):
+        """Return the interval written in a condition or None.
+
+        The expression is accepted when it compares the symbol with
+        literals or variables, e.g. ``0 <= a < 2`` and ``a > limit``.
+        """
+        try:
+            tree = ast.parse(expression.strip(), mode='eval').body
+        except SyntaxError:
+            return None
+        if not isinstance(tree, ast.Compare) or len(tree.ops) > 2:
+            return None
+
+        operands = [tree.left] + tree.comparators
+        names = [isinstance(o, ast.Name) and o.id == symbol for o in operands]
+        if names.count(True) != 1:
+            return None
+        position = names.index(True)
+        if len(tree.ops) == 2 and position != 1:
+            return None
+
+        interval = cls()
+        for i, op in enumerate(tree.ops):
+            if type(op) not in cls._operators:
+                return None
+            is_lower, is_closed = cls._operators[type(op)]
+            if i == position:
+                bound_node = operands[i + 1]
+            else:
+                # The symbol is on the right side. Flip the operator.
+                bound_node = operands[i]
+                is_lower = not is_lower
+            found, bound = cls.__constant(bound_node, variables)
+            if not found:
+                return None
+            if is_lower:
+                other = cls(lower=bound, lower_closed=is_closed)
+            else:
+                other = cls(upper=bound, upper_closed=is_closed)
+            try:
+                interval = interval.intersect(other)
+            except (IntersectionNotFound, TypeError):
+                return None
+        return interval
+
+    @staticmethod
+    def __constant(node, variables):
+        """Return (True, value) if the node is a literal or a variable."""
+        sign = 1
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            sign, node = -1, node.operand
+        if isinstance(node, ast.Name) and node.id in variables:
+            value = variables[node.id]
+        elif isinstance(node, ast.Constant):
+            value = node.value
+        else:
+            return False, None
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False, None
+        return True, sign * value
+
+    def __call__(self, x):
+        """Return True if x is in the interval."""
+        if self.lower is not None:
+            if self.lower_closed:
+                if not self.lower <= x:
+                    return False
+            elif not self.lower < x:
+                return False
+        if self.upper is not None:
+            if self.upper_closed:
+                return x <= self.upper
+            return x < self.upper
+        return True
+
+    def __repr__(self):
+        """Return such as 'Interval[0, 2)'."""
+        return 'Interval%s%s, %s%s' % (
+            '[' if self.lower_closed else '(',
+            '-inf' if self.lower is None else repr(self.lower),
+            'inf' if self.upper is None else repr(self.upper),
+            ']' if self.upper_closed else ')',
+        )
+
+    def includes(self, other):
+        """Return True if the other interval is a subset of this.
+
+        :raise TypeError: the bounds cannot be compared
+        """
+        if self.lower is not None:
+            if other.lower is None or other.lower < self.lower:
+                return False
+            if (other.lower == self.lower and other.lower_closed
+                    and not self.lower_closed):
+                return False
+        if self.upper is not None:
+            if other.upper is None or other.upper > self.upper:
+                return False
+            if (other.upper == self.upper and other.upper_closed
+                    and not self.upper_closed):
+                return False
+        return True
+
+    def intersect(self, other):
+        """Return the intersection of two intervals.
+
+        :raise IntersectionNotFound: the intersection is empty
+        :raise TypeError: the bounds cannot be compared
+        """
+        lower, lower_closed = self.lower, self.lower_closed
+        if other.lower is not None:
+            if lower is None or other.lower > lower:
+                lower, lower_closed = other.lower, other.lower_closed
+            elif other.lower == lower:
+                lower_closed = lower_closed and other.lower_closed
+
+        upper, upper_closed = self.upper, self.upper_closed
+        if other.upper is not None:
+            if upper is None or other.upper < upper:
+                upper, upper_closed = other.upper, other.upper_closed
+            elif other.upper == upper:
+                upper_closed = upper_closed and other.upper_closed
+
+        if lower is not None and upper is not None:
+            if lower > upper:
+                raise IntersectionNotFound
+            if lower == upper and not (lower_closed and upper_closed):
+                raise IntersectionNotFound
+
+        # Keep the subclass of either side, such as a date range.
+        cls = type(self)
+        if issubclass(type(other), cls):
+            cls = type(other)
+        return cls(lower, upper, lower_closed, upper_closed)
+
+
+class _DateRange(_Interval):
+    """Range of dates, which converts values to dates."""
+
+    def __call__(self, x):
+        """Return True if the date of x is in the range."""
+        return _Interval.__call__(self, _date_of(x))
+
+    def __str__(self):
+        """Return such as '2020-01-01..2020-12-31' as written in cells."""
+        return '%s%s%s' % (
+            '' if self.lower is None else self.lower,
+            '..' if self.upper_closed or self.upper is None else '...',
+            '' if self.upper is None else self.upper,
         )
 
+    def __repr__(self):
+        """Return such as 'DateRange(2020-01-01..2020-12-31)'."""
+        return 'DateRange(%s)' % self
+
+
+class _Members:
+    """Finite set of values made from collections."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __call__(self, x):
+        """Return True if x is a member."""
+        try:
+            return x in self.values
+        except TypeError:
+            # Unhashable
+            return any(v == x for v in self.values)
+
+    def __contains__(self, x):
+        """Return True if x is a member."""
+        return self(x)
+
+    def __repr__(self):
+        """Return such as 'Members(1, 2)'."""
+        return 'Members(%s)' % ', '.join(sorted(map(repr, self.values)))
+
+    def intersect(self, other):
+        """Return the intersection of two sets.
+
+        :raise IntersectionNotFound: the intersection is empty
+        """
+        values = self.values & other.values
+        if not values:
+            raise IntersectionNotFound
+        return _Members(values)
+
+
+class _Regex:
+    """Regular expression as a predicate."""
+
+    # Pattern only with literal characters and optional anchors.
+    _literal_pattern = re.compile(
+        r'\^?((?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*)(\$|\\Z|)\Z')
+
+    def __init__(self, regex):
+        self.regex = regex
+        # (text, end) if the regex is only literal characters. The end is
+        # '' for any following characters, '$' for none or a newline, or
+        # '\Z' for none.
+        self.literal = None
+        pattern = regex.pattern
+        if isinstance(pattern, str) and not regex.flags & ~re.UNICODE:
+            match = self._literal_pattern.match(pattern)
+            if match:
+                text = re.sub(r'\\(.)', r'\1', match.group(1))
+                self.literal = (text, match.group(2))
+        # Literal including every matching string, used by excludes
+        self.scope = self.literal
+
+    def __call__(self, x):
+        """Return True if the regex matches x."""
+        return bool(self.regex.match(x))
+
+    def __repr__(self):
+        """Return the regex."""
+        return repr(self.regex)
+
+    @staticmethod
+    def __strings(literal):
+        """Return the strings matching a literal, or None if unlimited."""
+        text, end = literal
+        if end == '$':
+            return {text, text + '\n'}
+        if end:
+            return {text}
+        return None
+
+    def includes(self, other):
+        """Return True if every string matching the other matches this.
+
+        Regexes are equal, or both have literal characters.
+        """
+        if (self.regex.pattern == other.regex.pattern
+                and self.regex.flags == other.regex.flags):
+            return True
+        if self.literal is None or other.literal is None:
+            return False
+        strings1 = self.__strings(self.literal)
+        strings2 = self.__strings(other.literal)
+        if strings1 is None:
+            return other.literal[0].startswith(self.literal[0])
+        return strings2 is not None and strings2 <= strings1
+
+    def excludes(self, other):
+        r"""Return True if no string matches both regexes.
+
+        Only regexes with literal characters are compared. A literal
+        regex matches strings starting with its text, or only the text
+        with '\Z' at the end. '$' also matches before a trailing newline.
+        """
+        if self.scope is None or other.scope is None:
+            return False
+        strings1 = self.__strings(self.scope)
+        strings2 = self.__strings(other.scope)
+        text1, text2 = self.scope[0], other.scope[0]
+        if strings1 is None and strings2 is None:
+            return not (text1.startswith(text2) or text2.startswith(text1))
+        if strings1 is None:
+            return not any(s.startswith(text1) for s in strings2)
+        if strings2 is None:
+            return not any(s.startswith(text2) for s in strings1)
+        return not strings1 & strings2
+
+
+class _Network:
+    """IP network as a predicate."""
+
+    def __init__(self, network):
+        self.network = network
+
+    def __call__(self, x):
+        """Return True if x is an address or a subnet in the network."""
+        return IpType.match(self.network, x)
+
+    def __repr__(self):
+        """Return such as 'Network(10.0.0.0/8)'."""
+        return 'Network(%s)' % self.network
+
+    def includes(self, other):
+        """Return True if the other network is a subnet of this."""
+        return (self.network.version == other.network.version
+                and self(other.network))
+
+
+class _Conjunction:
+    """Predicates all of which must be satisfied.
+
+    Do not nest conjunctions. Use ``_conjoin`` to create this.
+    """
+
+    def __init__(self, predicates):
+        self.predicates = predicates
+
+    def __call__(self, x):
+        """Return True if x satisfies all the predicates."""
+        for predicate in self.predicates:
+            if not predicate(x):
+                return False
+        return True
+
+    def __repr__(self):
+        """Return such as 'Interval[0, 2) & Members(1)'."""
+        return ' & '.join(map(repr, self.predicates))
+
+
+def _as_predicate(column_type, value):
+    """Convert a value of a set column to a function that takes a value.
+
+    The special values are returned as they are.
+    """
+    if value is WILD_CARD or value is NOT_APPLICABLE:
+        return value
+    if isinstance(column_type, ConditionType):
+        # Including joined set columns
+        return value
+    if isinstance(column_type, RegexType):
+        return _Regex(value)
+    if isinstance(column_type, IpType):
+        return _Network(value)
+    if isinstance(column_type, DateRangeType):
+        # _DateRange is an interval.
+        return value
+    if isinstance(column_type, PrefixType):
+        return _Regex(re.compile(re.escape(value)))
+    if isinstance(column_type, GlobType):
+        regex = _Regex(value.regex)
+        regex.literal = value.literal
+        regex.scope = value.literal or (value.prefix, '')
+        return regex
+    if (isinstance(column_type, CollectionType)
+            and isinstance(value, (tuple, list, set, frozenset))):
+        try:
+            return _Members(frozenset(value))
+        except TypeError:
+            # Unhashable
+            pass
+    return functools.partial(column_type.match, value)
+
+
+def _interval_of(predicate):
+    """Return the interval represented by the predicate or None."""
+    if isinstance(predicate, _Interval):
+        return predicate
+    return getattr(predicate, 'interval', None)
+
+
+def _conjoin(predicates):
+    """Return the conjunction of predicates.
+
+    Nested conjunctions are flattened, intervals and member sets are
+    intersected into one. Members are filtered with the other predicates.
+
+    :raise IntersectionNotFound: the conjunction is never satisfied
+    """
+    flat = []
+    for predicate in predicates:
+        if isinstance(predicate, _Conjunction):
+            flat.extend(predicate.predicates)
+        else:
+            flat.append(predicate)
+
+    interval = None
+    members = None
+    others = []
+    for predicate in flat:
+        other_interval = _interval_of(predicate)
+        if other_interval is not None:
+            if interval is None:
+                interval = other_interval
+                continue
+            try:
+                interval = interval.intersect(other_interval)
+                continue
+            except TypeError:
+                # The bounds are not comparable.
+                pass
+        elif isinstance(predicate, _Members):
+            if members is None:
+                members = predicate
+            else:
+                members = members.intersect(predicate)
+            continue
+        if not any(predicate is p for p in others):
+            others.append(predicate)
+
+    regexes = [p for p in others if isinstance(p, _Regex)]
+    for i, regex in enumerate(regexes):
+        for other in regexes[i + 1:]:
+            if regex.excludes(other):
+                raise IntersectionNotFound
+
+    # Drop regexes implied by another, such as '/api/' by '/api/v1/'.
+    implied = [
+        regex for i, regex in enumerate(regexes)
+        if any(regex.includes(other)
+               and (j < i or not other.includes(regex))
+               for j, other in enumerate(regexes) if j != i)
+    ]
+    others = [p for p in others if not any(p is r for r in implied)]
+
+    # Two networks are disjoint or one includes the other.
+    networks = [p for p in others if isinstance(p, _Network)]
+    if len(networks) > 1:
+        narrowest = max(networks, key=lambda p: p.network.prefixlen)
+        if not all(p.includes(narrowest) for p in networks):
+            raise IntersectionNotFound
+        others = [p for p in others
+                  if not isinstance(p, _Network) or p is narrowest]
+
+    if members is not None:
+        # A finite set can be checked element by element.
+        conditions = [p for p in [interval] + others if p is not None]
+        try:
+            values = frozenset(
+                v for v in members.values if all(p(v) for p in conditions)
+            )
+        except Exception:
+            # Leave the condition to queries. They will raise the same.
+            values = None
+        if values is not None:
+            if not values:
+                raise IntersectionNotFound
+            return _Members(values)
+
+    terms = [p for p in (interval, members) if p is not None] + others
+    if len(terms) == 1:
+        return terms[0]
+    return _Conjunction(terms)
+
+
+def _covers(column_type, a, b):
+    """Return True if every value matching cell b matches cell a.
+
+    False is returned if it is unknown.
+    """
+    if a is WILD_CARD or b is NOT_APPLICABLE:
+        return True
+    if a is NOT_APPLICABLE or b is WILD_CARD:
+        return False
+    if a is b:
+        return True
+    if not column_type.is_set:
+        return _equals(a, b)
+
+    a = _as_predicate(column_type, a)
+    b = _as_predicate(column_type, b)
+    a_interval = _interval_of(a)
+    b_interval = _interval_of(b)
+    if a_interval is not None and b_interval is not None:
+        try:
+            return a_interval.includes(b_interval)
+        except TypeError:
+            return False
+    if isinstance(b, _Members):
+        try:
+            return all(a(v) for v in b.values)
+        except Exception:
+            return False
+    if isinstance(a, _Regex) and isinstance(b, _Regex):
+        return a.includes(b)
+    if isinstance(a, _Network) and isinstance(b, _Network):
+        return a.includes(b)
+    expression = getattr(a, 'expression', None)
+    return (expression is not None
+            and expression == getattr(b, 'expression', None)
+            and getattr(a, '__globals__', None)
+            is getattr(b, '__globals__', None))
+
+
+def _overlaps(column_type, a, b):
+    """Return True if a value can match both cells a and b.
+
+    True is returned if it is unknown.
+    """
+    if a is NOT_APPLICABLE or b is NOT_APPLICABLE:
+        return False
+    if a is WILD_CARD or b is WILD_CARD:
+        return True
+    if not column_type.is_set:
+        return _equals(a, b)
+    try:
+        _conjoin([_as_predicate(column_type, a),
+                  _as_predicate(column_type, b)])
+    except IntersectionNotFound:
+        return False
+    return True
+
+
+def _equals(a, b):
+    """Compare two values. Values that cannot be compared are not equal."""
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+_Lookup = collections.namedtuple('Lookup', ['keys', 'rows', 'version'])
+
+_Explanation = collections.namedtuple(
+    'Explanation',
+    ['path', 'label', 'order', 'rows_examined', 'evaluated', 'seconds',
+     'row'])
+
+_Analysis = collections.namedtuple(
+    'Analysis', ['shadowed', 'overlaps', 'table'])
+
 
 class IntersectionNotFound(Exception):
     """Used for internal controls."""
@@ -1064,12 +4757,19 @@ def estimate_format(lines):
     The lines should be removed leading/trailing white lines and indents.
     Use strip_lines function.
 
+    Only the first, the second and the last lines are seen.
+
     :pram lines: lines of the table text
     :return: estimated table format
     """
-    for fmt in (ReSTSimpleTable, ReSTGridTable, MarkdownTable):
-        if fmt.can_accept(lines):
-            return fmt
+    if len(lines) >= 3:
+        first_line, last_line = lines[0], lines[-1]
+        for fmt in (ReSTSimpleTable, ReSTGridTable):
+            pattern = fmt.border_pattern
+            if pattern.match(first_line) and pattern.match(last_line):
+                return fmt
+        if MarkdownTable.separator_pattern.match(lines[1]):
+            return MarkdownTable
 
     raise TableMarkupError('The table format is unknown.')
 
@@ -1091,8 +4791,8 @@ class ReSTTable:
         last_line = lines[-1]
 
         return bool(
-            re.match(line_pattern, first_line)
-            and re.match(line_pattern, last_line)
+            line_pattern.match(first_line)
+            and line_pattern.match(last_line)
         )
 
     @staticmethod
@@ -1141,10 +4841,14 @@ class ReSTTable:
 class ReSTSimpleTable:
     """reStructuredText Simple Table."""
 
-    @staticmethod
-    def can_accept(lines):
+    border_pattern = re.compile(r'^ *[= ]*= *$')
+    # Column span underline as docutils accepts
+    span_pattern = re.compile(r'-[ -]*$')
+
+    @classmethod
+    def can_accept(cls, lines):
         """Judge if the table is estimated to be this format."""
-        return ReSTTable.can_accept(lines, r'^ *[= ]*= *$')
+        return ReSTTable.can_accept(lines, cls.border_pattern)
 
     @staticmethod
     def parse(lines):
@@ -1180,14 +4884,160 @@ class ReSTSimpleTable:
         """
         return ReSTTable.parse(lines, DocutilsSimpleTableParser())
 
+    @classmethod
+    def iterparse(cls, lines):
+        r"""Parse reStructuredText SimpleTable line by line.
+
+        Only one row is kept in memory at a time. Rows are split as docutils
+        does, and rows of several lines or with column spans are parsed by
+        docutils, so the result is the same as ``parse``.
+
+        :param lines: iterator of lines without indents
+        :return: list of labels and generator of row values
+
+        :Example:
+
+            >>> labels, rows = ReSTSimpleTable.iterparse(iter('''\
+            ... ==== ====
+            ...  A    B
+            ... (a)
+            ... ==== ====
+            ...  a1   b1
+            ...       b2
+            ...  a3   b3
+            ... ==== ====
+            ... '''.splitlines()))
+            >>> labels
+            ['A (a)', 'B']
+            >>> list(rows)
+            [['a1', 'b1 b2'], ['a3', 'b3']]
+
+        """
+        border = next(lines)
+        columns = [m.span() for m in re.finditer(r'=+', border)]
+        first_start, first_end = columns[0]
+
+        def split_cell(line):
+            """Return texts in each column of a line, or None.
+
+            None is returned if there is text in a column margin.
+            """
+            texts = []
+            for i, (start, end) in enumerate(columns):
+                if i + 1 == len(columns):
+                    # The last column can be wider than the border.
+                    texts.append(line[start:].strip())
+                    break
+                if line[end:columns[i + 1][0]].strip():
+                    return None
+                texts.append(line[start:end].strip())
+            return texts
+
+        def parse_rows(row_lines, underline, offset):
+            """Return rows in lines parsed by docutils.
+
+            :param underline: the border or the column span underline
+                              after the lines
+            :param offset: the number of lines before the lines in the
+                           table except the top border
+            """
+            try:
+                data = DocutilsSimpleTableParser().parse(
+                    StringList([border] + row_lines + [underline]))
+            except DocutilsTableMarkupError as e:
+                # Report the line number in the whole table.
+                raise TableMarkupError(re.sub(
+                    r'(?<=table line )\d+',
+                    lambda m: str(int(m.group()) + offset), str(e)))
+            return [[' '.join(c[3]) for c in row] for row in data[2]]
+
+        def split_rows(number):
+            """Generate lines of each row and the underline after them.
+
+            Rows are split as docutils does. A line with text in the first
+            column begins a row, and other lines continue the row. Blank
+            lines before the first line of a row are ignored. A column
+            span underline or a border ends a row.
+
+            :param number: the line number of the first line in the table
+            :return: generator of lines, the underline or None, and the
+                     line number of the row
+            """
+            row_lines = []
+            start = number
+            text_found = False
+            for number, line in enumerate(lines, number):
+                if cls.border_pattern.match(line):
+                    yield row_lines, line, start
+                    return
+                if cls.span_pattern.match(line):
+                    yield row_lines, line, start
+                    row_lines = []
+                    start = number + 1
+                    text_found = False
+                elif line[first_start:first_end].strip():
+                    if text_found:
+                        yield row_lines, None, start
+                    row_lines = [line]
+                    start = number
+                    text_found = True
+                elif text_found:
+                    row_lines.append(line)
+                else:
+                    start = number + 1
+            raise TableMarkupError('The table is not closed.')
+
+        header_lines = []
+        for line in lines:
+            if cls.border_pattern.match(line):
+                break
+            header_lines.append(line)
+        else:
+            raise TableMarkupError('The table has no body.')
+        header = parse_rows(header_lines, line, 0)
+        if not header:
+            raise TableMarkupError('The table has no header.')
+        # Same as ReSTTable.parse
+        labels = [text.strip() for text in header[0]]
+        for row in header[1:]:
+            for i, text in enumerate(row):
+                labels[i] += ' ' + text
+        labels = [label.strip() for label in labels]
+
+        def body():
+            """Generate rows."""
+            number = len(header_lines) + 2
+            for row_lines, underline, start in split_rows(number):
+                spanned = (underline is not None
+                           and not cls.border_pattern.match(underline))
+                if (not spanned and row_lines and row_lines[0].isascii()
+                        and not any(line.strip() for line in row_lines[1:])):
+                    # Fast path of a row of a line and blank lines, which
+                    # do not change the texts
+                    texts = split_cell(row_lines[0])
+                    if texts is not None:
+                        yield texts
+                        continue
+                for row in parse_rows(row_lines, underline or border,
+                                      start - 1):
+                    yield [text.strip() for text in row]
+            for line in lines:
+                if line.strip():
+                    raise TableMarkupError(
+                        'Text after the table: %r' % line)
+
+        return labels, body()
+
 
 class ReSTGridTable:
     """reStructuredText Grid Table."""
 
-    @staticmethod
-    def can_accept(lines):
+    border_pattern = re.compile(r'^ *\+[-\+]*-\+ *$')
+
+    @classmethod
+    def can_accept(cls, lines):
         """Judge if the table is estimated to be this format."""
-        return ReSTTable.can_accept(lines, r'^ *\+[-\+]*-\+ *$')
+        return ReSTTable.can_accept(lines, cls.border_pattern)
 
     @staticmethod
     def parse(lines):
@@ -1214,23 +5064,50 @@ class ReSTGridTable:
 class MarkdownTable:
     """Markdown Table."""
 
-    @staticmethod
-    def can_accept(lines):
+    separator_pattern = re.compile(r' *\|? *[-:]+[-| :]*\|? *$')
+
+    @classmethod
+    def can_accept(cls, lines):
         """Judge if the table is estimated to be this format."""
         if len(lines) < 3:
             return False
-        return bool(re.match(r' *\|? *[-:]+[-| :]*\|? *$', lines[1]))
+        return bool(cls.separator_pattern.match(lines[1]))
+
+    # A cell is a sequence of escaped characters, code spans and other
+    # characters, and ends at '|' or at the end of the line.
+    cell_pattern = re.compile(r'((?:[^|\\`]+|\\.?|`[^`]*`|`)*)(\|?)')
+    code_span_pattern = re.compile(r'`([^`]*)`\Z')
 
     @classmethod
     def __split_cell(cls, line):
-        # Remove leading |
-        line = re.sub(r'^ *\| *', '', line)
-        # Remove trailing |
-        line = re.sub(r' *\| *$', '', line)
-        # Split at |
-        cells = re.split(r' *\| *', line)
-        # Strip
-        cells = [cell.strip() for cell in cells]
+        if '\\' in line or '`' in line:
+            cells = cls.__tokenize(line)
+        else:
+            cells = line.split('|')
+        # Remove the outside of leading/trailing |
+        if len(cells) > 1 and not cells[0].strip():
+            del cells[0]
+        if len(cells) > 1 and not cells[-1].strip():
+            del cells[-1]
+        return [cell.strip() for cell in cells]
+
+    @classmethod
+    def __tokenize(cls, line):
+        r"""Split a line with escaped pipes or code spans.
+
+        ``\|`` is a pipe in a cell, and pipes in code spans do not split
+        cells. A cell of a code span is replaced with the code.
+        """
+        cells = []
+        for match in cls.cell_pattern.finditer(line):
+            cell, pipe = match.groups()
+            cell = cell.strip().replace('\\|', '|')
+            code_span = cls.code_span_pattern.match(cell)
+            if code_span:
+                cell = code_span.group(1)
+            cells.append(cell)
+            if not pipe:
+                break
         return cells
 
     @classmethod
@@ -1253,6 +5130,32 @@ class MarkdownTable:
         body = [split_cell(line) for line in lines[2:]]
         return header, body
 
+    @classmethod
+    def iterparse(cls, lines):
+        r"""Parse a Markdown table line by line.
+
+        The table ends at a white line.
+
+        :param lines: iterator of lines without indents
+        :return: list of labels and generator of row values
+        """
+        split_cell = cls.__split_cell
+        header = split_cell(next(lines))
+        next(lines)  # separator
+
+        def body():
+            """Generate rows."""
+            for line in lines:
+                if not line.strip():
+                    break
+                yield split_cell(line)
+            for line in lines:
+                if line.strip():
+                    raise TableMarkupError(
+                        'Text after the table: %r' % line)
+
+        return header, body()
+
 
 class TableMarkupError(ValueError):
     """Exception about a table text format."""
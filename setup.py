@@ -12,6 +12,7 @@ setup(name='inline_table',
       url='http://github.com/fjkz/inline_table',
       license='MIT License',
       platforms='OS Independent',
+      python_requires='>=3.8',
       install_requires=[
           'docutils>0.13',
       ],
@@ -21,10 +22,12 @@ setup(name='inline_table',
           'Topic :: Software Development :: Libraries',
           'License :: OSI Approved :: MIT License',
           'Operating System :: OS Independent',
-          'Programming Language :: Python :: 2.6',
-          'Programming Language :: Python :: 2.7',
-          'Programming Language :: Python :: 3.2',
-          'Programming Language :: Python :: 3.4',
+          'Programming Language :: Python :: 3',
+          'Programming Language :: Python :: 3.8',
+          'Programming Language :: Python :: 3.9',
+          'Programming Language :: Python :: 3.10',
+          'Programming Language :: Python :: 3.11',
+          'Programming Language :: Python :: 3.12',
           ],
       py_modules=['inline_table'],
       test_suite='test_inline_table.suite',
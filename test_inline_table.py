@@ -1,4 +1,13 @@
 from __future__ import print_function
+import asyncio
+import concurrent.futures
+import datetime
+import io
+import ipaddress
+import os
+import random
+import re
+import tempfile
 import unittest
 import doctest
 
@@ -8,6 +17,14 @@ from docutils.statemachine import StringList
 import inline_table
 from inline_table import (
     compile,
+    compile_file,
+    compile_csv,
+    compile_tsv,
+    compile_parallel,
+    load,
+    loads,
+    compile_async,
+    load_async,
     create_table,
     TableMarkupError,
     ValueType,
@@ -19,6 +36,14 @@ from inline_table import (
     ReSTGridTable,
     MarkdownTable,
     estimate_format,
+    strip_lines,
+    register_column_type,
+    unregister_column_type,
+    ValueTypeBase,
+    SetTypeBase,
+    _RowList,
+    _Interval,
+    _AsyncRowIterator,
 )
 
 
@@ -264,6 +289,28 @@ class TestFormatEstimation(unittest.TestCase):
                           lambda: estimate_format(['===']))
 
 
+class TestStripLines(unittest.TestCase):
+
+    def test_strip(self):
+        lines = ['', '  \t', '    | a |', '   ---', '    | c |', ' ', '']
+        self.assertEqual(strip_lines(lines), [' | a |', '---', ' | c |'])
+        self.assertEqual(len(lines), 7)
+
+    def test_no_indent(self):
+        lines = ['a', 'b', '']
+        self.assertEqual(strip_lines(lines), ['a', 'b'])
+
+    def test_one_line(self):
+        self.assertEqual(strip_lines(['', '  a  ', '']), ['a  '])
+
+    def test_empty(self):
+        self.assertRaises(TableMarkupError, lambda: strip_lines([' ', '']))
+
+    def test_large(self):
+        lines = [''] * 10000 + ['  a'] * 10000 + [''] * 10000
+        self.assertEqual(strip_lines(lines), ['a'] * 10000)
+
+
 class TestSimpleTableParser(unittest.TestCase):
 
     def assertParsedTo(self, text, expected):
@@ -388,6 +435,38 @@ a | b | c
             text,
             (['A', 'B'], [['1', '2']]))
 
+    def test_escaped_pipe(self):
+        text = r'''
+| A        | B |
+|----------|---|
+| r'a\|b'  | 1 |
+| 'x\\'    | 2 |
+'''.lstrip()
+        self.assertParsedTo(
+            text,
+            (['A', 'B'], [["r'a|b'", '1'], ["'x\\\\'", '2']]))
+
+    def test_code_span(self):
+        text = '''\
+| A         | B |
+|-----------|---|
+| `'x | y'` | 1 |
+| `a`       | 2 |
+'''
+        self.assertParsedTo(
+            text,
+            (['A', 'B'], [["'x | y'", '1'], ['a', '2']]))
+
+    def test_compile_escaped_pipe(self):
+        tbl = compile(r'''
+| A (regex) | B |
+|-----------|---|
+| r'a\|b'   | 1 |
+| 'c'       | 2 |
+''')
+        self.assertEqual(tbl.select(A='b').B, 1)
+        self.assertEqual(tbl.select(A='c').B, 2)
+
 
 class TestCompile(unittest.TestCase):
 
@@ -491,6 +570,368 @@ class TestCompile(unittest.TestCase):
             lambda: compile('\n  \n\n\t\n\n\n'))
 
 
+class TestExhaustive(unittest.TestCase):
+
+    text = """
+        ============ ======== ==========
+         age (cond)   gender  call (str)
+        ============ ======== ==========
+              a < 0    N/A
+         0 <= a < 7     *     kid
+         7 <= a < 18    M     boy
+         7 <= a < 16    F     girl
+        18 <= a         M     gentleman
+        16 <= a         F     lady
+        ============ ======== ==========
+        """
+
+    def test_exhaustive(self):
+        compile(self.text, M=1, F=2).check_exhaustive(['age'])
+        compile(self.text.replace('N/A', ' * '),
+                M=1, F=2).check_exhaustive()
+
+    def test_gap(self):
+        try:
+            compile(self.text.replace('16 <=', '17 <='),
+                    M=1, F=2).check_exhaustive(['age', 'gender'])
+        except TableMarkupError as e:
+            message = str(e)
+        else:
+            self.fail()
+        self.assertTrue('age in Interval(-inf, 0), gender=2' in message)
+        self.assertTrue('age=16, gender=2' in message)
+        self.assertTrue('age in Interval(16, 17), gender=2' in message)
+
+    def test_value_domain(self):
+        text = """
+            === === ===
+             A   B   C
+            === === ===
+             1   1   a
+             2   2   b
+            === === ===
+            """
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile(text, a=0, b=0).check_exhaustive(['A', 'B']))
+        compile(text.replace('2   2', '*   *'),
+                a=0, b=0).check_exhaustive(['A', 'B'])
+
+    def test_variable_named_exhaustive(self):
+        t = compile("""
+            | A (cond) | B          |
+            |----------|------------|
+            | A > 0    | exhaustive |
+            """, exhaustive=False)
+        self.assertEqual(t.select(A=1), (1, False))
+
+    def test_not_range(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile("""
+                | A (cond)   |
+                |------------|
+                | A % 2 == 0 |
+                """).check_exhaustive())
+
+
+class TestCompileFile(unittest.TestCase):
+
+    texts = [
+        '''
+        ===== === =====
+          a    b   c
+        (val)     (str)
+        ===== === =====
+          1    2   x
+                   y
+          4    5
+         N/A   *
+        ===== === =====
+        ''',
+        '''
+
+        | A | B | C |
+        |---|---|---|
+        | 1 | 2 | 3 |
+        | 4 |N/A| * |
+
+        ''',
+        '''
+          A | B | C
+         ---|---|---
+          1 | 2 | 3
+        ''',
+        '''
+        +---+---+
+        | a | b |
+        +===+===+
+        | 1 | 2 |
+        +---+---+
+        | 3 | 4 |
+        +---+---+''',
+        '''
+        ===== =====
+         A     B
+        (val) (str)
+        ===== =====
+         1     x
+
+               y
+         2     z
+               - w
+        ===== =====
+        ''',
+    ]
+
+    def assertSameTable(self, text, table):
+        expected = compile(text, A=1, B=2)
+        self.assertEqual(table._labels, expected._labels)
+        self.assertEqual(table.column_types, expected.column_types)
+        self.assertEqual(list(table.rows), list(expected.rows))
+
+    def test_fileobj(self):
+        for text in self.texts:
+            table = compile_file(io.StringIO(text), A=1, B=2)
+            self.assertSameTable(text, table)
+
+    def test_path(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.texts[0])
+            table = compile_file(path, A=1, B=2)
+        finally:
+            os.remove(path)
+        self.assertSameTable(self.texts[0], table)
+
+    def test_lazy(self):
+        lines = iter([
+            '| A | B |',
+            '|---|---|',
+            '| 1 | 2 |',
+            '| 3 | 4 |',
+        ])
+        header, rows = MarkdownTable.iterparse(lines)
+        self.assertEqual(header, ['A', 'B'])
+        self.assertEqual(next(rows), ['1', '2'])
+        self.assertEqual(next(lines), '| 3 | 4 |')
+
+    def test_empty(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_file(io.StringIO('\n  \n\t\n')))
+
+    def test_unknown_format(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_file(io.StringIO('a\nb\nc\n')))
+
+    def test_not_closed(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_file(io.StringIO('''
+                === ===
+                 A   B
+                === ===
+                 1   2
+                ''')))
+
+    def test_text_after_table(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_file(io.StringIO('''
+                | A | B |
+                |---|---|
+                | 1 | 2 |
+
+                | 3 | 4 |
+                ''')))
+
+    def test_same_error(self):
+        for text in ['''
+                ===== === ===
+                 A     B   C
+                ===== === ===
+                 1 xxxxxxx q
+                --------- ---
+                 2     z   r
+                ===== === ===
+                ''', '''
+                === ===
+                 A   B
+                === ===
+                 1   2
+
+                 3xxx4
+                === ===
+                ''']:
+            errors = []
+            for function in (compile, compile_file):
+                try:
+                    function(io.StringIO(text) if function is compile_file
+                             else text)
+                except TableMarkupError as e:
+                    errors.append(str(e))
+            self.assertEqual(len(errors), 2)
+            self.assertEqual(errors[0], errors[1])
+
+    def test_column_margin(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_file(io.StringIO('''
+                === ===
+                 A   B
+                === ===
+                 1xxx2
+                === ===
+                ''')))
+
+
+class TestCompileCsv(unittest.TestCase):
+
+    def test_csv(self):
+        t = compile_csv(io.StringIO(
+            'A (cond), B, C (str)\n'
+            'A < 0, N/A, negative\n'
+            '\n'
+            '*, b,"x, y"\n'
+        ), b=1)
+        self.assertEqual(t._labels, ('A', 'B', 'C'))
+        self.assertRaises(LookupError, lambda: t.select(A=-1))
+        self.assertEqual(t.select(A=1), (1, 1, 'x, y'))
+
+    def test_tsv(self):
+        t = compile_tsv(io.StringIO(
+            'A\tB (coll)\n'
+            '1\t(1, 2)\n'
+            '*\t*\n'
+        ))
+        self.assertEqual(t.select(A=1, B=2), (1, 2))
+        self.assertEqual(t.select(A=2, B=3), (2, 3))
+
+    def test_path(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write('A,B\n1,2\n')
+            t = compile_csv(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(t.select(A=1), (1, 2))
+
+    def test_same_as_compile(self):
+        t1 = compile_csv(io.StringIO('A,B\n1,2\n*,3\n'))
+        t2 = compile('''
+            | A | B |
+            |---|---|
+            | 1 | 2 |
+            | * | 3 |''')
+        self.assertEqual(list(t1.rows), list(t2.rows))
+
+    def test_cells(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_csv(io.StringIO('A,B\n1,2,3\n')))
+
+    def test_empty(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile_csv(io.StringIO('\n\n')))
+
+
+class TestCompileParallel(unittest.TestCase):
+
+    text = '\n'.join(
+        ['| A (cond) | B | C (str) |',
+         '|----------|---|---------|'] +
+        ['| A < %d | %s | c%d |' % (i, '*' if i % 3 else i, i)
+         for i in range(3000)])
+
+    def test_threads(self):
+        expected = compile(self.text)
+        for executor in (2, concurrent.futures.ThreadPoolExecutor(2)):
+            table = compile_parallel(self.text, executor)
+            self.assertEqual([row[1:] for row in table.rows],
+                             [row[1:] for row in expected.rows])
+            self.assertEqual(table.select(A=2000, B=2001).C, 'c2001')
+
+    def test_error_context(self):
+        text = """
+            | A | B |
+            |---|---|
+            | 1 | 2 |
+            | 3 | b |
+            """
+        for f in (compile, lambda text: compile_parallel(text, 2)):
+            try:
+                f(text)
+            except NameError as e:
+                self.assertTrue(str(e).endswith('(row 1, column B)'))
+            else:
+                self.fail()
+
+    def test_cells(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: compile("""
+                | A | B |
+                |---|---|
+                | 1 |
+                """))
+
+    def test_memo(self):
+        t = compile("""
+            | A (cond) | B       | C (coll) | D (str) |
+            |----------|---------|----------|---------|
+            | A < 1    | 'x' 'y' | [1]      | abc     |
+            | A < 1    | 'x' 'y' | [1]      | abc     |
+            """)
+        r1, r2 = t.rows
+        self.assertTrue(r1.A is r2.A)
+        self.assertTrue(r1.B is r2.B)
+        self.assertFalse(r1.C is r2.C)
+        self.assertTrue(r1.D is r2.D)
+
+    def test_memo_calls(self):
+        t = compile("""
+            | A        | B (coll)   | C        |
+            |----------|------------|----------|
+            | next(c)  | list(l)    | object() |
+            | next(c)  | list(l)    | object() |
+            """, c=iter(range(2)), l=(1,))
+        r1, r2 = t.rows
+        self.assertEqual((r1.A, r2.A), (0, 1))
+        self.assertFalse(r1.B is r2.B)
+        self.assertFalse(r1.C is r2.C)
+
+    def test_row_order(self):
+        t = compile("""
+            | A       | B        | C (coll)        |
+            |---------|----------|-----------------|
+            | next(c) | next(c)  | [next(c), 1]    |
+            | 'x'     | next(c)  | [next(c)]       |
+            """, c=iter(range(5)))
+        self.assertEqual([tuple(row) for row in t.rows],
+                         [(0, 1, [2, 1]), ('x', 3, [4])])
+
+    def test_memo_across_chunks(self):
+        memo = {}
+        f = ConditionType().evaluate_column(['A > 0'], {}, 'A', memo)[0]
+        g = ConditionType().evaluate_column(['A > 0', '*'], {}, 'A', memo)
+        self.assertTrue(g[0] is f)
+        self.assertTrue(memo['*'] is WILD_CARD)
+
+    def test_batch(self):
+        values = ValueType().evaluate_column(
+            ['1', '*', "'x'", 'N/A', 'a', '-.5e1'], {'a': 2}, 'A')
+        self.assertEqual(
+            values, [1, WILD_CARD, 'x', NOT_APPLICABLE, 2, -5.0])
+        self.assertTrue(values[1] is WILD_CARD)
+        self.assertEqual(ValueType().evaluate_column(
+            ['(1, 2)', '3'], {}, 'A'), [(1, 2), 3])
+
+
 class TestColumnType(unittest.TestCase):
 
     def test_oneline(self):
@@ -628,6 +1069,33 @@ class TestSelect(unittest.TestCase):
         self.assertEqual(ret, (2, 2))
         self.assertTrue(ret[0] is not WILD_CARD)
 
+    def test_wildcard_skipped(self):
+        tb = compile("""
+        ======== ====== ===
+        A (cond)   B     C
+        ======== ====== ===
+           *      *     1
+           *     'b'    2
+        ======== ====== ===
+        """)
+        self.assertEqual([row._wild_cards for row in tb.rows], [3, 1])
+        self.assertEqual(tb.select(A=0, B='b', C=2), (0, 'b', 2))
+        self.assertEqual(tb.select_all(A=0, B='c'), [(0, 'c', 1)])
+
+    def test_wildcard_without_mask(self):
+        tb = compile("""
+        ======== ====== ===
+        A (cond)   B     C
+        ======== ====== ===
+           *      *     1
+        ======== ====== ===
+        """)
+        condition = type(tb)._SelectCondition({'A': 0, 'B': 'b', 'C': 1})
+        row = tb.tuple_class(WILD_CARD, 'b', 1)
+        self.assertFalse(hasattr(row, '_wild_cards'))
+        self.assertTrue(condition.match(row))
+        self.assertFalse(condition.match(tb.tuple_class(WILD_CARD, 'b', 2)))
+
     def test_na(self):
         tb = compile("""
         === ===
@@ -752,6 +1220,826 @@ class TestTable(unittest.TestCase):
         self.assertEqual(tb.select(keyB='value2B'), ('value2A', 'value2B'))
 
 
+class TestModify(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+        === ===
+         A   B
+        === ===
+         1   1
+         2  N/A
+         *   3
+        === ===
+        """)
+
+    def test_insert_append(self):
+        self.tb.insert((4, 4))
+        self.assertEqual(self.tb._num_rows, 4)
+        self.assertEqual(self.tb.select(A=4), (4, 3))
+        self.assertEqual(self.tb.select_all(B=4), [(4, 4)])
+
+    def test_insert_position(self):
+        self.tb.insert((4, 4), position=0)
+        self.assertEqual(self.tb.rows[0], (4, 4))
+        self.assertEqual(self.tb.select(A=4), (4, 4))
+        self.assertEqual(self.tb.select(A=1), (1, 1))
+
+    def test_insert_na(self):
+        self.tb.insert((3, NOT_APPLICABLE), position=-1)
+        self.assertRaises(LookupError, lambda: self.tb.select(A=3))
+
+    def test_insert_width(self):
+        self.assertRaises(TypeError, lambda: self.tb.insert((1,)))
+
+    def test_insert_out_of_range(self):
+        self.assertRaises(IndexError, lambda: self.tb.insert((1, 1), 4))
+
+    def test_delete(self):
+        self.assertEqual(self.tb.delete(0), (1, 1))
+        self.assertEqual(self.tb.select(A=1), (1, 3))
+
+    def test_delete_negative(self):
+        self.tb.delete(-1)
+        self.assertRaises(LookupError, lambda: self.tb.select(A=3))
+
+    def test_delete_out_of_range(self):
+        self.assertRaises(IndexError, lambda: self.tb.delete(3))
+
+    def test_update_na(self):
+        self.assertEqual(self.tb.update(1, B=2), (2, 2))
+        self.assertEqual(self.tb.select(A=2), (2, 2))
+        self.tb.update(0, B=NOT_APPLICABLE)
+        self.assertRaises(LookupError, lambda: self.tb.select(A=1))
+
+    def test_update_order(self):
+        self.tb.update(2, A=1)
+        self.assertEqual(self.tb.rows[2], (1, 3))
+        self.assertEqual(self.tb.select_all(A=1), [(1, 1), (1, 3)])
+
+    def test_update_invalid_label(self):
+        self.assertRaises(LookupError, lambda: self.tb.update(0, C=1))
+
+    def test_append_to_rows(self):
+        tb = create_table(['A', 'B'])
+        tb.rows.append(tb.tuple_class(1, 2))
+        tb.rows.append(tb.tuple_class(2, NOT_APPLICABLE))
+        self.assertEqual(tb.select(A=1), (1, 2))
+        self.assertRaises(LookupError, lambda: tb.select(A=2))
+        self.assertEqual(tb.explain(A=2).row, None)
+
+    def test_change_rows_directly(self):
+        tb = compile("""
+            | K (regex) | V |
+            |-----------|---|
+            | r'a'      | 1 |
+            """)
+        tb.precompute(['K'], {'K': ['a', 'b']})
+        self.assertRaises(LookupError, lambda: tb.select(K='b'))
+        tb.rows.insert(0, tb.tuple_class(re.compile('b'), 2))
+        self.assertEqual(tb.select_all(K='b'), [('b', 2)])
+        self.assertEqual(tb.select(K='b').V, 2)
+        del tb.rows[0]
+        tb.insert((re.compile('.'), 3))
+        self.assertEqual(tb.select_all(K='b'), [('b', 3)])
+
+
+class TestRegexIndex(unittest.TestCase):
+
+    patterns = ["r'a'", "r'(a)b'", "r'(?i)A'", '*', 'N/A', "r'a$'",
+                "r'.*c'", "r'[ab]{2}'", "r'b+'"]
+
+    def setUp(self):
+        lines = ['| K (regex) | V |', '|-----------|---|']
+        for i in range(200):
+            lines.append('| %s | %d |' % (self.patterns[i * 7 % 9], i))
+        self.tb = compile('\n'.join(lines))
+
+    def assertSameAsScan(self, tb):
+        scan = tb._new_table()
+        scan.rows = tb.rows
+        scan._indexes.clear()
+        for value in ['a', 'ab', 'A', 'bc', 'bb', 'x', '']:
+            self.assertEqual(tb.select_all(K=value),
+                             scan.select_all(K=value))
+
+    def test_select(self):
+        self.assertTrue('K' in self.tb._indexes)
+        self.assertEqual(self.tb.select(K='bc').V, 3)
+        self.assertSameAsScan(self.tb)
+
+    def test_modify(self):
+        self.tb.insert((re.compile('x'), -1), position=100)
+        self.tb.delete(0)
+        self.assertTrue(-1 in [row.V for row in self.tb.select_all(K='x')])
+        self.assertSameAsScan(self.tb)
+
+    def test_union(self):
+        tb = self.tb + self.tb
+        self.assertEqual(len(tb.select_all(K='ab')),
+                         2 * len(self.tb.select_all(K='ab')))
+        self.assertSameAsScan(tb)
+
+    def test_union_reuses_indexes(self):
+        other = compile('\n'.join(['| K (regex) | V |', '|---|---|',
+                                   "| r'x' | -1 |"]))
+        tb = self.tb + other
+        # Indexes are built at the first query from those of the tables.
+        self.assertTrue(tb._Table__indexes is None)
+        self.assertSameAsScan(tb)
+        self.assertEqual(tb.select_all(K='x')[-1].V, -1)
+        self.assertTrue(tb._Table__indexes['K'].parts[0][0]
+                        is self.tb._indexes['K'])
+        # A change of a table after union does not affect it.
+        self.tb.insert((re.compile('x'), -2), position=0)
+        self.assertNotEqual(tb.select(K='x').V, -2)
+        self.assertSameAsScan(tb)
+        tb.insert((re.compile('x'), -3), position=0)
+        self.assertEqual(tb.select(K='x').V, -3)
+        self.assertSameAsScan(tb)
+
+
+class TestCollectionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            | K (coll)    | V |
+            |-------------|---|
+            | (1, 2)      | 0 |
+            | range(2, 4) | 1 |
+            | {2: 0}      | 2 |
+            | N/A         | 3 |
+            | ([1], 2)    | 4 |
+            | *           | 5 |
+            | [3, 2.0]    | 6 |
+            """)
+
+    def assertSelected(self, value, expected):
+        self.assertEqual([row.V for row in self.tb.select_all(K=value)],
+                         expected)
+
+    def test_select(self):
+        self.assertTrue('K' in self.tb._indexes)
+        self.assertSelected(2, [0, 1, 2, 4, 5, 6])
+        self.assertSelected(1, [0, 5])
+        self.assertSelected(3, [1, 5, 6])
+        self.assertSelected(9, [5])
+
+    def test_modify(self):
+        self.tb.select(K=1)
+        self.tb.insert(((9,), 7))
+        self.assertSelected(9, [5, 7])
+        self.tb.insert(((9,), 8), position=0)
+        self.tb.delete(6)
+        self.assertSelected(9, [8, 7])
+        self.assertSelected(1, [0])
+
+
+class TestIntervalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            | A (cond)     | V |
+            |--------------|---|
+            | 0 <= A < 2   | 0 |
+            | A % 2 == 0   | 1 |
+            | 1 < A <= 7.5 | 2 |
+            | N/A          | 3 |
+            | A >= 100     | 4 |
+            | *            | 5 |
+            """)
+
+    def assertSelected(self, value, expected):
+        self.assertEqual([row.V for row in self.tb.select_all(A=value)],
+                         expected)
+
+    def test_select(self):
+        self.assertTrue('A' in self.tb._indexes)
+        self.assertSelected(-2, [1, 5])
+        self.assertSelected(0, [0, 1, 5])
+        self.assertSelected(1.5, [0, 2, 5])
+        self.assertSelected(7.5, [2, 5])
+        self.assertSelected(8, [1, 5])
+        self.assertSelected(101, [4, 5])
+        self.assertSelected(float('nan'), [5])
+
+    def test_modify(self):
+        self.assertSelected(50, [1, 5])
+        self.tb.insert((lambda a: a > 10, 6), position=0)
+        self.tb.delete(1)
+        self.assertSelected(50, [6, 1, 5])
+        self.assertSelected(2, [1, 2, 5])
+
+
+class _SpanType(SetTypeBase):
+    """Half-open ranges written as 'low-high' for tests of the registry."""
+
+    directives = ('(span)',)
+    batches = []
+
+    def __str__(self):
+        return 'span'
+
+    @staticmethod
+    def evaluate(expression, variables, label):
+        for special_value in (WILD_CARD, NOT_APPLICABLE):
+            if expression == special_value.directive:
+                return special_value
+        low, high = expression.split('-')
+        return int(low), int(high)
+
+    @staticmethod
+    def match(a, b):
+        return isinstance(a, tuple) and a[0] <= b < a[1]
+
+    @staticmethod
+    def dump_value(value):
+        return '%d-%d' % value
+
+    @classmethod
+    def match_batch(cls, values, query_value):
+        cls.batches.append(len(values))
+        return [isinstance(value, tuple) and value[0] <= query_value < value[1]
+                for value in values]
+
+
+class _EvenIndex:
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def insert(self, position, value):
+        self.values.insert(position, value)
+
+    def delete(self, position, value):
+        del self.values[position]
+
+    def candidates(self, value):
+        if value % 2:
+            return None
+        return [i for i, v in enumerate(self.values) if v % 2 == 0]
+
+
+class _EvenType(ValueTypeBase):
+    """Integers indexed only for even queries."""
+
+    directives = ('(even)',)
+
+    def __str__(self):
+        return 'even'
+
+    @staticmethod
+    def evaluate(expression, variables, label):
+        return int(expression)
+
+    def build_index(self, values):
+        return _EvenIndex(values)
+
+
+class TestIndexUpdate(unittest.TestCase):
+    """Indexes changed with rows select the same rows as scans."""
+
+    def check(self, built, queries, *texts, **variables):
+        tables = [compile(text, **variables) for text in texts]
+        tb = tables[0]
+        cells = [row for table in tables for row in table.rows]
+        label = tb._labels[0]
+        index = tb._indexes[label]
+        # Small blocks of the regex index
+        index.block_size = 2
+        tb.select_all(**{label: queries[0]})
+        rand = random.Random(1)
+        for _ in range(80):
+            if tb._num_rows and rand.random() < 0.4:
+                tb.delete(rand.randrange(tb._num_rows))
+            else:
+                tb.insert(rand.choice(cells),
+                          position=rand.randint(0, tb._num_rows))
+            scan = tb._new_table()
+            scan.rows = tb.rows
+            scan._indexes.clear()
+            for value in queries:
+                self.assertEqual(tb.select_all(**{label: value}),
+                                 scan.select_all(**{label: value}))
+        # Updated, not rebuilt
+        self.assertTrue(tb._indexes[label] is index)
+        self.assertTrue(getattr(index, built) is not None)
+
+    def test_regex(self):
+        self.check(
+            '_RegexIndex__blocks',
+            ['a', 'ab', 'bc', 'bb', 'x', ''],
+            """
+            | K (regex)  | V |
+            |------------|---|
+            | r'a'       | 0 |
+            | r'(a)b'    | 1 |
+            | *          | 2 |
+            | N/A        | 3 |
+            | r'a$'      | 4 |
+            | r'.*c'     | 5 |
+            | r'[ab]{2}' | 6 |
+            | r'b+'      | 7 |
+            """)
+
+    def test_regex_from_wildcards(self):
+        self.check(
+            '_RegexIndex__blocks',
+            ['a', 'ab', 'b', ''],
+            """
+            | K (regex)  | V |
+            |------------|---|
+            | *          | 0 |
+            | N/A        | 1 |
+            """, """
+            | K (regex)  | V |
+            |------------|---|
+            | r'a'       | 2 |
+            | r'b+'      | 3 |
+            """)
+
+    def test_collection(self):
+        self.check(
+            '_CollectionIndex__map',
+            [1, 2, 3, 9, 4],
+            """
+            | K (coll)    | V |
+            |-------------|---|
+            | (1, 2)      | 0 |
+            | range(2, 4) | 1 |
+            | N/A         | 2 |
+            | *           | 3 |
+            | [3, 2.0]    | 4 |
+            | {9}         | 5 |
+            """)
+
+    def test_condition(self):
+        self.check(
+            '_IntervalIndex__built',
+            [-2, 0, 1, 1.5, 2, 3, 7.5, 8, 100, 101],
+            """
+            | K (cond)     | V |
+            |--------------|---|
+            | 0 <= K < 2   | 0 |
+            | K % 2 == 0   | 1 |
+            | N/A          | 2 |
+            | *            | 3 |
+            """, """
+            | K (cond)     | V |
+            |--------------|---|
+            | 1 < K <= 7.5 | 4 |
+            | K >= 100     | 5 |
+            | K == 2       | 6 |
+            """)
+
+    def test_date_range(self):
+        self.check(
+            '_IntervalIndex__built',
+            ['2019-12-31', '2020-01-01', '2020-07-01', '2020-12-25',
+             '2021-01-01'],
+            """
+            | K (daterange)           | V |
+            |-------------------------|---|
+            | 2020-01-01..2020-06-30  | 0 |
+            | N/A                     | 1 |
+            | *                       | 2 |
+            """, """
+            | K (daterange)           | V |
+            |-------------------------|---|
+            | 2020-07-01...2021-01-01 | 3 |
+            | 2020-12-25              | 4 |
+            | ..2019-12-31            | 5 |
+            """)
+
+    def test_network(self):
+        self.check(
+            '_NetworkIndex__levels',
+            ['10.1.2.3', '10.2.0.1', '2001:db8::1', '172.16.0.1',
+             '10.0.0.0/8'],
+            """
+            | K (ip)        | V |
+            |---------------|---|
+            | 10.1.0.0/16   | 0 |
+            | 10.0.0.0/8    | 1 |
+            | N/A           | 2 |
+            | 2001:db8::/32 | 3 |
+            | net           | 4 |
+            | *             | 5 |
+            """,
+            net=ipaddress.ip_network('172.16.0.0/12'))
+
+    def test_prefix(self):
+        self.check(
+            '_PrefixIndex__map',
+            ['/api/v1/x', '/api', '/static/a', ''],
+            """
+            | K (prefix) | V |
+            |------------|---|
+            | /api/      | 0 |
+            | /api/v1/   | 1 |
+            | N/A        | 2 |
+            | /static/   | 3 |
+            | *          | 4 |
+            """)
+
+    def test_glob(self):
+        self.check(
+            '_PrefixIndex__map',
+            ['/api/v1/users/3', '/api/v2/items', '/static/a.css'],
+            """
+            | K (glob)        | V |
+            |-----------------|---|
+            | /api/v1/users/* | 0 |
+            | /api/v?/items   | 1 |
+            | N/A             | 2 |
+            | *               | 3 |
+            | /static/[ab]*   | 4 |
+            """)
+
+
+class TestColumnTypeRegistry(unittest.TestCase):
+
+    def setUp(self):
+        register_column_type(_SpanType)
+        register_column_type(_EvenType)
+        _SpanType.batches = []
+
+    def tearDown(self):
+        unregister_column_type(_SpanType)
+        unregister_column_type(_EvenType)
+
+    def test_duplicate_directive(self):
+        class ConditionAgain(SetTypeBase):
+            directives = ('(cond)',)
+        self.assertRaises(ValueError, register_column_type, ConditionAgain)
+        self.assertRaises(ValueError, register_column_type, _SpanType)
+
+    def test_string_directives(self):
+        class CollectionAgain(SetTypeBase):
+            directives = '(coll)'
+        self.assertRaises(ValueError, register_column_type, CollectionAgain)
+
+        @register_column_type
+        class Colour(ValueTypeBase):
+            directives = '(colour), (col)'
+
+            @staticmethod
+            def evaluate(expression, variables, label):
+                return expression
+        try:
+            tb = compile("""
+                | A (col) | B (colour) | C (collection) |
+                |---------|------------|----------------|
+                | red     | blue       | [1]            |
+                """)
+        finally:
+            unregister_column_type(Colour)
+        self.assertEqual(tb.rows[0], ('red', 'blue', [1]))
+        self.assertRaises(
+            TableMarkupError, inline_table.get_column_type, '(co)')
+
+    def test_unregistered(self):
+        unregister_column_type(_SpanType)
+        try:
+            self.assertRaises(TableMarkupError, compile, """
+                | A (span) |
+                |----------|
+                | 0-1      |
+                """)
+        finally:
+            register_column_type(_SpanType)
+
+    def test_match_batch(self):
+        tb = compile("""
+            | A (span) | V |
+            |----------|---|
+            | 0-10     | 0 |
+            | 5-8      | 1 |
+            | N/A      | 2 |
+            | *        | 3 |
+            | 7-9      | 4 |
+            """)
+        self.assertEqual(str(tb.column_types[0]), 'span')
+        self.assertEqual([row.V for row in tb.select_all(A=7)], [0, 1, 3, 4])
+        self.assertEqual([row.V for row in tb.select_all(A=9)], [0, 3])
+        self.assertEqual(tb.select(A=5).V, 0)
+        self.assertEqual(_SpanType.batches, [5, 5, 5])
+        self.assertRaises(LookupError, tb.select, A=0, B=1)
+
+    def test_match_batch_chunks(self):
+        lines = ['| A (span) | V |', '|---|---|']
+        lines += ['| %d-%d | %d |' % (i, i + 1, i) for i in range(1200)]
+        tb = compile('\n'.join(lines))
+        self.assertEqual(tb.select(A=1100).V, 1100)
+        self.assertEqual(_SpanType.batches, [512, 512, 176])
+        _SpanType.batches = []
+        self.assertEqual(tb.select(A=3).V, 3)
+        self.assertEqual(_SpanType.batches, [512])
+
+    def test_build_index(self):
+        tb = compile("""
+            | A (even) | V |
+            |----------|---|
+            | 1        | 0 |
+            | 2        | 1 |
+            | 4        | 2 |
+            """)
+        self.assertTrue('A' in tb._indexes)
+        self.assertEqual(tb.select(A=2).V, 1)
+        self.assertEqual(tb.select(A=1).V, 0)
+        tb.insert((2, 3), position=0)
+        self.assertEqual(tb.select(A=2).V, 3)
+        tb.delete(0)
+        self.assertEqual(tb.select(A=2).V, 1)
+        self.assertEqual(tb.explain(A=4).path, 'index')
+
+    def test_dump(self):
+        tb = compile("""
+            | A (span) | B (even) |
+            |----------|----------|
+            | 0-10     | 2        |
+            | *        | 4        |
+            """)
+        self.assertRaises(TypeError, lambda: tb.dump(io.BytesIO()))
+        tb = compile("""
+            | A (span) |
+            |----------|
+            | 0-10     |
+            | *        |
+            """)
+        f = io.BytesIO()
+        tb.dump(f)
+        self.assertEqual(list(loads(f.getvalue()).rows),
+                         [((0, 10),), (WILD_CARD,)])
+
+
+class TestIpType(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            | src (ip)      | dst (cidr)     | V |
+            |---------------|----------------|---|
+            | 10.1.0.0/16   | *              | 0 |
+            | 10.0.0.0/8    | 192.168.0.0/24 | 1 |
+            | N/A           | *              | 2 |
+            | 2001:db8::/32 | *              | 3 |
+            | net           | *              | 4 |
+            | *             | 10.0.0.1       | 5 |
+            """, net=ipaddress.ip_network('172.16.0.0/12'))
+
+    def assertSelected(self, value, expected):
+        self.assertEqual([row.V for row in self.tb.select_all(src=value)],
+                         expected)
+
+    def test_evaluate(self):
+        self.assertEqual(str(self.tb.column_types[0]), 'ip')
+        self.assertEqual(str(self.tb.column_types[1]), 'ip')
+        self.assertEqual(self.tb.rows[5].dst,
+                         ipaddress.ip_network('10.0.0.1/32'))
+        self.assertRaises(ValueError, compile, """
+            | src (ip)   |
+            |------------|
+            | 10.0.0.1/8 |
+            """)
+
+    def test_select(self):
+        self.assertTrue('src' in self.tb._indexes)
+        self.assertSelected('10.1.2.3', [0, 1, 5])
+        self.assertSelected('10.2.2.3', [1, 5])
+        self.assertSelected(ipaddress.ip_address('172.20.0.1'), [4, 5])
+        self.assertSelected('2001:db8::1', [3, 5])
+        self.assertSelected('192.168.0.1', [5])
+        self.assertSelected('10.1.0.0/24', [0, 1, 5])
+        self.assertSelected('10.0.0.0/8', [1, 5])
+        self.assertEqual(self.tb.select(src='10.2.0.1',
+                                        dst='192.168.0.5').V, 1)
+        self.assertEqual(self.tb.select(dst='10.0.0.1').V, 0)
+        for value in ('10.0.0.300', 'foo', 5.0):
+            self.assertRaises(LookupError, self.tb.select, src=value)
+
+    def test_scan(self):
+        self.tb._indexes.clear()
+        self.assertRaises(LookupError, self.tb.select, src='foo')
+        self.assertSelected('10.1.2.3', [0, 1, 5])
+        self.assertSelected('10.1.0.0/24', [0, 1, 5])
+        self.assertSelected('2001:db8::1', [3, 5])
+
+    def test_modify(self):
+        self.tb.select(src='10.0.0.1')
+        self.tb.insert((ipaddress.ip_network('10.1.2.0/24'), WILD_CARD, 6))
+        self.assertSelected('10.1.2.3', [0, 1, 5, 6])
+        self.tb.insert((ipaddress.ip_network('10.0.0.0/8'), WILD_CARD, 7),
+                       position=0)
+        self.tb.delete(2)
+        self.assertSelected('10.1.2.3', [7, 0, 5, 6])
+
+    def test_join(self):
+        zones = compile("""
+            | src (ip)      | zone  |
+            |---------------|-------|
+            | 10.0.0.0/8    | 'in'  |
+            | 10.1.0.0/16   | 'lab' |
+            | 172.16.0.0/12 | 'dmz' |
+            """)
+        tb = self.tb.join(zones)
+        self.assertEqual([(row.V, row.zone) for row in tb],
+                         [(0, 'in'), (0, 'lab'), (1, 'in'), (1, 'lab'),
+                          (4, 'dmz'), (5, 'in'), (5, 'lab'), (5, 'dmz')])
+        self.assertEqual(tb.select(src='10.1.5.5').zone, 'in')
+        self.assertEqual(tb.select(src='10.2.5.5').V, 1)
+
+
+class TestDateRangeType(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            | day (daterange)         | V |
+            |-------------------------|---|
+            | 2020-01-01..2020-06-30  | 0 |
+            | 2020-07-01...2021-01-01 | 1 |
+            | 2020-12-25              | 2 |
+            | N/A                     | 3 |
+            | 2021-01-01..            | 4 |
+            | ..2019-12-31            | 5 |
+            | *                       | 6 |
+            """)
+
+    def assertSelected(self, value, expected):
+        self.assertEqual([row.V for row in self.tb.select_all(day=value)],
+                         expected)
+
+    def test_evaluate(self):
+        self.assertEqual(str(self.tb.column_types[0]), 'daterange')
+        self.assertEqual(repr(self.tb.rows[1].day),
+                         'DateRange(2020-07-01...2021-01-01)')
+        self.assertEqual(repr(self.tb.rows[2].day),
+                         'DateRange(2020-12-25..2020-12-25)')
+        for text in ('..', '2020-01-02..2020-01-01',
+                     '2020-01-01...2020-01-01', '2020/01/01'):
+            self.assertRaises(ValueError, compile,
+                              '| d (dates) |\n|---|\n| %s |' % text)
+
+    def test_select(self):
+        self.assertTrue('day' in self.tb._indexes)
+        self.assertSelected('2020-06-30', [0, 6])
+        self.assertSelected(datetime.date(2020, 12, 25), [1, 2, 6])
+        self.assertSelected(datetime.datetime(2020, 12, 31, 23, 59), [1, 6])
+        self.assertSelected('2021-01-01', [4, 6])
+        self.assertSelected('1999-01-01', [5, 6])
+        for value in ('2020-13-01', 'foo', 5):
+            self.assertRaises(LookupError, self.tb.select, day=value)
+
+    def test_scan(self):
+        self.tb._indexes.clear()
+        self.assertSelected('2020-06-30', [0, 6])
+        self.assertSelected('2021-01-01', [4, 6])
+        self.assertRaises(LookupError, self.tb.select, day='foo')
+        self.assertRaises(LookupError, self.tb.select_all, day=5)
+
+    def test_join(self):
+        seasons = compile("""
+            | day (dates)             | season   |
+            |-------------------------|----------|
+            | 2020-06-01..2020-08-31  | 'summer' |
+            | 2020-12-01...2021-03-01 | 'winter' |
+            """)
+        tb = self.tb.join(seasons)
+        self.assertEqual(
+            [(repr(row.day), row.V, row.season) for row in tb],
+            [('DateRange(2020-06-01..2020-06-30)', 0, 'summer'),
+             ('DateRange(2020-07-01..2020-08-31)', 1, 'summer'),
+             ('DateRange(2020-12-01...2021-01-01)', 1, 'winter'),
+             ('DateRange(2020-12-25..2020-12-25)', 2, 'winter'),
+             ('DateRange(2021-01-01...2021-03-01)', 4, 'winter'),
+             ('DateRange(2020-06-01..2020-08-31)', 6, 'summer'),
+             ('DateRange(2020-12-01...2021-03-01)', 6, 'winter')])
+        self.assertEqual(tb.select(day='2020-12-25').V, 1)
+        self.assertEqual(tb.select(day='2021-02-01').V, 4)
+
+    def test_intersect_interval(self):
+        since = _Interval(datetime.date(2020, 7, 1), None, True)
+        for a, b in ((since, self.tb.rows[1].day),
+                     (self.tb.rows[1].day, since)):
+            date_range = a.intersect(b)
+            self.assertEqual(repr(date_range),
+                             'DateRange(2020-07-01...2021-01-01)')
+            self.assertTrue(date_range('2020-12-31'))
+            self.assertFalse(date_range('2021-01-01'))
+
+
+class TestPrefixType(unittest.TestCase):
+
+    def setUp(self):
+        self.globs = compile("""
+            | path (glob)     | V |
+            |-----------------|---|
+            | /api/v1/users/* | 0 |
+            | /api/v?/items   | 1 |
+            | /api/v1/*       | 2 |
+            | /static/[ab]*   | 3 |
+            | N/A             | 4 |
+            | *               | 5 |
+            """)
+        self.prefixes = compile("""
+            | path (prefix) | V |
+            |---------------|---|
+            | /api/         | 0 |
+            | /api/v1/      | 1 |
+            | N/A           | 2 |
+            | /static/      | 3 |
+            | *             | 4 |
+            """)
+
+    def assertSelected(self, tb, value, expected):
+        self.assertEqual([row.V for row in tb.select_all(path=value)],
+                         expected)
+
+    def test_evaluate(self):
+        self.assertEqual(str(self.globs.column_types[0]), 'glob')
+        self.assertEqual(str(self.prefixes.column_types[0]), 'prefix')
+        self.assertEqual(repr(self.globs.rows[0].path),
+                         "Glob('/api/v1/users/*')")
+        self.assertEqual(self.globs.rows[1].path.prefix, '/api/v')
+        self.assertTrue(self.globs.rows[5].path is WILD_CARD)
+
+    def test_select(self):
+        for tb in (self.globs, self.prefixes):
+            self.assertTrue('path' in tb._indexes)
+        self.assertSelected(self.globs, '/api/v1/users/3', [0, 2, 5])
+        self.assertSelected(self.globs, '/api/v2/items', [1, 5])
+        self.assertSelected(self.globs, '/api/v2/items/1', [5])
+        self.assertSelected(self.globs, '/static/a.css', [3, 5])
+        self.assertSelected(self.globs, '/static/c.css', [5])
+        self.assertSelected(self.globs, 1, [5])
+        self.assertSelected(self.prefixes, '/api/v1/x', [0, 1, 4])
+        self.assertSelected(self.prefixes, '/api', [4])
+        self.assertSelected(self.prefixes, '/static/', [3, 4])
+
+    def test_scan(self):
+        for tb in (self.globs, self.prefixes):
+            tb._indexes.clear()
+        self.assertSelected(self.globs, '/api/v1/users/3', [0, 2, 5])
+        self.assertSelected(self.globs, 1, [5])
+        self.assertSelected(self.prefixes, '/api/v1/x', [0, 1, 4])
+
+    def test_modify(self):
+        tb = self.prefixes
+        tb.select(path='/api/')
+        tb.insert(('/api/v', 5))
+        self.assertSelected(tb, '/api/v1/x', [0, 1, 4, 5])
+        tb.insert(('', 6), position=0)
+        tb.delete(1)
+        self.assertSelected(tb, '/api/v1/x', [6, 1, 4, 5])
+
+    def test_join(self):
+        routes = compile("""
+            | path (prefix) | tier   |
+            |---------------|--------|
+            | /api/v1/      | 'gold' |
+            | /api/         | 'api'  |
+            | /static/b     | 'cdn'  |
+            """)
+        tb = self.globs.join(routes)
+        self.assertEqual([(row.V, row.tier) for row in tb],
+                         [(0, 'gold'), (0, 'api'), (1, 'gold'), (1, 'api'),
+                          (2, 'gold'), (2, 'api'), (3, 'cdn'), (5, 'gold'),
+                          (5, 'api'), (5, 'cdn')])
+        self.assertEqual(tb.select(path='/api/v1/users/1').tier, 'gold')
+        self.assertEqual(tb.select(path='/api/v2/items').tier, 'api')
+        self.assertEqual(tb.select(path='/static/b.png').V, 3)
+        self.assertRaises(LookupError, tb.select, path='/static/a.png')
+        # The narrower prefix is kept.
+        tb = self.prefixes.join(routes)
+        self.assertEqual(repr(tb.rows[0].path), "re.compile('/api/v1/')")
+
+    def test_join_anchors(self):
+        globs = compile("""
+            | path (glob) | V |
+            |-------------|---|
+            | /a          | 0 |
+            | /b          | 1 |
+            """)
+        regexes = compile("""
+            | path (regex) | W |
+            |--------------|---|
+            | a            | 2 |
+            | b            | 3 |
+            """, a=re.compile('/a$'), b=re.compile(r'/b\Z'))
+        for tb in (globs * regexes, regexes * globs):
+            self.assertEqual(sorted((row.V, row.W) for row in tb),
+                             [(0, 2), (1, 3)])
+            self.assertEqual(tb.select(path='/a').W, 2)
+            self.assertRaises(LookupError, tb.select, path='/a\n')
+        # '$' matches before a newline, which '\Z' does not.
+        tb = regexes * compile("""
+            | path (regex) | X |
+            |--------------|---|
+            | a            | 4 |
+            """, a=re.compile('/a\n\\Z'))
+        self.assertEqual([(row.W, row.X) for row in tb], [(2, 4)])
+        self.assertEqual(tb.select(path='/a\n').X, 4)
+
+
 class TestUnion(unittest.TestCase):
 
     def test_union(self):
@@ -828,6 +2116,124 @@ class TestUnion(unittest.TestCase):
                 ('Column types of the tables are different: '
                  '(value, condition) != (value, string)'))
 
+    def test_no_aliasing(self):
+        t1 = compile('''
+            | A | B |
+            |---|---|
+            | 1 | 2 |''')
+        t2 = compile('''
+            | A | B |
+            |---|---|
+            | 3 | 6 |''')
+        t3 = t1 + t2
+        self.assertEqual(t1._num_rows, 1)
+        self.assertEqual(t2._num_rows, 1)
+        self.assertEqual(t3._num_rows, 2)
+        t3.insert((4, 8), position=0)
+        t1.insert((5, 10))
+        t2.delete(0)
+        self.assertEqual(t1.select_all(), [(1, 2), (5, 10)])
+        self.assertEqual(t2.select_all(), [])
+        self.assertEqual(t3.select_all(), [(4, 8), (1, 2), (3, 6)])
+
+    def test_chain(self):
+        tables = [
+            compile('''
+                | A | B |
+                |---|---|
+                | a | b |''', a=i, b=i * 2)
+            for i in range(10)
+        ]
+        t = tables[0]
+        for other in tables[1:]:
+            t = t + other
+        self.assertEqual(t._num_rows, 10)
+        self.assertEqual(t.select(A=7), (7, 14))
+        self.assertEqual(t.rows[-1], (9, 18))
+        self.assertEqual(tables[0]._num_rows, 1)
+
+
+class TestRowList(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = _RowList.chunk_size
+        _RowList.chunk_size = 2
+
+    def tearDown(self):
+        _RowList.chunk_size = self.chunk_size
+
+    def test_append(self):
+        rows = _RowList()
+        for i in range(7):
+            rows.append(i)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(list(rows), list(range(7)))
+        self.assertEqual([rows[i] for i in range(7)], list(range(7)))
+        self.assertEqual(rows[-1], 6)
+
+    def test_insert_pop(self):
+        rows = _RowList()
+        expected = []
+        for i in range(20):
+            rows.insert(i // 2, i)
+            expected.insert(i // 2, i)
+        self.assertEqual(list(rows), expected)
+        self.assertEqual(rows.pop(3), expected.pop(3))
+        self.assertEqual(rows.pop(-1), expected.pop(-1))
+        self.assertEqual(list(rows), expected)
+        self.assertEqual(len(rows), len(expected))
+
+    def test_out_of_range(self):
+        rows = _RowList([[1, 2]])
+        self.assertRaises(IndexError, lambda: rows[2])
+        self.assertRaises(IndexError, lambda: rows.pop(-3))
+
+    def test_concat_copy_on_write(self):
+        left = _RowList([[1, 2], [3]])
+        right = _RowList([[4]])
+        both = left.concat(right)
+        both.insert(1, 0)
+        both.pop(4)
+        left.append(5)
+        right.insert(0, 6)
+        self.assertEqual(list(both), [1, 0, 2, 3])
+        self.assertEqual(list(left), [1, 2, 3, 5])
+        self.assertEqual(list(right), [6, 4])
+
+    def test_concat_chain(self):
+        left = _RowList([[1, 2], [3]])
+        right = _RowList([[4]])
+        both = left.concat(right)
+        chunks = left._chunks
+        all_rows = both.concat(left).concat(both)
+        self.assertIs(left._chunks, chunks)
+        self.assertEqual(len(all_rows), 11)
+        left.pop(0)
+        right[0] = 5
+        self.assertEqual(all_rows, [1, 2, 3, 4, 1, 2, 3, 1, 2, 3, 4])
+        self.assertEqual(both, [1, 2, 3, 4])
+        self.assertEqual(left, [2, 3])
+        self.assertEqual(right, [5])
+
+    def test_list_methods(self):
+        rows = _RowList([[1, 2], [3], [4, 5]])
+        self.assertEqual(rows[1:4], [2, 3, 4])
+        self.assertEqual(rows[::-2], [5, 3, 1])
+        self.assertEqual(rows, _RowList([[1, 2, 3, 4, 5]]))
+        self.assertNotEqual(rows, [1, 2])
+        self.assertEqual(rows.index(3), 2)
+        self.assertEqual(rows.count(4), 1)
+        self.assertIn(5, rows)
+        self.assertEqual(rows.pop(), 5)
+        rows.insert(-1, 6)
+        rows.extend([7, 8])
+        rows.remove(1)
+        del rows[1:3]
+        rows[-1] = 9
+        self.assertEqual(rows, [2, 4, 7, 9])
+        rows[1:2] = [0, 0]
+        self.assertEqual(rows, [2, 0, 0, 7, 9])
+
 
 def assertIterationStop(iterator):
     try:
@@ -1019,6 +2425,528 @@ class TestJoin(unittest.TestCase):
         self.assertFalse((4, 0, 1) in t3)
 
 
+class TestJoinPredicate(unittest.TestCase):
+
+    def test_interval_parse(self):
+        def parse(expression, **variables):
+            return repr(_Interval.parse(expression, variables, 'a'))
+        self.assertEqual(parse('0 <= a < 2'), 'Interval[0, 2)')
+        self.assertEqual(parse('a > -1.5'), 'Interval(-1.5, inf)')
+        self.assertEqual(parse('10 >= a'), 'Interval(-inf, 10]')
+        self.assertEqual(parse('L < a <= H', L=1, H=3), 'Interval(1, 3]')
+        self.assertEqual(parse('a % 2 == 0'), 'None')
+        self.assertEqual(parse('a == 1'), 'None')
+        self.assertEqual(parse('0 < 1 < a'), 'None')
+        self.assertEqual(parse('a < b'), 'None')
+        self.assertEqual(parse("a < 'x'"), 'None')
+
+    def test_interval_intersect(self):
+        t1 = compile('''
+        | A (cond)   | B |
+        |------------|---|
+        | 0 <= A < 5 | 1 |
+        | A < 0      | 2 |''')
+        t2 = compile('''
+        | A (cond) | C |
+        |----------|---|
+        | A >= 3   | 3 |
+        | A > 10   | 4 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 1)
+        self.assertEqual(repr(t3.rows[0].A), 'Interval[3, 5)')
+        self.assertEqual(t3.select(A=3), (3, 1, 3))
+        self.assertRaises(LookupError, lambda: t3.select(A=5))
+        self.assertRaises(LookupError, lambda: t3.select(B=2))
+
+    def test_touching_intervals(self):
+        t1 = compile('''
+        | A (cond) | B |
+        |----------|---|
+        | A < 0    | 1 |
+        | A <= 0   | 2 |''')
+        t2 = compile('''
+        | A (cond) | C |
+        |----------|---|
+        | A >= 0   | 3 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3.select_all(), [(WILD_CARD, 2, 3)])
+        self.assertEqual(t3.select(A=0), (0, 2, 3))
+
+    def test_collections(self):
+        t1 = compile('''
+        | A (coll) | B |
+        |----------|---|
+        | 1, 2, 3  | 0 |
+        | 5, 6     | 1 |''')
+        t2 = compile('''
+        | A (coll) | C |
+        |----------|---|
+        | 2, 3, 4  | 1 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 1)
+        self.assertEqual(repr(t3.rows[0].A), 'Members(2, 3)')
+
+    def test_flatten(self):
+        t1 = compile('''
+        | A (cond)   | B |
+        |------------|---|
+        | A % 2 == 0 | 0 |''')
+        t2 = compile('''
+        | A (cond) | C |
+        |----------|---|
+        | A > 0    | 1 |''')
+        t3 = compile('''
+        | A (cond)   | D |
+        |------------|---|
+        | A % 3 == 0 | 2 |
+        | A < 10     | 3 |''')
+        t4 = t1 * t2 * t3
+        self.assertEqual(len(t4.rows[0].A.predicates), 3)
+        self.assertEqual(len(t4.rows[1].A.predicates), 2)
+        self.assertEqual(t4.select(A=6), (6, 0, 1, 2))
+        self.assertEqual(t4.select(A=4), (4, 0, 1, 3))
+        self.assertRaises(LookupError, lambda: t4.select(A=12, D=3))
+
+    def test_set_and_missing_column(self):
+        t1 = compile('''
+        | A (cond) | B (re) |
+        |----------|--------|
+        | A < 0    | 'x'    |''')
+        t2 = compile('''
+        | C |
+        |---|
+        | 1 |''')
+        self.assertEqual((t1 * t2).select(A=-1, B='xy'), (-1, 'xy', 1))
+        self.assertEqual((t2 * t1).select(A=-1, B='xy'), (1, -1, 'xy'))
+        self.assertRaises(LookupError, lambda: (t2 * t1).select(B='y'))
+
+
+class TestJoinPruning(unittest.TestCase):
+
+    def test_condition_and_collection(self):
+        t1 = compile('''
+        | A (cond)   | B |
+        |------------|---|
+        | A % 2 == 0 | 0 |
+        | A < 0      | 1 |''')
+        t2 = compile('''
+        | A (coll)   | C |
+        |------------|---|
+        | 1, 2, 3, 4 | 2 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 1)
+        self.assertEqual(repr(t3.rows[0].A), 'Members(2, 4)')
+        self.assertEqual(t3.select(A=4), (4, 0, 2))
+
+    def test_regex_and_collection(self):
+        t1 = compile('''
+        | A (re)  | B |
+        |---------|---|
+        | r'a+$'  | 0 |
+        | r'b'    | 1 |''')
+        t2 = compile('''
+        | A (coll)   | C |
+        |------------|---|
+        | 'aa', 'ab' | 2 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 1)
+        self.assertEqual(t3.select(A='aa'), ('aa', 0, 2))
+
+    def test_literal_regexes(self):
+        t1 = compile('''
+        | A (re)       | B |
+        |--------------|---|
+        | '/api/v1/'   | 0 |
+        | '/api/v2/'   | 1 |
+        | '/api/.*'    | 2 |''')
+        t2 = compile('''
+        | A (re)        | C |
+        |---------------|---|
+        | '/api/v1/x$'  | 3 |
+        | '/static/'    | 4 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 3)
+        self.assertEqual(t3.select(A='/api/v1/x'), ('/api/v1/x', 0, 3))
+        self.assertEqual(t3.select(C=4), (WILD_CARD, 2, 4))
+
+    def test_na_and_set(self):
+        t1 = compile('''
+        | A (cond) | B |
+        |----------|---|
+        | N/A      | 0 |
+        | *        | 1 |''')
+        t2 = compile('''
+        | A (cond) | C |
+        |----------|---|
+        | A > 0    | 2 |
+        | N/A      | 3 |''')
+        t3 = t1 * t2
+        self.assertEqual(t3._num_rows, 3)
+        self.assertRaises(LookupError, lambda: t3.select(B=0))
+        self.assertEqual(t3.select(A=1, B=1), (1, 1, 2))
+
+    def test_na_and_value(self):
+        t1 = compile('''
+        | A | B |
+        |---|---|
+        |N/A| 0 |
+        | 1 | 1 |''')
+        t2 = compile('''
+        | A (cond) | C |
+        |----------|---|
+        | A > 0    | 2 |''')
+        self.assertEqual((t1 * t2).select_all(), [(1, 1, 2)])
+        self.assertEqual((t2 * t1).select_all(), [(1, 2, 1)])
+
+
+class TestLazyJoin(unittest.TestCase):
+
+    def setUp(self):
+        self.t1 = compile('''
+        | A | B |
+        |---|---|
+        | 1 |N/A|
+        | 2 | 1 |
+        |N/A| 2 |
+        | * | 3 |''')
+        self.t2 = compile('''
+        | A | C |
+        |---|---|
+        | 1 | 3 |
+        | 2 |N/A|
+        |N/A| 4 |
+        | * | 5 |''')
+        self.t3 = compile('''
+        | C (cond) | D |
+        |----------|---|
+        | C < 4    | 0 |
+        | *        | 1 |''')
+
+    def test_same_as_eager(self):
+        eager = self.t1 * self.t2
+        lazy = self.t1.join(self.t2, lazy=True)
+        self.assertEqual(list(lazy.rows), list(eager.rows))
+        self.assertEqual(lazy.select_all(), eager.select_all())
+        for a in (1, 2, 3):
+            self.assertEqual(lazy.select_all(A=a), eager.select_all(A=a))
+            self.assertEqual(lazy.select_all(A=a, B=3),
+                             eager.select_all(A=a, B=3))
+
+    def test_na(self):
+        lazy = self.t1.join(self.t2, lazy=True)
+        self.assertRaises(LookupError, lambda: lazy.select(A=1))
+        self.assertEqual(lazy.select(A=1, B=3), (1, 3, 3))
+
+    def test_chain(self):
+        t2 = compile('''
+        | A | C |
+        |---|---|
+        | 1 | 3 |
+        | * | 5 |''')
+        eager = self.t1 * t2 * self.t3
+        lazy = self.t1.join(t2, lazy=True).join(self.t3, lazy=True)
+        self.assertEqual(lazy._labels, ('A', 'B', 'C', 'D'))
+        self.assertEqual(lazy.select_all(), eager.select_all())
+        self.assertEqual(lazy.select(A=2, B=1, C=5), (2, 1, 5, 1))
+        self.assertEqual(lazy.select(B=3, C=3), (1, 3, 3, 0))
+
+    def test_view(self):
+        lazy = self.t1.join(self.t2, lazy=True)
+        self.assertEqual(lazy.select(A=1, B=3), (1, 3, 3))
+        self.t2.delete(0)
+        self.assertEqual(lazy.select(A=1, B=3), (1, 3, 5))
+        self.assertRaises(TypeError, lambda: lazy.insert((1, 1, 1)))
+        self.assertRaises(TypeError, lambda: lazy.delete(0))
+
+    def test_invalid_label(self):
+        lazy = self.t1.join(self.t2, lazy=True)
+        self.assertRaises(LookupError, lambda: lazy.select(E=1))
+        for table in (lazy, self.t1 * self.t2):
+            try:
+                table.select_all(A=1, E=1)
+            except LookupError as e:
+                self.assertEqual(str(e), "Label 'E' is invalid")
+            else:
+                self.fail()
+
+
+class TestAnalyze(unittest.TestCase):
+
+    def test_conditions(self):
+        t = compile("""
+            ============ ======== ==========
+             age (cond)   gender  call (str)
+            ============ ======== ==========
+             0 <= a < 7     *     kid
+             2 <= a < 5    'M'    boy
+             7 <= a        'M'    man
+                  *         *     person
+             9 <= a        N/A    none
+            ============ ======== ==========
+            """)
+        self.assertEqual(t.analyze(keys=['age', 'gender']),
+                         ([(1, 0), (4, 2)], [(0, 3), (2, 3)], None))
+        # The calls differ
+        self.assertEqual(t.analyze().shadowed, [])
+
+    def test_sets(self):
+        t = compile("""
+            | A (coll) | B (regex) |
+            |----------|-----------|
+            | (1, 2)   | r'ab'     |
+            | [2]      | r'abc$'   |
+            | {3}      | r'b'      |
+            | (1, 2)   | r'a.'     |
+            """)
+        self.assertEqual(t.analyze(),
+                         ([(1, 0)], [(0, 3)], None))
+
+    def test_optimize(self):
+        t = compile("""
+            === === ==
+             A   B   C
+            === === ==
+             1   *  10
+             1   2  20
+             *   2  30
+            === === ==
+            """)
+        shadowed, overlaps, copy = t.analyze(keys=['A', 'B'], optimize=True)
+        self.assertEqual(list(copy.rows), [t.rows[0], t.rows[2]])
+        for a, b in [(1, 2), (2, 2), (1, 3)]:
+            self.assertEqual(copy.select(A=a, B=b), t.select(A=a, B=b))
+        self.assertEqual(len(t.rows), 3)
+
+    def test_invalid_key(self):
+        t = compile("""
+            === ===
+             A   B
+            === ===
+             1   2
+            === ===
+            """)
+        self.assertRaises(LookupError, lambda: t.analyze(keys=['C']))
+
+
+class TestReorder(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            ============ ======== ==========
+             age (cond)   gender  call (str)
+            ============ ======== ==========
+             0 <= a < 7     *     kid
+             2 <= a < 5    'M'    boy
+            18 <= a        'M'    gentleman
+            18 <= a        'F'    lady
+                  *         *     person
+            ============ ======== ==========
+            """)
+
+    def assertSameSelect(self, tb):
+        for age in range(-1, 30):
+            for gender in ['M', 'F']:
+                self.assertEqual(tb.select(age=age, gender=gender),
+                                 self.tb.select(age=age, gender=gender))
+
+    def test_sample(self):
+        queries = [{'age': 20, 'gender': 'F'}] * 3
+        queries.append({'age': 3, 'gender': 'M'})
+        tb = self.tb.reorder(queries)
+        self.assertEqual([row.call for row in tb.rows],
+                         ['lady', 'kid', 'boy', 'gentleman', 'person'])
+        self.assertSameSelect(tb)
+
+    def test_track_hits(self):
+        self.tb.track_hits = True
+        for age in [20, 30, 40]:
+            self.tb.select(age=age, gender='M')
+        tb = self.tb.reorder(keys=['age', 'gender'])
+        self.assertEqual([row.call for row in tb.rows],
+                         ['gentleman', 'kid', 'boy', 'lady', 'person'])
+        self.assertSameSelect(tb)
+
+    def test_no_keys(self):
+        self.tb.track_hits = True
+        self.tb.select(call='lady')
+        tb = self.tb.reorder()
+        # The genders overlap with the wild card.
+        self.assertEqual(list(tb.rows), list(self.tb.rows))
+
+    def test_hits_follow_rows(self):
+        self.tb.track_hits = True
+        self.tb.select(age=20, gender='F')
+        self.tb.insert(self.tb.rows[2], position=0)
+        lady = self.tb.delete(4)
+        self.assertEqual(lady.call, 'lady')
+        # A new row does not take the hits of the deleted one.
+        self.tb.insert(lady)
+        self.tb.select(age=20, gender='M')
+        self.assertEqual(self.tb._hits, [1, 0, 0, 0, 0, 0])
+        # Hits are dropped when rows are changed directly.
+        self.tb.rows.append(lady)
+        self.assertEqual(self.tb._hits, [0] * 7)
+
+    def test_view(self):
+        other = compile("""
+            | call (str) | n |
+            |------------|---|
+            | kid        | 1 |
+            | lady       | 2 |
+            | gentleman  | 3 |
+            """)
+        view = self.tb.join(other, lazy=True)
+        view.track_hits = True
+        view.select(age=20, gender='F')
+        view.select(age=20, gender='F')
+        tb = view.reorder(keys=['age', 'gender'])
+        self.assertEqual([row.call for row in tb.rows],
+                         ['lady', 'kid', 'gentleman'])
+        tb = view.reorder([{'age': 20, 'gender': 'M'}],
+                          keys=['age', 'gender'])
+        self.assertEqual([row.call for row in tb.rows],
+                         ['gentleman', 'kid', 'lady'])
+        # Hits are dropped when a table changes.
+        other.delete(0)
+        self.assertEqual(view._hits, {})
+
+
+class TestPrecompute(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            ============ ======== ==========
+             age (cond)   gender  call (str)
+            ============ ======== ==========
+                  a < 0    N/A
+             0 <= a < 7     *     kid
+             7 <= a        'M'    man
+             7 <= a        'F'    woman
+            ============ ======== ==========
+            """)
+        self.ages = range(-2, 20)
+
+    def test_same_as_select(self):
+        expected = {}
+        for age in self.ages:
+            for gender in ['M', 'F', 'X']:
+                try:
+                    expected[age, gender] = self.tb.select(
+                        age=age, gender=gender)
+                except LookupError as e:
+                    expected[age, gender] = str(e)
+        self.tb.precompute(['age', 'gender'],
+                           {'age': self.ages, 'gender': ['M', 'F']})
+        self.assertEqual(len(self.tb._lookup.rows), 44)
+        for (age, gender), row in expected.items():
+            try:
+                self.assertEqual(self.tb.select(age=age, gender=gender), row)
+            except LookupError as e:
+                self.assertEqual(str(e), row)
+
+    def test_inferred(self):
+        self.tb.precompute(['gender'])
+        self.assertEqual(list(self.tb._lookup.rows), [('M',), ('F',)])
+        self.assertEqual(self.tb.select(gender='F').call, 'kid')
+        self.assertRaises(ValueError, lambda: self.tb.precompute(['age']))
+
+    def test_modify(self):
+        self.tb.precompute(['age'], {'age': self.ages})
+        self.tb.delete(1)
+        self.assertTrue(self.tb._lookup is None)
+        self.assertEqual(self.tb.select(age=10, gender='M').call, 'man')
+
+    def test_modify_joined(self):
+        other = compile("""
+            | call (str) | n |
+            |------------|---|
+            | kid        | 1 |
+            | man        | 2 |
+            """)
+        view = self.tb.join(other, lazy=True)
+        view.precompute(['age', 'gender'],
+                        {'age': self.ages, 'gender': ['M', 'F']})
+        self.assertEqual(view.select(age=10, gender='M').n, 2)
+        other.delete(1)
+        self.assertRaises(
+            LookupError, lambda: view.select(age=10, gender='M'))
+        self.assertTrue(view._lookup is None)
+
+
+class TestExplain(unittest.TestCase):
+
+    def setUp(self):
+        self.tb = compile("""
+            === === ===
+             A   B   C
+            === === ===
+             1   1   1
+             2   *   2
+             *  N/A  3
+            === === ===
+            """)
+
+    def test_scan(self):
+        e = self.tb.explain(B=5, A=2)
+        self.assertEqual((e.path, e.label, e.order),
+                         ('scan', None, ['B', 'A']))
+        self.assertEqual(e.rows_examined, 2)
+        self.assertEqual(e.evaluated, {'value': 2})
+        self.assertEqual(e.row, (2, 5, 2))
+        self.assertTrue(e.seconds >= 0)
+
+    def test_not_found(self):
+        self.assertEqual(self.tb.explain(A=3).row, None)
+        self.assertEqual(self.tb.explain(A=3).rows_examined, 3)
+
+    def test_invalid_condition(self):
+        for condition in ({}, {'X': 1}, {'A': 1, 'X': 1}):
+            self.assertRaises(LookupError, self.tb.select, **condition)
+            self.assertRaises(LookupError, self.tb.explain, **condition)
+        self.tb.precompute(['A'])
+        self.assertRaises(LookupError, self.tb.explain, X=1)
+
+    def test_lookup(self):
+        self.tb.precompute(['A'])
+        e = self.tb.explain(A=2)
+        self.assertEqual((e.path, e.order, e.rows_examined),
+                         ('lookup', ['A'], 0))
+        self.assertEqual(e.row, self.tb.select(A=2))
+        self.assertEqual(self.tb.explain(A=2, B=1).path, 'scan')
+
+    def test_join(self):
+        other = compile("""
+            === ===
+             C   D
+            === ===
+             2   4
+            === ===
+            """)
+        view = self.tb.join(other, lazy=True)
+        e = view.explain(A=2)
+        self.assertEqual((e.path, e.label), ('join', None))
+        self.assertEqual(e.row, (2, WILD_CARD, 2, 4))
+        # Two rows of the left table, the row of the right one and the
+        # joined row
+        self.assertEqual(e.rows_examined, 4)
+        self.assertEqual(e.evaluated, {'value': 3})
+        self.assertEqual(view._indexes, {})
+
+    def test_match_batch(self):
+        tb = compile("""
+            | K (ip)       | V |
+            |--------------|---|
+            | '10.0.0.0/8' | 1 |
+            | '11.0.0.0/8' | 2 |
+            | *            | 3 |
+            """)
+        tb._indexes.clear()
+        e = tb.explain(K='11.1.1.1')
+        self.assertEqual((e.path, e.rows_examined), ('scan', 2))
+        # Three cells tested at once and the matched cell
+        self.assertEqual(e.evaluated, {'ip': 4})
+
+
 class TestIterable(unittest.TestCase):
 
     def test_next(self):
@@ -1082,6 +3010,222 @@ class TestIterable(unittest.TestCase):
         self.assertEqual(i, 3)
 
 
+class TestDump(unittest.TestCase):
+
+    def roundtrip(self, table):
+        f = io.BytesIO()
+        table.dump(f)
+        f.seek(0)
+        return load(f)
+
+    def test_types(self):
+        t1 = compile('''
+        ============ ====== ====== ====== ========= ======== =======
+         a (cond)    b      c (re) d      e (coll)  f (str)  g
+        ============ ====== ====== ====== ========= ======== =======
+         a < L       1      'x+'   1.5    (1, 2)    foo      'x'
+         0 <= a < 9  -2     *      N/A    *         bar      None
+         *           N/A    N/A    *      N/A       baz      (1, 2)
+        ============ ====== ====== ====== ========= ======== =======
+        ''', L=-10)
+        t2 = self.roundtrip(t1)
+        self.assertEqual(t2._labels, t1._labels)
+        self.assertEqual(t2.column_types, t1.column_types)
+        self.assertEqual(t2.rows[0][1:], (1, t2.rows[0].c, 1.5, (1, 2),
+                                          'foo', 'x'))
+        self.assertEqual(t2.rows[0].c.pattern, 'x+')
+        self.assertEqual(t2.rows[1][1:], (-2, WILD_CARD, NOT_APPLICABLE,
+                                          WILD_CARD, 'bar', None))
+        self.assertTrue(t2.rows[2].b is NOT_APPLICABLE)
+        self.assertEqual(t2.select(a=-11, c='xx', e=2),
+                         (-11, 1, 'xx', 1.5, 2, 'foo', 'x'))
+        self.assertRaises(LookupError, lambda: t2.select(a=5, b=-2))
+        self.assertRaises(LookupError, lambda: t2.select(f='baz'))
+        self.assertEqual(repr(t2.rows[1].a.interval), 'Interval[0, 9)')
+
+    def test_set_types(self):
+        t1 = compile('''
+        | A (ip)     | B (daterange)             | C (prefix) | D (glob) |
+        |------------|---------------------------|------------|----------|
+        | 10.0.0.0/8 | 2020-01-01..2020-12-31    | /api/      | *.txt    |
+        | ::1        | 2021-01-01...             | N/A        | a?c      |
+        | *          | ...2020-01-01             | *          | *        |
+        ''')
+        t2 = self.roundtrip(t1)
+        self.assertEqual(t2.column_types, t1.column_types)
+        for row1, row2 in zip(t1.rows, t2.rows):
+            self.assertEqual((row2.A, row2.C), (row1.A, row1.C))
+            self.assertEqual(str(row2.B), str(row1.B))
+            self.assertEqual(getattr(row2.D, 'pattern', row2.D),
+                             getattr(row1.D, 'pattern', row1.D))
+        self.assertEqual(t2.select(A='10.1.2.3', B='2020-02-01',
+                                   C='/api/x', D='a.txt').A,
+                         '10.1.2.3')
+
+    def test_loads_buffer(self):
+        t1 = compile('''
+        | A | B |
+        |---|---|
+        | 1 | 2 |
+        | 3 | 4 |''')
+        f = io.BytesIO()
+        t1.dump(f)
+        data = f.getvalue()
+        self.assertEqual(len(data) % 8, 0)
+        for buffer in (data, bytearray(data), memoryview(data)):
+            self.assertEqual(list(loads(buffer).rows), list(t1.rows))
+
+    def test_empty(self):
+        t = self.roundtrip(create_table(['a', 'b']))
+        self.assertEqual(t._labels, ('a', 'b'))
+        self.assertEqual(t._num_rows, 0)
+
+    def test_not_literal(self):
+        t = compile('''
+        | A |
+        |---|
+        | a |''', a=object())
+        self.assertRaises(TypeError, lambda: t.dump(io.BytesIO()))
+
+    def test_not_literal_variable(self):
+        t = compile('''
+        | A (cond) |
+        |----------|
+        | f(A)     |''', f=abs)
+        self.assertRaises(TypeError, lambda: t.dump(io.BytesIO()))
+
+    def test_joined(self):
+        t1 = compile('''
+        | A (cond) |
+        |----------|
+        | A > 0    |''')
+        t = t1 * t1
+        self.assertRaises(TypeError, lambda: t.dump(io.BytesIO()))
+
+    def test_broken(self):
+        self.assertRaises(TableMarkupError, lambda: loads(b'ABCD'))
+        f = io.BytesIO()
+        compile('''
+        | A |
+        |---|
+        | 1 |''').dump(f)
+        self.assertRaises(TableMarkupError, lambda: loads(f.getvalue()[:-9]))
+
+    def test_truncated(self):
+        f = io.BytesIO()
+        compile('''
+        | A (cond) | B     | C (str) | D (dates)  |
+        |----------|-------|---------|------------|
+        | A < 1    | (1,)  | foo     | 2020-01-01 |
+        | *        | N/A   | bar     | *          |''').dump(f)
+        data = f.getvalue()
+        for size in range(len(data)):
+            self.assertRaises(TableMarkupError, loads, data[:size])
+
+    def test_corrupted(self):
+        f = io.BytesIO()
+        compile('''
+        | A (cond) | B     | C (str) | D (re) |
+        |----------|-------|---------|--------|
+        | A < 1    | (1,)  | foo     | 'x+'   |
+        | *        | N/A   | bar     | 'y'    |''').dump(f)
+        data = f.getvalue()
+        rand = random.Random(1)
+        for _ in range(300):
+            broken = bytearray(data)
+            for _ in range(rand.randint(1, 4)):
+                broken[rand.randrange(4, len(data))] = rand.randrange(256)
+            try:
+                loads(bytes(broken))
+            except TableMarkupError:
+                pass
+
+
+class TestAsync(unittest.TestCase):
+
+    text = '''
+        | A | B |
+        |---|---|
+        | 1 | b |
+        | * |N/A|'''
+
+    @staticmethod
+    def wait(function, *args, **kwargs):
+        async def main():
+            return await function(*args, **kwargs)
+        return asyncio.run(main())
+
+    def test_compile_async(self):
+        table = self.wait(compile_async, self.text, b=2)
+        self.assertEqual(table.select(A=1), (1, 2))
+
+    def test_load_async_fileobj(self):
+        table = self.wait(load_async, io.StringIO(self.text), b=2)
+        self.assertEqual(table.select(A=1), (1, 2))
+
+    def test_load_async_path(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.text)
+            table = self.wait(load_async, path, b=2)
+        finally:
+            os.remove(path)
+        self.assertEqual(table.select(A=1), (1, 2))
+
+    def test_compile_async_error(self):
+        self.assertRaises(
+            TableMarkupError,
+            lambda: self.wait(compile_async, '| A (foo) |\n|---|\n| 1 |'))
+
+    def test_async_for(self):
+        table = compile('''
+            | A |
+            |---|
+            | a |''', a=0)
+        for i in range(1, 100):
+            table.insert((i if i % 3 else NOT_APPLICABLE,))
+
+        async def collect(iterator):
+            return [row async for row in iterator]
+
+        self.assertEqual(
+            asyncio.run(collect(table)), table.select_all())
+        self.assertEqual(
+            asyncio.run(collect(table.async_iterator(A=3))), [])
+        self.assertEqual(
+            asyncio.run(collect(table.async_iterator(A=4))), [(4,)])
+
+    def test_yield_control(self):
+        table = compile('''
+            | A |
+            |---|
+            | * |''')
+        for i in range(20):
+            table.insert((i,))
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.ensure_future(tick())
+            rows = [row async for row in table]
+            task.cancel()
+            return rows
+
+        batch_size = _AsyncRowIterator.batch_size
+        _AsyncRowIterator.batch_size = 2
+        try:
+            rows = asyncio.run(main())
+        finally:
+            _AsyncRowIterator.batch_size = batch_size
+        self.assertEqual(len(rows), 21)
+        self.assertTrue(len(ticks) > 1)
+
+
 def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTests(
@@ -1090,17 +3234,41 @@ def suite():
             for test_cls in (
                 TestDocutils,
                 TestFormatEstimation,
+                TestStripLines,
                 TestSimpleTableParser,
                 TestGridTableParser,
                 TestMarkdownParser,
                 TestCompile,
+                TestExhaustive,
+                TestCompileFile,
+                TestCompileCsv,
+                TestCompileParallel,
                 TestSelect,
                 TestSelectAll,
                 TestTable,
+                TestModify,
+                TestRegexIndex,
+                TestIntervalIndex,
+                TestCollectionIndex,
+                TestIndexUpdate,
+                TestColumnTypeRegistry,
+                TestIpType,
+                TestDateRangeType,
+                TestPrefixType,
                 TestUnion,
+                TestRowList,
                 TestJoin,
+                TestJoinPredicate,
+                TestJoinPruning,
+                TestLazyJoin,
                 TestColumnType,
+                TestAnalyze,
+                TestReorder,
+                TestPrecompute,
+                TestExplain,
                 TestIterable,
+                TestDump,
+                TestAsync,
             )
         ]
     )